@@ -3,6 +3,7 @@ from loguru import logger
 
 from .agents.agent_interface import AgentInterface
 from .agents.basic_memory_agent import BasicMemoryAgent
+from .context_window import hf_token_counter
 from .stateless_llm_factory import LLMFactory as StatelessLLMFactory
 from .agents.hume_ai import HumeAIAgent
 
@@ -55,6 +56,27 @@ class AgentFactory:
                 llm_provider=llm_provider, system_prompt=system_prompt, **llm_config
             )
 
+            # Optional cheaper LLM for the summary of older turns
+            summary_llm = None
+            summary_llm_provider = basic_memory_settings.get("summary_llm_provider")
+            if summary_llm_provider:
+                summary_llm_config = dict(llm_configs.get(summary_llm_provider) or {})
+                if not summary_llm_config:
+                    raise ValueError(
+                        f"Configuration not found for LLM provider: {summary_llm_provider}"
+                    )
+                summary_llm_config.pop("interrupt_method", None)
+                summary_llm = StatelessLLMFactory.create_llm(
+                    llm_provider=summary_llm_provider,
+                    system_prompt=system_prompt,
+                    **summary_llm_config,
+                )
+
+            count_tokens = None
+            context_tokenizer = basic_memory_settings.get("context_tokenizer")
+            if context_tokenizer:
+                count_tokens = hf_token_counter(context_tokenizer)
+
             # Create the agent with the LLM and live2d_model
             return BasicMemoryAgent(
                 llm=llm,
@@ -66,28 +88,56 @@ class AgentFactory:
                 ),
                 segment_method=basic_memory_settings.get("segment_method", "pysbd"),
                 interrupt_method=interrupt_method,
+                adaptive_chunking=basic_memory_settings.get("adaptive_chunking", False),
+                context_max_tokens=basic_memory_settings.get("context_max_tokens", 0),
+                summary_llm=summary_llm,
+                count_tokens=count_tokens,
             )
 
         elif conversation_agent_choice == "mem0_agent":
-            from .agents.mem0_llm import LLM as Mem0LLM
+            from .agents.mem0_llm import VectorMemoryAgent
+            from .vector_memory import create_embedder
 
-            mem0_settings = agent_settings.get("mem0_agent", {})
-            if not mem0_settings:
-                raise ValueError("Mem0 agent settings not found")
+            memory_settings: dict = agent_settings.get("mem0_agent") or {}
+            llm_provider: str = memory_settings.get("llm_provider")
 
-            # Validate required settings
-            required_fields = ["base_url", "model", "mem0_config"]
-            for field in required_fields:
-                if field not in mem0_settings:
-                    raise ValueError(
-                        f"Missing required field '{field}' in mem0_agent settings"
-                    )
+            if not llm_provider:
+                raise ValueError("LLM provider not specified for mem0 agent")
 
-            return Mem0LLM(
-                user_id=kwargs.get("user_id", "default"),
+            llm_config: dict = llm_configs.get(llm_provider)
+            if not llm_config:
+                raise ValueError(
+                    f"Configuration not found for LLM provider: {llm_provider}"
+                )
+            interrupt_method: Literal["system", "user"] = llm_config.pop(
+                "interrupt_method", "user"
+            )
+
+            llm = StatelessLLMFactory.create_llm(
+                llm_provider=llm_provider, system_prompt=system_prompt, **llm_config
+            )
+            embedder = create_embedder(
+                memory_settings.get("embedding_provider", "hashing"),
+                model=memory_settings.get("embedding_model"),
+                base_url=memory_settings.get("embedding_base_url"),
+            )
+
+            return VectorMemoryAgent(
+                llm=llm,
                 system=system_prompt,
                 live2d_model=live2d_model,
-                **mem0_settings,
+                embedder=embedder,
+                memory_dir=memory_settings.get("memory_dir", "memory"),
+                conf_uid=kwargs.get("conf_uid") or "default",
+                top_k=memory_settings.get("top_k", 5),
+                min_score=memory_settings.get("min_score", 0.3),
+                retrieval_budget_ms=memory_settings.get("retrieval_budget_ms", 20.0),
+                tts_preprocessor_config=tts_preprocessor_config,
+                faster_first_response=memory_settings.get(
+                    "faster_first_response", True
+                ),
+                segment_method=memory_settings.get("segment_method", "pysbd"),
+                interrupt_method=interrupt_method,
             )
 
         elif conversation_agent_choice == "hume_ai_agent":
@@ -4,6 +4,7 @@ from loguru import logger
 
 from ..output_types import BaseOutput
 from ..input_types import BaseInput
+from ...utils.sentence_divider import TTSQueueStatus
 
 
 class AgentInterface(ABC):
@@ -52,3 +53,28 @@ class AgentInterface(ABC):
             history_uid: str - History ID
         """
         pass
+
+    def set_tts_status(self, tts_status: TTSQueueStatus | None) -> None:
+        """
+        Tell the agent about the TTS queue of the current conversation turn,
+        e.g. to size the chunks it outputs. Agents that do not need it can
+        ignore it.
+
+        Args:
+            tts_status: TTSQueueStatus - The turn's TTSTaskManager
+        """
+        pass
+
+    def new_session(self) -> "AgentInterface":
+        """
+        Create an agent for one client session.
+
+        A session keeps its own conversation state (memory, interrupt flag)
+        and shares the LLM client and configuration with this agent, so it
+        is cheap to create. Agents without per-client state return
+        themselves.
+
+        Returns:
+            AgentInterface - The agent to use for the client
+        """
+        return self
@@ -1,17 +1,15 @@
+import copy
 from typing import AsyncIterator, List, Dict, Any, Callable, Literal
 from loguru import logger
-import asyncio
 from .agent_interface import AgentInterface
 from ..output_types import SentenceOutput, DisplayText
 from ..stateless_llm.stateless_llm_interface import StatelessLLMInterface
 from ...chat_history_manager import get_history
-from ..transformers import (
-    sentence_divider,
-    actions_extractor,
-    tts_filter,
-    display_processor,
-)
+from ..transformers import OutputPipeline, coalesce_tokens
+from ..context_window import ContextWindow
 from ...config_manager import TTSPreprocessorConfig
+from ...utils.language_id import LanguageCache
+from ...utils.sentence_divider import AdaptiveChunking, TTSQueueStatus
 from ..input_types import BatchInput, TextSource, ImageSource
 from prompts import prompt_loader
 
@@ -37,6 +35,10 @@ class BasicMemoryAgent(AgentInterface):
         faster_first_response: bool = True,
         segment_method: str = "pysbd",
         interrupt_method: Literal["system", "user"] = "user",
+        adaptive_chunking: bool = False,
+        context_max_tokens: int = 0,
+        summary_llm: StatelessLLMInterface | None = None,
+        count_tokens: Callable[[str], int] | None = None,
     ):
         """
         Initialize the agent with LLM, system prompt and configuration
@@ -50,6 +52,15 @@ class BasicMemoryAgent(AgentInterface):
             segment_method: `str` - Method for sentence segmentation
             interrupt_method: `Literal["system", "user"]` -
                 Methods for writing interruptions signal in chat history.
+            adaptive_chunking: `bool` - Whether to size sentence chunks to the TTS queue
+            context_max_tokens: `int` - Token budget of the prompt, 0 for no limit.
+                Older turns are folded into a summary.
+            summary_llm: `StatelessLLMInterface` - LLM writing the summary.
+                Without one, older turns are dropped. It is not `llm` by
+                default, since a local model would take the summary request
+                in turn with the replies.
+            count_tokens: `Callable[[str], int]` - Token counter, defaults to
+                a character heuristic
 
         """
         super().__init__()
@@ -58,7 +69,17 @@ class BasicMemoryAgent(AgentInterface):
         self._tts_preprocessor_config = tts_preprocessor_config
         self._faster_first_response = faster_first_response
         self._segment_method = segment_method
+        # Language this character speaks, for sentence segmentation
+        self._language_cache = LanguageCache()
+        self._adaptive_chunking = AdaptiveChunking() if adaptive_chunking else None
+        self._context_window = ContextWindow(
+            max_tokens=context_max_tokens,
+            summary_llm=summary_llm if context_max_tokens else None,
+            count_tokens=count_tokens,
+        )
         self.interrupt_method = interrupt_method
+        # Chat history the memory was loaded from
+        self._history_uids: tuple[str, str] | None = None
         # Flag to ensure a single interrupt handling per conversation
         self._interrupt_handled = False
         self._set_llm(llm)
@@ -77,6 +98,25 @@ class BasicMemoryAgent(AgentInterface):
         self._llm = llm
         self.chat = self._chat_function_factory(llm.chat_completion)
 
+    def new_session(self) -> "BasicMemoryAgent":
+        """
+        Create an agent for one client session, sharing the LLM client,
+        system prompt and output settings with this agent. The session starts
+        with empty memory and its own context window.
+        """
+        session = copy.copy(self)
+        session._memory = []
+        session._history_uids = None
+        session._interrupt_handled = False
+        session._language_cache = LanguageCache()
+        session._adaptive_chunking = (
+            AdaptiveChunking() if self._adaptive_chunking else None
+        )
+        session._context_window = self._context_window.new_session()
+        # The chat pipeline refers to the agent it was made for
+        session._set_llm(self._llm)
+        return session
+
     def set_system(self, system: str):
         """
         Set the system prompt
@@ -130,6 +170,8 @@ class BasicMemoryAgent(AgentInterface):
         """Load the memory from chat history"""
         messages = get_history(conf_uid, history_uid)
 
+        self._history_uids = (conf_uid, history_uid)
+        self._context_window.reset()
         self._memory = []
         self._memory.append(
             {
@@ -145,6 +187,8 @@ class BasicMemoryAgent(AgentInterface):
                     "content": msg["content"],
                 }
             )
+        # Older messages are summarized instead of sent on every turn
+        self._context_window.fit(self._memory, self._system)
 
     def handle_interrupt(self, heard_response: str) -> None:
         """
@@ -211,9 +255,8 @@ class BasicMemoryAgent(AgentInterface):
     def _to_messages(self, input_data: BatchInput) -> List[Dict[str, Any]]:
         """
         Prepare messages list with image support.
+        The memory is trimmed to the token budget first.
         """
-        messages = self._memory.copy()
-
         if input_data.images:
             content = []
             text_content = self._to_text_prompt(input_data)
@@ -231,29 +274,70 @@ class BasicMemoryAgent(AgentInterface):
         else:
             user_message = {"role": "user", "content": self._to_text_prompt(input_data)}
 
+        self._context_window.fit(self._memory, self._system, user_message)
+        messages = self._memory.copy()
         messages.append(user_message)
         self._add_message(user_message["content"], "user")
         return messages
 
+    async def _augment_messages(
+        self, input_data: BatchInput, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Add context to the messages sent for this turn, without changing the
+        memory. Subclasses override it, e.g. to add recalled memories.
+
+        Args:
+            input_data: BatchInput - The input of this turn
+            messages: List[Dict[str, Any]] - The messages, the input last
+
+        Returns:
+            List[Dict[str, Any]] - The messages to send
+        """
+        return messages
+
     def _chat_function_factory(
         self, chat_func: Callable[[List[Dict[str, Any]], str], AsyncIterator[str]]
     ) -> Callable[..., AsyncIterator[SentenceOutput]]:
         """
-        Create the chat pipeline with transformers
+        Create the chat pipeline
 
-        The pipeline:
+        The pipeline (fused into one OutputPipeline pass per sentence):
         LLM tokens -> sentence_divider -> actions_extractor -> display_processor -> tts_filter
         """
-
-        @tts_filter(self._tts_preprocessor_config)
-        @display_processor()
-        @actions_extractor(self._live2d_model)
-        @sentence_divider(
+        pipeline = OutputPipeline(
+            live2d_model=self._live2d_model,
+            tts_preprocessor_config=self._tts_preprocessor_config,
             faster_first_response=self._faster_first_response,
             segment_method=self._segment_method,
             valid_tags=["think"],
+            language_cache=self._language_cache,
+            adaptive_chunking=self._adaptive_chunking,
         )
-        async def chat_with_memory(input_data: BatchInput) -> AsyncIterator[str]:
+
+        async def llm_stream(input_data: BatchInput) -> AsyncIterator[str]:
+            messages = self._to_messages(input_data)
+            system = self._context_window.system_prompt(self._system)
+            messages = await self._augment_messages(input_data, messages)
+            # Without a loaded history, the LLM must not keep the prompt's
+            # state as the state of the history another session selected
+            self._llm.set_history(*(self._history_uids or (None, None)))
+            async for token in chat_func(messages, system):
+                yield token
+
+        async def token_stream(input_data: BatchInput) -> AsyncIterator[str]:
+            complete_response = ""
+            # Tokens that arrive while a batch is processed come in one batch
+            async for tokens in coalesce_tokens(llm_stream(input_data)):
+                complete_response += tokens
+                yield tokens
+
+            # Store complete response
+            self._add_message(complete_response, "assistant")
+
+        async def chat_with_memory(
+            input_data: BatchInput,
+        ) -> AsyncIterator[SentenceOutput]:
             """
             Chat implementation with memory and processing pipeline
 
@@ -261,34 +345,10 @@ class BasicMemoryAgent(AgentInterface):
                 input_data: BatchInput
 
             Returns:
-                AsyncIterator[str] - Token stream from LLM
+                AsyncIterator[SentenceOutput] - Sentences of the response
             """
-            response_buffer = asyncio.Queue()
-            complete_response = ""
-
-            async def prebuffer_stream():
-                try:
-                    messages = self._to_messages(input_data)
-                    async for token in chat_func(messages, self._system): 
-                        await response_buffer.put(token)
-                except Exception as e:
-                    logger.error(f"💥 Error in token stream: {e}")
-                finally:
-                    await response_buffer.put(None)  # End-of-stream marker
-
-            # Start streaming in background
-            asyncio.create_task(prebuffer_stream())
-
-            # Read from buffer and yield
-            while True:
-                token = await response_buffer.get()
-                if token is None:
-                    break
-                complete_response += token
-                yield token
-
-            # Store complete response
-            self._add_message(complete_response, "assistant")
+            async for output in pipeline.process(token_stream(input_data)):
+                yield output
 
         return chat_with_memory
 
@@ -302,6 +362,14 @@ class BasicMemoryAgent(AgentInterface):
         """
         self._interrupt_handled = False
 
+    def set_tts_status(self, tts_status: TTSQueueStatus | None) -> None:
+        """
+        Size the sentence chunks to the TTS queue of the current conversation
+        turn, if adaptive chunking is enabled.
+        """
+        if self._adaptive_chunking:
+            self._adaptive_chunking.tts_status = tts_status
+
     def start_group_conversation(
         self, human_name: str, ai_participants: List[str]
     ) -> None:
@@ -0,0 +1,205 @@
+"""
+Agent with long-term memory of past conversations, stored locally.
+
+Every exchange (a user message and the reply) is embedded and stored in a
+`VectorStore` of the character. On each turn the exchanges most similar to the
+input are recalled within a latency budget and sent in front of the input,
+so the character remembers conversations that are no longer in its context
+window or in the current chat history.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Set
+
+from loguru import logger
+
+from .basic_memory_agent import BasicMemoryAgent
+from ..input_types import BatchInput
+from ..output_types import DisplayText
+from ..stateless_llm.stateless_llm_interface import StatelessLLMInterface
+from ..vector_memory import Embedder, get_vector_store
+from ...utils.metrics import metrics
+
+
+class VectorMemoryAgent(BasicMemoryAgent):
+    """
+    BasicMemoryAgent that recalls relevant exchanges of earlier conversations
+    from a local vector store.
+    """
+
+    def __init__(
+        self,
+        llm: StatelessLLMInterface,
+        system: str,
+        live2d_model,
+        embedder: Embedder,
+        memory_dir: str = "memory",
+        conf_uid: str = "default",
+        top_k: int = 5,
+        min_score: float = 0.3,
+        retrieval_budget_ms: float = 20.0,
+        **kwargs,
+    ):
+        """
+        Initialize the agent
+
+        Args:
+            llm: `StatelessLLMInterface` - The LLM to use
+            system: `str` - System prompt
+            live2d_model: `Live2dModel` - Model for expression extraction
+            embedder: `Embedder` - Embeds the exchanges and the inputs
+            memory_dir: `str` - Directory of the memory stores
+            conf_uid: `str` - Character whose memories are used
+            top_k: `int` - Most memories recalled per turn
+            min_score: `float` - Lowest cosine similarity of a recalled memory
+            retrieval_budget_ms: `float` - Time the vector search may take
+            **kwargs: Arguments of `BasicMemoryAgent`
+        """
+        self._embedder = embedder
+        # Each embedder has its own vector space. Agents of the same character,
+        # e.g. after a config switch, share the store.
+        self._store = get_vector_store(
+            os.path.join(memory_dir, os.path.basename(conf_uid), embedder.name),
+            latency_budget_ms=retrieval_budget_ms,
+        )
+        self._top_k = top_k
+        self._min_score = min_score
+        # Input of the current turn, stored with the reply
+        self._last_input: str | None = None
+        # Chat history the exchanges are stored for, or an id of the
+        # conversation if no history is loaded
+        self._conversation = uuid.uuid4().hex
+        self._store_tasks: Set[asyncio.Task] = set()
+
+        self._recall_ms = metrics.summary(
+            "memory_recall_ms", "Time to recall memories for a turn (ms)"
+        )
+        self._stored = metrics.counter(
+            "memories_stored", "Exchanges stored as memories"
+        )
+        super().__init__(llm=llm, system=system, live2d_model=live2d_model, **kwargs)
+        logger.info(
+            f"VectorMemoryAgent initialized with {self._store.count} memories "
+            f"in {self._store.directory}"
+        )
+
+    def _add_message(
+        self,
+        message: str | List[Dict[str, Any]],
+        role: str,
+        display_text: DisplayText | None = None,
+    ):
+        """Add a message to the memory and store each completed exchange"""
+        super()._add_message(message, role, display_text)
+        content = self._memory[-1]["content"]
+        if role == "user":
+            self._last_input = content
+        elif role == "assistant" and self._last_input is not None and content:
+            self._remember(
+                f"User: {self._last_input}\nYou: {content}",
+                {"conversation": self._conversation, "input": self._last_input},
+            )
+            self._last_input = None
+
+    def set_memory_from_history(self, conf_uid: str, history_uid: str) -> None:
+        """Load the memory from chat history"""
+        super().set_memory_from_history(conf_uid, history_uid)
+        self._last_input = None
+        self._conversation = history_uid
+
+    def new_session(self) -> "VectorMemoryAgent":
+        """Create an agent for one client session, sharing the memory store"""
+        session = super().new_session()
+        session._last_input = None
+        session._conversation = uuid.uuid4().hex
+        session._store_tasks = set()
+        return session
+
+    def _remember(self, text: str, extra: Dict[str, Any]) -> None:
+        """Embed and store an exchange and its record fields in the background"""
+        task = asyncio.get_running_loop().create_task(
+            asyncio.to_thread(self._store_exchange, text, extra)
+        )
+        # Keep a reference until it is done
+        self._store_tasks.add(task)
+        task.add_done_callback(self._store_tasks.discard)
+
+    def _store_exchange(self, text: str, extra: Dict[str, Any]) -> None:
+        try:
+            self._store.add([text], self._embedder.embed([text]), [extra])
+        except Exception as e:
+            logger.error(f"Failed to store memory: {e}")
+            return
+        self._stored.inc()
+
+    def _recall(self, query: str) -> List[Dict[str, Any]]:
+        """The stored exchanges most similar to the query"""
+        # Exchanges of this conversation still in the context window are not
+        # recalled. They are told apart by their input: the replies in a
+        # loaded history are stored without the emotion tags.
+        conversation = self._conversation
+        in_window = {
+            message["content"]
+            for message in self._memory[:-1]  # the last one is the query
+            if message["role"] == "user"
+        }
+        results = self._store.search(
+            self._embedder.embed([query])[0], self._top_k + len(in_window)
+        )
+        ids = [memory_id for memory_id, score in results if score >= self._min_score]
+        memories = [
+            memory
+            for memory in (self._store.get_texts(ids) if ids else [])
+            if memory.get("conversation") != conversation
+            or memory.get("input") not in in_window
+        ]
+        return memories[: self._top_k]
+
+    async def _augment_messages(
+        self, input_data: BatchInput, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Send the recalled memories in front of the input. The system prompt
+        and the earlier messages stay the same, so prompt caches still hit.
+        """
+        query = self._to_text_prompt(input_data)
+        if not query.strip() or self._store.count == 0:
+            return messages
+
+        started = time.perf_counter()
+        try:
+            memories = await asyncio.to_thread(self._recall, query)
+        except Exception as e:
+            logger.error(f"Failed to recall memories: {e}")
+            return messages
+        self._recall_ms.observe((time.perf_counter() - started) * 1000)
+        if not memories:
+            return messages
+
+        recalled = "\n".join(
+            f"- ({datetime.fromtimestamp(memory['time']):%Y-%m-%d}) "
+            + memory["text"].replace("\n", " / ")
+            for memory in memories
+        )
+        logger.debug(f"Recalled memories: '''{recalled}'''")
+        prefix = (
+            f"[Memories of earlier conversations that may be relevant:\n{recalled}]\n\n"
+        )
+
+        user_message = dict(messages[-1])
+        content = user_message["content"]
+        if isinstance(content, list):
+            # Put the memories in the first text item
+            content = [dict(item) for item in content]
+            for item in content:
+                if item.get("type") == "text":
+                    item["text"] = prefix + item["text"]
+                    break
+        else:
+            content = prefix + content
+        user_message["content"] = content
+        return [*messages[:-1], user_message]
@@ -0,0 +1,254 @@
+"""
+Token-budgeted context window for agents with chat memory.
+
+The memory of an agent is trimmed to a token budget before each turn: the
+leading system messages and the most recent turns are kept, older turns are
+moved out and folded into a rolling summary. The summary is written by an LLM
+in a background task, so it never delays a response; until it is ready, the
+previous summary is used. The summary is sent as part of the system prompt.
+"""
+
+import asyncio
+import copy
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from .stateless_llm.stateless_llm_interface import (
+    LLMErrorMessage,
+    StatelessLLMInterface,
+)
+from ..utils.metrics import metrics
+from prompts import prompt_loader
+
+# Han, kana and Hangul characters are about one token each
+_CJK = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_THINK = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+# Tokens a chat template adds around each message (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Share of the budget the memory is trimmed to once it is over the budget.
+# Trimming more than needed keeps the start of the prompt the same for the
+# next turns, so provider-side prompt caches can hit.
+TRIM_RATIO = 0.75
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of text: one per CJK character, one per 4 others"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def hf_token_counter(tokenizer_name: str) -> Callable[[str], int]:
+    """
+    Count tokens with a Hugging Face tokenizer, e.g. the tokenizer of the
+    model the LLM runs.
+
+    Args:
+        tokenizer_name: Name or path of the tokenizer
+    """
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(item.get("text", "") for item in content)
+    return content
+
+
+class ContextWindow:
+    """
+    Keeps an agent's memory within a token budget, summarizing what falls out.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 0,
+        summary_llm: Optional[StatelessLLMInterface] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Args:
+            max_tokens: Token budget of the prompt (system prompt, summary and
+                messages). 0 disables trimming; prompt tokens are still counted.
+            summary_llm: LLM that folds old turns into the summary. Without
+                one, old turns are dropped.
+            count_tokens: Function counting the tokens of a text. Defaults to
+                a character heuristic.
+        """
+        self.max_tokens = max_tokens
+        self.summary_llm = summary_llm
+        # Messages are counted once, not on every turn they stay in memory
+        self._count_tokens = lru_cache(maxsize=4096)(count_tokens or estimate_tokens)
+        self.summary = ""
+        # Messages moved out of the window and not summarized yet
+        self._folded: List[Dict[str, Any]] = []
+        self._summary_task: Optional[asyncio.Task] = None
+
+        self._prompt_tokens = metrics.summary(
+            "llm_prompt_tokens", "Tokens of the prompt sent to the LLM per turn"
+        )
+        self._summaries = metrics.counter(
+            "context_summaries", "Rolling summaries of old turns written"
+        )
+        self._evicted = metrics.counter(
+            "context_evicted_messages", "Messages moved out of the context window"
+        )
+
+    def new_session(self) -> "ContextWindow":
+        """
+        An empty window with the same budget and summary LLM, e.g. for
+        another client. The token counts cached so far are shared.
+        """
+        window = copy.copy(self)
+        window.summary = ""
+        window._folded = []
+        window._summary_task = None
+        return window
+
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        return self._count_tokens(_message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+
+    def system_prompt(self, system: str) -> str:
+        """The system prompt with the summary of the earlier conversation"""
+        if not self.summary:
+            return system
+        return f"{system}\n\nSummary of the earlier conversation:\n{self.summary}"
+
+    def fit(
+        self,
+        memory: List[Dict[str, Any]],
+        system: str,
+        new_message: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Trim memory in place so memory and the new message fit the budget.
+
+        The leading system messages stay. Once over the budget, the oldest
+        turns after them are moved out until TRIM_RATIO of the budget is
+        used, a whole turn at a time so the window starts with a user
+        message, and queued for the summary.
+
+        Args:
+            memory: The agent's memory, oldest message first
+            system: The system prompt
+            new_message: The message about to be added, if any. The prompt
+                tokens of the turn are recorded when it is given.
+
+        Returns:
+            int: Tokens of the prompt
+        """
+        pinned = 0
+        while pinned < len(memory) and memory[pinned]["role"] == "system":
+            pinned += 1
+
+        fixed = self._count_tokens(self.system_prompt(system))
+        if new_message is not None:
+            fixed += self.message_tokens(new_message)
+        total = fixed + sum(self.message_tokens(message) for message in memory)
+
+        evicted = []
+        if self.max_tokens and total > self.max_tokens:
+            target = int(self.max_tokens * TRIM_RATIO)
+            end = pinned
+            while end < len(memory) and (
+                total > target or memory[end]["role"] != "user"
+            ):
+                total -= self.message_tokens(memory[end])
+                end += 1
+            evicted = memory[pinned:end]
+            del memory[pinned:end]
+            self._evicted.inc(len(evicted))
+        self._fold(evicted)
+
+        if new_message is not None:
+            self._prompt_tokens.observe(total)
+        return total
+
+    def reset(self) -> None:
+        """Forget the summary, e.g. when another chat history is loaded"""
+        if self._summary_task:
+            self._summary_task.cancel()
+            self._summary_task = None
+        self.summary = ""
+        self._folded = []
+
+    def _fold(self, messages: List[Dict[str, Any]]) -> None:
+        """Queue messages for the summary and summarize the queued ones"""
+        if self.summary_llm is None:
+            return
+        self._folded.extend(messages)
+        if not self._folded:
+            return
+        if self._summary_task and not self._summary_task.done():
+            # The running task picks them up when it is done
+            return
+        try:
+            self._summary_task = asyncio.get_running_loop().create_task(
+                self._summarize()
+            )
+        except RuntimeError:
+            # No event loop yet, the next turn starts the task
+            pass
+
+    def _batch_size(self) -> int:
+        """Number of the oldest queued messages that fit the budget, at least one"""
+        budget = self.max_tokens or None
+        size = 0
+        for message in self._folded:
+            if budget is not None:
+                budget -= self.message_tokens(message)
+                if budget < 0 and size:
+                    break
+            size += 1
+        return size
+
+    async def _summarize(self) -> None:
+        """
+        Fold the queued messages into the summary, oldest first and as many
+        at a time as fit the budget, until none are left
+        """
+        while self._folded:
+            size = self._batch_size()
+            transcript = "\n".join(
+                f"{message['role']}: {_message_text(message)}"
+                for message in self._folded[:size]
+            )
+            prompt = (
+                f"Current summary:\n{self.summary or '(none)'}\n\n"
+                f"New messages:\n{transcript}"
+            )
+            try:
+                # The summary belongs to no chat history
+                self.summary_llm.set_history(None, None)
+                tokens = []
+                async for token in self.summary_llm.chat_completion(
+                    [{"role": "user", "content": prompt}],
+                    prompt_loader.load_util("conversation_summary_prompt"),
+                ):
+                    # Some clients report failures as the reply
+                    if isinstance(token, LLMErrorMessage):
+                        raise RuntimeError(token)
+                    tokens.append(token)
+                summary = _THINK.sub("", "".join(tokens)).strip()
+                if summary.startswith("Error:"):
+                    raise RuntimeError(summary)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to summarize the conversation: {e}")
+                # The messages stay queued, try again on the next turn
+                return
+            # Messages evicted meanwhile were queued after these
+            del self._folded[:size]
+            if summary:
+                self.summary = summary
+                self._summaries.inc()
+                logger.debug(f"Conversation summary updated: '''{summary}'''")
@@ -3,11 +3,17 @@ This class is responsible for handling asynchronous interaction with Claude API
 for language generation.
 """
 
+import time
 from typing import AsyncIterator, List, Dict, Any
 from anthropic import AsyncAnthropic, AsyncStream
 from loguru import logger
 
 from .stateless_llm_interface import StatelessLLMInterface
+from . import llm_metrics
+
+# Marks the end of a prefix the API caches: later requests starting with the
+# same prefix read it from the cache instead of processing it again.
+CACHE_BREAKPOINT = {"type": "ephemeral"}
 
 
 class AsyncLLM(StatelessLLMInterface):
@@ -71,6 +77,29 @@ class AsyncLLM(StatelessLLMInterface):
         print("new_content", new_content)
         return {"role": message["role"], "content": new_content}
 
+    def _with_cache_breakpoint(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Copy of a message with a prompt-cache breakpoint on its last content
+        block. The memory of the agent is not changed.
+        """
+        content = message["content"]
+        if isinstance(content, str):
+            if not content:
+                return message
+            blocks = [{"type": "text", "text": content}]
+        else:
+            if not content:
+                return message
+            blocks = [dict(block) for block in content]
+        blocks[-1]["cache_control"] = CACHE_BREAKPOINT
+        return {**message, "content": blocks}
+
+    def _system_blocks(self, system: str) -> List[Dict[str, Any]] | str:
+        """The system prompt as a text block with a prompt-cache breakpoint"""
+        if not system:
+            return ""
+        return [{"type": "text", "text": system, "cache_control": CACHE_BREAKPOINT}]
+
     async def chat_completion(
         self, messages: List[Dict[str, Any]], system: str = None
     ) -> AsyncIterator[str]:
@@ -91,18 +120,43 @@ class AsyncLLM(StatelessLLMInterface):
                 for msg in messages
                 if msg["role"] != "system"
             ]
+            # Cache the system prompt, and the conversation up to the newest
+            # message so the next turn only processes what was added.
+            if filtered_messages:
+                filtered_messages[-1] = self._with_cache_breakpoint(
+                    filtered_messages[-1]
+                )
 
             logger.debug(f"Sending messages to Claude API: {filtered_messages}")
+            started = time.perf_counter()
+            first_token = True
             stream: AsyncStream = await self.client.messages.create(
                 messages=filtered_messages,
-                system=system if system else (self.system if self.system else ""),
+                system=self._system_blocks(
+                    system if system else (self.system if self.system else "")
+                ),
                 model=self.model,
                 max_tokens=1024,
                 stream=True,
             )
 
             async for chunk in stream:
-                if chunk.type == "content_block_delta":
+                if chunk.type == "message_start":
+                    usage = chunk.message.usage
+                    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+                    cache_write = (
+                        getattr(usage, "cache_creation_input_tokens", None) or 0
+                    )
+                    # input_tokens only counts the tokens after the last cache hit
+                    llm_metrics.record_usage(
+                        usage.input_tokens + cache_read + cache_write,
+                        cached_tokens=cache_read,
+                        cache_write=cache_write,
+                    )
+                elif chunk.type == "content_block_delta":
+                    if first_token:
+                        llm_metrics.record_first_token(started)
+                        first_token = False
                     if chunk.delta.text is None:
                         chunk.delta.text = ""
                     yield chunk.delta.text
@@ -1,19 +1,45 @@
 """Description: This file contains the implementation of the LLM class using llama.cpp.
 This class provides a stateless interface to llama.cpp for language generation.
+
+The model state (KV cache) of the last prompt is kept: llama.cpp only
+evaluates the part of the next prompt that does not extend it. When another
+chat history is selected, the state of the current one is saved to a session
+file and the state of the selected one is loaded, so switching or resuming a
+history does not evaluate its whole prompt again.
 """
 
 import asyncio
-from typing import AsyncIterator, List, Dict, Any
+import atexit
+import ctypes
+import os
+import threading
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+
+import llama_cpp
+import numpy as np
 from llama_cpp import Llama
 from loguru import logger
 
 from .stateless_llm_interface import StatelessLLMInterface
+from . import llm_metrics
+from ...utils.metrics import metrics
+
+# Renamed in newer llama.cpp versions
+_state_save_file = getattr(llama_cpp, "llama_state_save_file", None) or getattr(
+    llama_cpp, "llama_save_session_file"
+)
+_state_load_file = getattr(llama_cpp, "llama_state_load_file", None) or getattr(
+    llama_cpp, "llama_load_session_file"
+)
 
 
 class LLM(StatelessLLMInterface):
     def __init__(
         self,
         model_path: str,
+        state_dir: str = "cache/llama_state",
+        max_state_files: int = 8,
         **kwargs,
     ):
         """
@@ -21,6 +47,10 @@ class LLM(StatelessLLMInterface):
 
         Parameters:
         - model_path (str): Path to the GGUF model file
+        - state_dir (str): Directory of the saved model states of chat
+            histories. Empty to not save them.
+        - max_state_files (int): Saved states to keep; the least recently
+            used are removed.
         - **kwargs: Additional arguments passed to Llama constructor
         """
         logger.info(f"Initializing llama cpp with model path: {model_path}")
@@ -31,6 +61,179 @@ class LLM(StatelessLLMInterface):
             logger.critical(f"Failed to initialize Llama model: {e}")
             raise
 
+        # States only fit the model they were made with
+        self.state_dir = (
+            os.path.join(state_dir, os.path.splitext(os.path.basename(model_path))[0])
+            if state_dir
+            else ""
+        )
+        self.max_state_files = max_state_files
+        # The model is used by one request at a time
+        self._lock = threading.Lock()
+        # History the kept state belongs to, and the one the next request
+        # continues
+        self._state_history: Optional[Tuple[str, str]] = None
+        self._history: Optional[Tuple[str, str]] = None
+
+        self._prefill_saved = metrics.counter(
+            "llama_cpp_prefill_tokens_saved",
+            "Prompt tokens llama.cpp did not evaluate again thanks to a kept state",
+        )
+        self._prefill_tokens = metrics.counter(
+            "llama_cpp_prefill_tokens", "Prompt tokens llama.cpp evaluated"
+        )
+        self._state_loads = metrics.counter(
+            "llama_cpp_state_loads", "Model states of chat histories loaded"
+        )
+
+        if self.state_dir:
+            atexit.register(self._save_current_state)
+
+    def set_history(self, conf_uid: Optional[str], history_uid: Optional[str]) -> None:
+        """
+        Select the chat history the next request continues. Its state is
+        loaded before the request is generated. With None, the state of the
+        current history is saved and the next request belongs to no history.
+        """
+        self._history = (conf_uid, history_uid) if conf_uid and history_uid else None
+
+    def _state_path(self, history: Tuple[str, str]) -> str:
+        conf_uid, history_uid = (os.path.basename(uid) for uid in history)
+        return os.path.join(self.state_dir, conf_uid, f"{history_uid}.bin")
+
+    def _save_state(self, history: Tuple[str, str]) -> None:
+        """Save the tokens and KV cache of the kept state as a session file"""
+        n_tokens = self.llm.n_tokens
+        if n_tokens == 0:
+            return
+        path = self._state_path(history)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tokens = (llama_cpp.llama_token * n_tokens)(*self.llm.input_ids[:n_tokens])
+        started = time.perf_counter()
+        if not _state_save_file(self.llm.ctx, path.encode("utf-8"), tokens, n_tokens):
+            logger.warning(f"Failed to save llama.cpp state to {path}")
+            return
+        logger.debug(
+            f"Saved llama.cpp state of {n_tokens} tokens to {path} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        self._prune_state_files()
+
+    def _load_state(self, history: Tuple[str, str]) -> None:
+        """Load the session file of a history, if there is one"""
+        path = self._state_path(history)
+        if not os.path.exists(path):
+            return
+        capacity = self.llm.n_ctx()
+        tokens = (llama_cpp.llama_token * capacity)()
+        n_tokens = ctypes.c_size_t(0)
+        if not _state_load_file(
+            self.llm.ctx,
+            path.encode("utf-8"),
+            tokens,
+            capacity,
+            ctypes.byref(n_tokens),
+        ):
+            logger.warning(f"Failed to load llama.cpp state from {path}")
+            self.llm.reset()
+            return
+        self.llm.input_ids[: n_tokens.value] = tokens[: n_tokens.value]
+        self.llm.n_tokens = n_tokens.value
+        # Mark it used for pruning
+        os.utime(path)
+        self._state_loads.inc()
+        logger.debug(f"Loaded llama.cpp state of {n_tokens.value} tokens from {path}")
+
+    def _prune_state_files(self) -> None:
+        """Remove the least recently used session files over max_state_files"""
+        paths = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(self.state_dir)
+            for name in names
+            if name.endswith(".bin")
+        ]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[self.max_state_files :]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Failed to remove llama.cpp state {path}: {e}")
+
+    def _switch_state(self, history: Optional[Tuple[str, str]]) -> None:
+        """
+        Swap the kept state for the state of the given history. For None,
+        the kept state is saved and then belongs to no history.
+        """
+        if not self.state_dir or history == self._state_history:
+            return
+        try:
+            if self._state_history is not None:
+                self._save_state(self._state_history)
+            # Without a saved state, the kept one still shares the system
+            # prompt with the new prompt
+            if history is not None:
+                self._load_state(history)
+        except Exception as e:
+            # The states are a cache, the prompt is evaluated without one
+            logger.warning(f"Failed to switch llama.cpp state: {e}")
+            self.llm.reset()
+        self._state_history = history
+
+    def _save_current_state(self) -> None:
+        """Save the state of the current history, e.g. at exit"""
+        with self._lock:
+            if self._state_history is not None:
+                try:
+                    self._save_state(self._state_history)
+                except Exception as e:
+                    logger.warning(f"Failed to save llama.cpp state: {e}")
+
+    def _record_prefill(self, previous_tokens: np.ndarray) -> None:
+        """Record how much of the prompt the kept state covered"""
+        # The prompt has been evaluated and one token generated
+        prompt = self.llm.input_ids[: max(self.llm.n_tokens - 1, 0)]
+        size = min(len(previous_tokens), len(prompt))
+        mismatch = np.flatnonzero(previous_tokens[:size] != prompt[:size])
+        saved = int(mismatch[0]) if len(mismatch) else size
+        self._prefill_saved.inc(saved)
+        self._prefill_tokens.inc(len(prompt) - saved)
+        llm_metrics.record_usage(len(prompt), cached_tokens=saved)
+
+    def _generate(
+        self,
+        messages: List[Dict[str, Any]],
+        history: Optional[Tuple[str, str]],
+        stopped: threading.Event,
+        put,
+    ) -> None:
+        """Stream a completion in a worker thread, passing chunks to `put`"""
+        with self._lock:
+            try:
+                self._switch_state(history)
+                previous_tokens = self.llm.input_ids[: self.llm.n_tokens].copy()
+                chat_completion = self.llm.create_chat_completion(
+                    messages=messages,
+                    stream=True,
+                )
+                first_chunk = True
+                try:
+                    for chunk in chat_completion:
+                        if first_chunk:
+                            self._record_prefill(previous_tokens)
+                            first_chunk = False
+                        if stopped.is_set():
+                            break
+                        if chunk.get("choices") and chunk["choices"][0].get("delta"):
+                            content = chunk["choices"][0]["delta"].get("content", "")
+                            if content:
+                                put(content)
+                finally:
+                    chat_completion.close()
+            except Exception as e:
+                put(e)
+            finally:
+                put(None)
+
     async def chat_completion(
         self, messages: List[Dict[str, Any]], system: str = None
     ) -> AsyncIterator[str]:
@@ -46,31 +249,43 @@ class LLM(StatelessLLMInterface):
         """
         logger.debug(f"Generating completion for messages: {messages}")
 
-        try:
-            # Add system prompt if provided
-            messages_with_system = messages
-            if system:
-                messages_with_system = [
-                    {"role": "system", "content": system},
-                    *messages,
-                ]
-
-            # Create chat completion in a separate thread to avoid blocking
-            chat_completion = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.llm.create_chat_completion(
-                    messages=messages_with_system,
-                    stream=True,
-                ),
-            )
-
-            # Process chunks
-            for chunk in chat_completion:
-                if chunk.get("choices") and chunk["choices"][0].get("delta"):
-                    content = chunk["choices"][0]["delta"].get("content", "")
-                    if content:
-                        yield content
+        # Add system prompt if provided
+        messages_with_system = messages
+        if system:
+            messages_with_system = [
+                {"role": "system", "content": system},
+                *messages,
+            ]
 
-        except Exception as e:
-            logger.error(f"Error in chat completion: {e}")
-            raise
+        # Generate in a separate thread to avoid blocking
+        # Requests of other sessions may select another history before the
+        # model is free
+        history = self._history
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        started = time.perf_counter()
+        first_token = True
+        loop.run_in_executor(
+            None,
+            self._generate,
+            messages_with_system,
+            history,
+            stopped,
+            lambda item: loop.call_soon_threadsafe(queue.put_nowait, item),
+        )
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    logger.error(f"Error in chat completion: {item}")
+                    raise item
+                if first_token:
+                    llm_metrics.record_first_token(started)
+                    first_token = False
+                yield item
+        finally:
+            # On interrupt, stop generating after the current token
+            stopped.set()
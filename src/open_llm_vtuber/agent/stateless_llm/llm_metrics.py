@@ -0,0 +1,50 @@
+"""
+Metrics of LLM requests, shared by the stateless LLM clients.
+
+Prompt tokens and prompt-cache hits are the numbers the provider reports, so
+the effect of provider-side prompt caching on time to first token can be
+measured.
+"""
+
+import time
+
+from ...utils.metrics import metrics
+
+input_tokens = metrics.counter(
+    "llm_input_tokens", "Prompt tokens reported by the LLM provider"
+)
+cache_read_tokens = metrics.counter(
+    "llm_cache_read_tokens", "Prompt tokens read from the provider's prompt cache"
+)
+cache_write_tokens = metrics.counter(
+    "llm_cache_write_tokens", "Prompt tokens written to the provider's prompt cache"
+)
+cache_hit_ratio = metrics.summary(
+    "llm_cache_hit_ratio", "Share of the prompt tokens of a request read from cache"
+)
+time_to_first_token = metrics.summary(
+    "llm_time_to_first_token_ms", "Time from sending a request to its first token (ms)"
+)
+
+
+def record_usage(
+    prompt_tokens: int, cached_tokens: int = 0, cache_write: int = 0
+) -> None:
+    """
+    Record the prompt tokens of a request.
+
+    Args:
+        prompt_tokens: All prompt tokens, including the cached ones
+        cached_tokens: Prompt tokens read from the prompt cache
+        cache_write: Prompt tokens written to the prompt cache
+    """
+    input_tokens.inc(prompt_tokens)
+    cache_read_tokens.inc(cached_tokens)
+    cache_write_tokens.inc(cache_write)
+    if prompt_tokens:
+        cache_hit_ratio.observe(cached_tokens / prompt_tokens)
+
+
+def record_first_token(started: float) -> None:
+    """Record the time to first token of a request sent at `started` (perf_counter)"""
+    time_to_first_token.observe((time.perf_counter() - started) * 1000)
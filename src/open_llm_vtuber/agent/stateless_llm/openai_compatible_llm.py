@@ -3,18 +3,21 @@ This class is responsible for handling asynchronous interaction with OpenAI API
 endpoints for language generation.
 """
 
+import time
 from typing import AsyncIterator, List, Dict, Any
 from openai import (
     AsyncStream,
     AsyncOpenAI,
     APIError,
     APIConnectionError,
+    BadRequestError,
     RateLimitError,
 )
 from openai.types.chat import ChatCompletionChunk
 from loguru import logger
 
-from .stateless_llm_interface import StatelessLLMInterface
+from .stateless_llm_interface import LLMErrorMessage, StatelessLLMInterface
+from . import llm_metrics
 
 
 class AsyncLLM(StatelessLLMInterface):
@@ -47,9 +50,59 @@ class AsyncLLM(StatelessLLMInterface):
             project=project_id,
             api_key=llm_api_key,
         )
+        # Whether to ask for the token usage, until the server rejects it
+        self._stream_usage = True
 
         logger.info(f"Initialized AsyncLLM with: {self.base_url}, model: {self.model}")
 
+    @staticmethod
+    def _record_usage(chunk: ChatCompletionChunk) -> None:
+        """
+        Record the prompt tokens of the usage chunk at the end of a stream.
+        Servers report prompt-cache hits in different fields: OpenAI and vLLM
+        in `prompt_tokens_details.cached_tokens`, DeepSeek in
+        `prompt_cache_hit_tokens`, the llama.cpp server in `timings.cache_n`.
+        """
+        usage = chunk.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None)
+        if cached is None:
+            cached = getattr(usage, "prompt_cache_hit_tokens", None)
+        if cached is None:
+            timings = getattr(chunk, "timings", None) or {}
+            cached = timings.get("cache_n") if isinstance(timings, dict) else None
+        llm_metrics.record_usage(usage.prompt_tokens or 0, cached_tokens=cached or 0)
+
+    async def _create_stream(
+        self, messages: List[Dict[str, Any]]
+    ) -> AsyncStream[ChatCompletionChunk]:
+        """
+        Start a streamed completion, asking for the token usage in a last
+        chunk. Servers that do not support `stream_options` reject the
+        request; it is then sent without it, from now on.
+        """
+        params = dict(
+            messages=messages,
+            model=self.model,
+            stream=True,
+            temperature=self.temperature,
+        )
+        if self._stream_usage:
+            try:
+                return await self.client.chat.completions.create(
+                    **params, stream_options={"include_usage": True}
+                )
+            except BadRequestError as e:
+                # Raises again if the request itself is the problem
+                stream = await self.client.chat.completions.create(**params)
+                self._stream_usage = False
+                logger.warning(
+                    f"{self.base_url} does not support stream_options, "
+                    f"token usage is not recorded: {e}"
+                )
+                return stream
+        return await self.client.chat.completions.create(**params)
+
     async def chat_completion(
         self, messages: List[Dict[str, Any]], system: str = None
     ) -> AsyncIterator[str]:
@@ -71,7 +124,10 @@ class AsyncLLM(StatelessLLMInterface):
         logger.debug(f"Messages: {messages}")
         stream = None
         try:
-            # If system prompt is provided, prepend it
+            # If system prompt is provided, prepend it.
+            # The request starts with the system prompt and the messages in
+            # the order and form they were sent before, so servers with
+            # prefix caching only process what was added since the last turn.
             messages_with_system = messages
             if system:
                 messages_with_system = [
@@ -79,42 +135,42 @@ class AsyncLLM(StatelessLLMInterface):
                     *messages,
                 ]
 
-            stream: AsyncStream[
-                ChatCompletionChunk
-            ] = await self.client.chat.completions.create(
-                messages=messages_with_system,
-                model=self.model,
-                stream=True,
-                temperature=self.temperature,
-            )
+            started = time.perf_counter()
+            first_token = True
+            stream = await self._create_stream(messages_with_system)
 
             async for chunk in stream:
+                if chunk.usage:
+                    self._record_usage(chunk)
                 if not chunk.choices:
+                    if chunk.usage:
+                        continue
                     logger.warning("⚠️ Received chunk with no choices: %s", chunk)
                     continue
 
                 delta = getattr(chunk.choices[0], "delta", None)
                 if not delta:
-                    logger.warning("⚠️ Delta missing in chunk. Skipping. Chunk: %s", chunk)
+                    logger.warning(
+                        "⚠️ Delta missing in chunk. Skipping. Chunk: %s", chunk
+                    )
                     continue
 
                 content = getattr(delta, "content", "")
                 if content is None:
                     content = ""
 
+                if first_token and content:
+                    llm_metrics.record_first_token(started)
+                    first_token = False
                 yield content
 
         except APIConnectionError as e:
-            logger.error(
-                f"🌐 Connection error calling chat endpoint: {e.__cause__}"
-            )
-            yield "Error: Failed to connect to the LLM API."
+            logger.error(f"🌐 Connection error calling chat endpoint: {e.__cause__}")
+            yield LLMErrorMessage("Error: Failed to connect to the LLM API.")
 
         except RateLimitError as e:
-            logger.error(
-                f"🚫 Rate limit exceeded: {e.response}"
-            )
-            yield "Error: Rate limit exceeded. Please try again later."
+            logger.error(f"🚫 Rate limit exceeded: {e.response}")
+            yield LLMErrorMessage("Error: Rate limit exceeded. Please try again later.")
 
         except APIError as e:
             logger.error(f"🔥 API error occurred: {e}")
@@ -122,7 +178,9 @@ class AsyncLLM(StatelessLLMInterface):
             logger.info(f"Model: {self.model}")
             logger.info(f"Messages: {messages}")
             logger.info(f"Temperature: {self.temperature}")
-            yield "Error: Something went wrong while generating response."
+            yield LLMErrorMessage(
+                "Error: Something went wrong while generating response."
+            )
 
         finally:
             if stream:
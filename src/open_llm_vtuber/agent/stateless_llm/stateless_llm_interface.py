@@ -1,5 +1,13 @@
 import abc
-from typing import AsyncIterator, List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional
+
+
+class LLMErrorMessage(str):
+    """
+    Message about a failed request, yielded by `chat_completion` in place of
+    the reply so the user hears what went wrong. Callers that do not speak
+    to the user (e.g. summarization) check for it and treat it as a failure.
+    """
 
 
 class StatelessLLMInterface(metaclass=abc.ABCMeta):
@@ -31,7 +39,8 @@ class StatelessLLMInterface(metaclass=abc.ABCMeta):
         - system (str, optional): System prompt to use for this completion.
 
         Yields:
-        - str: The content of each chunk from the API response.
+        - str: The content of each chunk from the API response, or an
+          `LLMErrorMessage` if the request failed and the error is not raised.
 
         Raises:
         - APIConnectionError: When the server cannot be reached
@@ -39,3 +48,19 @@ class StatelessLLMInterface(metaclass=abc.ABCMeta):
         - APIError: For other API-related errors
         """
         raise NotImplementedError
+
+    def set_history(self, conf_uid: Optional[str], history_uid: Optional[str]) -> None:
+        """
+        Tell the LLM which chat history the next request continues. Agents
+        call it right before each request, as sessions share the LLM; with
+        None for requests that belong to no saved history.
+
+        LLMs that keep state between requests (e.g. the KV cache of a local
+        model) use it to save and restore the state of each history. The
+        messages are still sent in full; the default does nothing.
+
+        Parameters:
+        - conf_uid (str): The character configuration, or None
+        - history_uid (str): The chat history, or None
+        """
+        pass
@@ -52,6 +52,8 @@ class LLMFactory:
 
             return LlamaLLM(
                 model_path=kwargs.get("model_path"),
+                state_dir=kwargs.get("state_dir", "cache/llama_state"),
+                max_state_files=kwargs.get("max_state_files", 8),
             )
         elif llm_provider == "claude_llm":
             return ClaudeLLM(
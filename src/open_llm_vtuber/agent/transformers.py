@@ -1,18 +1,71 @@
-from typing import AsyncIterator, Tuple, Callable, List
+import asyncio
+from typing import AsyncIterator, Tuple, Callable, List, Optional
 from functools import wraps
 from .output_types import Actions, SentenceOutput, DisplayText
 from ..utils.tts_preprocessor import tts_filter as filter_text
 from ..live2d_model import Live2dModel
 from ..config_manager import TTSPreprocessorConfig
 from ..utils.sentence_divider import SentenceDivider
-from ..utils.sentence_divider import SentenceWithTags, TagState
+from ..utils.sentence_divider import AdaptiveChunking, SentenceWithTags, TagState
+from ..utils.language_id import LanguageCache
 from loguru import logger
 
 
+def extract_actions(
+    sentence: SentenceWithTags, live2d_model: Live2dModel
+) -> Tuple[Actions, SentenceWithTags]:
+    """
+    Extract the Live2D expressions of a sentence. Also returns the sentence
+    without its emotion keywords, which are neither displayed nor spoken.
+    """
+    actions = Actions()
+    # Only extract emotions for non-tag text
+    if not any(tag.state in [TagState.START, TagState.END] for tag in sentence.tags):
+        expressions, text = live2d_model.parse_emotions(sentence.text)
+        if expressions:
+            actions.expressions = expressions
+            sentence = SentenceWithTags(text=text, tags=sentence.tags)
+    return actions, sentence
+
+
+def to_display_text(sentence: SentenceWithTags) -> DisplayText:
+    """Map a sentence to the text displayed in the UI"""
+    text = sentence.text
+    # Handle think tag states
+    for tag in sentence.tags:
+        if tag.name == "think":
+            if tag.state == TagState.START:
+                text = "("
+            elif tag.state == TagState.END:
+                text = ")"
+
+    return DisplayText(text=text)  # Simplified DisplayText creation
+
+
+def to_tts_text(
+    sentence: SentenceWithTags,
+    display: DisplayText,
+    config: TTSPreprocessorConfig,
+) -> str:
+    """Filter the displayed text of a sentence for TTS. Think content is not spoken."""
+    if any(tag.name == "think" for tag in sentence.tags):
+        return ""
+    return filter_text(
+        text=display.text,
+        remove_special_char=config.remove_special_char,
+        ignore_brackets=config.ignore_brackets,
+        ignore_parentheses=config.ignore_parentheses,
+        ignore_asterisks=config.ignore_asterisks,
+        ignore_angle_brackets=config.ignore_angle_brackets,
+    )
+
+
 def sentence_divider(
     faster_first_response: bool = True,
     segment_method: str = "pysbd",
     valid_tags: List[str] = None,
+    language_cache: LanguageCache = None,
+    adaptive_chunking: AdaptiveChunking = None,
 ):
     """
     Decorator that transforms token stream into sentences with tags
@@ -21,6 +74,8 @@ def sentence_divider(
         faster_first_response: bool - Whether to enable faster first response
         segment_method: str - Method for sentence segmentation
         valid_tags: List[str] - List of valid tags to process
+        language_cache: LanguageCache - The session's language cache
+        adaptive_chunking: AdaptiveChunking - Policy to size chunks to the TTS queue
     """
 
     def decorator(
@@ -32,6 +87,8 @@ def sentence_divider(
                 faster_first_response=faster_first_response,
                 segment_method=segment_method,
                 valid_tags=valid_tags or [],
+                language_cache=language_cache,
+                adaptive_chunking=adaptive_chunking,
             )
             token_stream = func(*args, **kwargs)
             async for sentence in divider.process_stream(token_stream):
@@ -57,14 +114,7 @@ def actions_extractor(live2d_model: Live2dModel):
         ) -> AsyncIterator[Tuple[SentenceWithTags, Actions]]:
             sentence_stream = func(*args, **kwargs)
             async for sentence in sentence_stream:
-                actions = Actions()
-                # Only extract emotions for non-tag text
-                if not any(
-                    tag.state in [TagState.START, TagState.END] for tag in sentence.tags
-                ):
-                    expressions = live2d_model.extract_emotion(sentence.text)
-                    if expressions:
-                        actions.expressions = expressions
+                actions, sentence = extract_actions(sentence, live2d_model)
                 yield sentence, actions
 
         return wrapper
@@ -87,17 +137,7 @@ def display_processor():
             stream = func(*args, **kwargs)
 
             async for sentence, actions in stream:
-                text = sentence.text
-                # Handle think tag states
-                for tag in sentence.tags:
-                    if tag.name == "think":
-                        if tag.state == TagState.START:
-                            text = "("
-                        elif tag.state == TagState.END:
-                            text = ")"
-
-                display = DisplayText(text=text)  # Simplified DisplayText creation
-                yield sentence, display, actions
+                yield sentence, to_display_text(sentence), actions
 
         return wrapper
 
@@ -123,17 +163,7 @@ def tts_filter(
             config = tts_preprocessor_config or TTSPreprocessorConfig()
 
             async for sentence, display, actions in sentence_stream:
-                if any(tag.name == "think" for tag in sentence.tags):
-                    tts = ""
-                else:
-                    tts = filter_text(
-                        text=display.text,
-                        remove_special_char=config.remove_special_char,
-                        ignore_brackets=config.ignore_brackets,
-                        ignore_parentheses=config.ignore_parentheses,
-                        ignore_asterisks=config.ignore_asterisks,
-                        ignore_angle_brackets=config.ignore_angle_brackets,
-                    )
+                tts = to_tts_text(sentence, display, config)
 
                 logger.debug(f"[{display.name}] display: {display.text}")
                 logger.debug(f"[{display.name}] tts: {tts}")
@@ -147,3 +177,232 @@ def tts_filter(
         return wrapper
 
     return decorator
+
+
+async def coalesce_tokens(
+    token_stream: AsyncIterator[str],
+    max_delay: float = 0.0,
+    max_chars: int = 256,
+) -> AsyncIterator[str]:
+    """
+    Read a token stream in the background and yield the tokens in batches.
+
+    The stream is read as fast as it produces tokens; every batch holds all
+    tokens received since the previous one, up to `max_chars` characters.
+    Processing a batch costs about as much as processing a single token, so
+    the pipeline keeps up with fast LLMs. Errors in the stream are logged
+    and end it. Closing the batches cancels the stream.
+
+    Args:
+        token_stream: The LLM token stream
+        max_delay: Seconds to wait for more tokens after the first of a batch
+        max_chars: Maximum characters in a batch, unless a single token is longer
+    """
+    queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+    async def read_stream():
+        try:
+            async for token in token_stream:
+                queue.put_nowait(token)
+        except Exception as e:
+            logger.error(f"💥 Error in token stream: {e}")
+        finally:
+            queue.put_nowait(None)  # End-of-stream marker
+
+    reader = asyncio.create_task(read_stream())
+    try:
+        ended = False
+        while not ended:
+            token = await queue.get()
+            if token is None:
+                break
+            if max_delay:
+                await asyncio.sleep(max_delay)
+            batch = [token]
+            size = len(token)
+            while size < max_chars and not queue.empty():
+                token = queue.get_nowait()
+                if token is None:
+                    ended = True
+                    break
+                batch.append(token)
+                size += len(token)
+            yield "".join(batch)
+    finally:
+        # On interrupt, stop the LLM stream instead of letting it run to
+        # the end in the background. Cancelling closes the stream; wait for
+        # it, so the connection is released before the turn ends.
+        reader.cancel()
+        try:
+            await reader
+        except asyncio.CancelledError:
+            pass
+
+
+class OutputPipeline:
+    """
+    The sentence_divider, actions_extractor, display_processor and tts_filter
+    transformers fused into one pass.
+
+    Each sentence is turned into a SentenceOutput with one function call
+    instead of passing through four async generators.
+    """
+
+    def __init__(
+        self,
+        live2d_model: Live2dModel,
+        tts_preprocessor_config: TTSPreprocessorConfig = None,
+        faster_first_response: bool = True,
+        segment_method: str = "pysbd",
+        valid_tags: List[str] = None,
+        language_cache: LanguageCache = None,
+        adaptive_chunking: AdaptiveChunking = None,
+    ):
+        """
+        Args:
+            live2d_model: Live2dModel - Model for expression extraction
+            tts_preprocessor_config: TTSPreprocessorConfig - Configuration for TTS preprocessing
+            faster_first_response: bool - Whether to enable faster first response
+            segment_method: str - Method for sentence segmentation
+            valid_tags: List[str] - List of valid tags to process
+            language_cache: LanguageCache - The session's language cache
+            adaptive_chunking: AdaptiveChunking - Policy to size chunks to the TTS queue
+        """
+        self.live2d_model = live2d_model
+        self.tts_preprocessor_config = tts_preprocessor_config
+        self.faster_first_response = faster_first_response
+        self.segment_method = segment_method
+        self.valid_tags = valid_tags or []
+        self.language_cache = language_cache
+        self.adaptive_chunking = adaptive_chunking
+
+    def _process_sentence(
+        self, sentence: SentenceWithTags, config: TTSPreprocessorConfig
+    ) -> SentenceOutput:
+        """Extract actions, display text and TTS text of a sentence"""
+        actions, sentence = extract_actions(sentence, self.live2d_model)
+        display = to_display_text(sentence)
+        return SentenceOutput(
+            display_text=display,
+            tts_text=to_tts_text(sentence, display, config),
+            actions=actions,
+        )
+
+    async def process(
+        self, token_stream: AsyncIterator[str]
+    ) -> AsyncIterator[SentenceOutput]:
+        """
+        Turn a token stream into sentence outputs.
+
+        Args:
+            token_stream: Tokens (or batches of tokens) from the LLM
+
+        Yields:
+            SentenceOutput: One output per sentence
+        """
+        config = self.tts_preprocessor_config or TTSPreprocessorConfig()
+        divider = SentenceDivider(
+            faster_first_response=self.faster_first_response,
+            segment_method=self.segment_method,
+            valid_tags=self.valid_tags,
+            language_cache=self.language_cache,
+            adaptive_chunking=self.adaptive_chunking,
+        )
+        async for sentence in divider.process_stream(token_stream):
+            output = self._process_sentence(sentence, config)
+            logger.opt(lazy=True).debug(
+                "output pipeline: {} -> tts: {}",
+                lambda: sentence,
+                lambda: output.tts_text,
+            )
+            yield output
+
+
+if __name__ == "__main__":
+    # Benchmark: time per LLM token of the four chained transformers fed
+    # token by token versus OutputPipeline fed by coalesce_tokens, for an LLM that yields to the
+    # event loop after every token and one that never does (a fast local
+    # model or a buffered response).
+    import random
+    import time
+
+    from ..config_manager import TranslatorConfig
+
+    logger.remove()
+    config = TTSPreprocessorConfig(
+        remove_special_char=True,
+        translator_config=TranslatorConfig(
+            translate_audio=False, translate_provider="deeplx"
+        ),
+    )
+
+    class _Live2D:
+        def parse_emotions(self, text):
+            if "[joy]" not in text:
+                return [], text
+            return [3], text.replace("[joy]", "")
+
+    words = (
+        "Hello there, [joy] this is a test. <think>hmm, ok.</think> 你好，世界。 "
+        "Yes! No? Well... the quick brown fox jumps over the lazy dog."
+    ).split(" ")
+    rng = random.Random(0)
+    tokens = []
+    while len(tokens) < 20000:
+        word = rng.choice(words) + " "
+        i = 0
+        while i < len(word):
+            size = rng.randint(1, 4)
+            tokens.append(word[i : i + size])
+            i += size
+
+    async def llm(yield_every_token):
+        for token in tokens:
+            if yield_every_token:
+                await asyncio.sleep(0)
+            yield token
+
+    def chained(yield_every_token):
+        @tts_filter(config)
+        @display_processor()
+        @actions_extractor(_Live2D())
+        @sentence_divider(segment_method="regex", valid_tags=["think"])
+        async def chat():
+            # The token stream is read through a queue, as the agents did
+            # before coalesce_tokens
+            queue = asyncio.Queue()
+
+            async def prebuffer():
+                async for token in llm(yield_every_token):
+                    await queue.put(token)
+                await queue.put(None)
+
+            asyncio.create_task(prebuffer())
+            while (token := await queue.get()) is not None:
+                yield token
+
+        return chat()
+
+    def fused(yield_every_token):
+        pipeline = OutputPipeline(
+            _Live2D(), config, segment_method="regex", valid_tags=["think"]
+        )
+        return pipeline.process(coalesce_tokens(llm(yield_every_token)))
+
+    async def bench(name, make_stream, yield_every_token):
+        start = time.perf_counter()
+        async for _ in make_stream(yield_every_token):
+            pass
+        elapsed = time.perf_counter() - start
+        llm_mode = "every token" if yield_every_token else "never"
+        print(
+            f"{name:<8} LLM yields {llm_mode:<12}"
+            f" {elapsed / len(tokens) * 1e6:6.1f} us/token"
+        )
+
+    async def main():
+        for yield_every_token in (True, False):
+            await bench("chained", chained, yield_every_token)
+            await bench("fused", fused, yield_every_token)
+
+    asyncio.run(main())
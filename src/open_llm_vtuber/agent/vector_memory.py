@@ -0,0 +1,527 @@
+"""
+Local long-term memory: embedders and an on-disk vector store.
+
+Texts are embedded by a pluggable embedder and stored with their unit-length
+embeddings in a memory-mapped NumPy matrix, so a store of a million memories
+does not have to fit in RAM. An inverted-file (IVF) index groups the vectors
+around k-means centroids; a search scans the groups closest to the query
+first and stops when its time budget is used up, so retrieval time stays
+bounded as the store grows.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+from typing import List, Optional, Protocol, Tuple
+
+import numpy as np
+from loguru import logger
+
+# ======== Embedders ========
+
+
+class Embedder(Protocol):
+    """Turns texts into unit-length float32 vectors"""
+
+    # Identifies the embedding space; stores of different embedders are kept apart
+    name: str
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dim) float32 matrix of unit vectors"""
+        ...
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing embedder over words and character trigrams.
+
+    It needs no model and embeds in microseconds, but only captures lexical
+    overlap (shared words and word parts), not meaning.
+    """
+
+    _WORD = re.compile(r"\w+")
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        text = text.lower()
+        words = self._WORD.findall(text)
+        padded = f" {' '.join(words)} "
+        trigrams = [padded[i : i + 3] for i in range(len(padded) - 2)]
+        return words + trigrams
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                # crc32 rather than hash(): it is the same in every process
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model, e.g. all-MiniLM-L6-v2"""
+
+    def __init__(self, model: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The sentence_transformers embedder needs the sentence-transformers "
+                "package: pip install sentence-transformers"
+            ) from e
+        self.model = SentenceTransformer(model)
+        self.name = f"st-{model.replace('/', '_')}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return _normalize(self.model.encode(texts, normalize_embeddings=True))
+
+
+class OpenAICompatibleEmbedder:
+    """Embeddings endpoint of an OpenAI-compatible server, e.g. a local Ollama"""
+
+    def __init__(self, model: str, base_url: str, llm_api_key: str = "z"):
+        from openai import OpenAI
+
+        self.client = OpenAI(base_url=base_url, api_key=llm_api_key)
+        self.model = model
+        self.name = f"openai-{model.replace('/', '_').replace(':', '_')}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return _normalize([item.embedding for item in response.data])
+
+
+def create_embedder(embedder: str, **kwargs) -> Embedder:
+    """
+    Create an embedder by name.
+
+    Args:
+        embedder: "hashing", "sentence_transformers" or "openai_compatible"
+        **kwargs: model, base_url, llm_api_key or dim, depending on the embedder
+    """
+    if embedder == "hashing":
+        return HashingEmbedder(dim=kwargs.get("dim") or 384)
+    if embedder == "sentence_transformers":
+        return SentenceTransformerEmbedder(
+            model=kwargs.get("model") or "sentence-transformers/all-MiniLM-L6-v2"
+        )
+    if embedder == "openai_compatible":
+        return OpenAICompatibleEmbedder(
+            model=kwargs.get("model"),
+            base_url=kwargs.get("base_url"),
+            llm_api_key=kwargs.get("llm_api_key") or "z",
+        )
+    raise ValueError(f"Unknown embedder: {embedder}")
+
+
+# ======== IVF index ========
+
+
+def _kmeans(
+    sample: np.ndarray, n_clusters: int, iterations: int = 8, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means: unit-length centroids maximizing the dot product"""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = ~sums.any(axis=1)
+        # Restart empty clusters at random points
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index: the ids of the vectors closest to each centroid.
+
+    Searching scans the lists of the centroids closest to the query, most
+    similar first, so a search cut short by its deadline has still seen the
+    most likely candidates.
+    """
+
+    # Vectors assigned per chunk, to bound the memory of the score matrix
+    ASSIGN_CHUNK = 65536
+
+    def __init__(self, centroids: np.ndarray, assignment: np.ndarray):
+        self.centroids = centroids
+        order = np.argsort(assignment, kind="stable").astype(np.int32)
+        bounds = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))]
+        )
+        self.lists = [
+            array("i", order[bounds[i] : bounds[i + 1]].tobytes())
+            for i in range(len(centroids))
+        ]
+        # Number of vectors the index was trained on
+        self.trained_count = len(assignment)
+
+    @classmethod
+    def assign(cls, centroids: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """The closest centroid of each vector"""
+        return np.concatenate(
+            [
+                np.argmax(vectors[i : i + cls.ASSIGN_CHUNK] @ centroids.T, axis=1)
+                for i in range(0, len(vectors), cls.ASSIGN_CHUNK)
+            ]
+            or [np.zeros(0, dtype=np.int64)]
+        ).astype(np.int32)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, sample_size: int = 50_000) -> "IVFIndex":
+        """Cluster the vectors into about sqrt(n) lists"""
+        count = len(vectors)
+        n_lists = max(16, int(math.sqrt(count)))
+        rng = np.random.default_rng(0)
+        sample_ids = np.sort(
+            rng.choice(count, min(count, max(sample_size, 32 * n_lists)), replace=False)
+        )
+        centroids = _kmeans(np.asarray(vectors[sample_ids]), n_lists)
+        return cls(centroids, cls.assign(centroids, vectors))
+
+    def add(self, first_id: int, vectors: np.ndarray) -> None:
+        for offset, list_id in enumerate(self.assign(self.centroids, vectors)):
+            self.lists[list_id].append(first_id + offset)
+
+    def search(
+        self,
+        vectors: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        deadline: float,
+        max_lists: int,
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Returns:
+            The candidate ids and scores (not sorted, at most k * lists
+            scanned) and the number of lists scanned
+        """
+        order = np.argsort(-(self.centroids @ query))[:max_lists]
+        ids, scores = [], []
+        scanned = 0
+        for list_id in order:
+            members = np.frombuffer(self.lists[list_id], dtype=np.int32)
+            scanned += 1
+            if len(members):
+                list_scores = vectors[members] @ query
+                if len(members) > k:
+                    top = np.argpartition(-list_scores, k)[:k]
+                    members, list_scores = members[top], list_scores[top]
+                ids.append(members)
+                scores.append(list_scores)
+            if time.perf_counter() >= deadline:
+                break
+        if not ids:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32), scanned
+        return np.concatenate(ids), np.concatenate(scores), scanned
+
+
+# ======== Vector store ========
+
+
+class VectorStore:
+    """
+    Append-only store of texts and their embeddings in a directory.
+
+    - vectors.f32: float32 (capacity, dim) matrix of the embeddings, memory-mapped
+    - offsets.i64: byte offset of each text in texts.jsonl, memory-mapped
+    - texts.jsonl: one JSON record ({"text", "time"} and any extra fields)
+      per vector
+    - meta.json: number of vectors and their dimension
+    - ivf.npz: centroids and list assignment of the IVF index
+
+    Stores with fewer than `flat_limit` vectors are searched exactly; larger
+    ones through the IVF index, trained again when the store has grown
+    `retrain_growth` times since the last training.
+    """
+
+    INITIAL_CAPACITY = 1024
+    # Rows scanned per step of an exact search
+    FLAT_CHUNK = 16384
+
+    def __init__(
+        self,
+        directory: str,
+        latency_budget_ms: float = 20.0,
+        flat_limit: int = 20_000,
+        retrain_growth: float = 4.0,
+        max_lists: int = 64,
+    ):
+        """
+        Args:
+            directory: Directory of the store, created if needed
+            latency_budget_ms: Time a search may take; the best results found
+                by then are returned
+            flat_limit: Stores up to this size are searched exactly
+            retrain_growth: Train the index again after the store grew this
+                many times
+            max_lists: Most IVF lists a search scans
+        """
+        self.directory = directory
+        self.latency_budget = latency_budget_ms / 1000
+        self.flat_limit = flat_limit
+        self.retrain_growth = retrain_growth
+        self.max_lists = max_lists
+        os.makedirs(directory, exist_ok=True)
+
+        self.count = 0
+        self.dim: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._offsets: Optional[np.memmap] = None
+        self._index: Optional[IVFIndex] = None
+        # Count the saved index covers
+        self._index_saved_count = 0
+        self._training = False
+        self._lock = threading.Lock()
+
+        meta_path = self._path("meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.count, self.dim = meta["count"], meta["dim"]
+            self._open(max(self.count, self.INITIAL_CAPACITY))
+            self._load_index()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self._vectors is None else len(self._vectors)
+
+    def _open(self, capacity: int) -> None:
+        """Map the matrix files, growing them to `capacity` rows"""
+        for name, row_bytes in (("vectors.f32", self.dim * 4), ("offsets.i64", 8)):
+            path = self._path(name)
+            with open(path, "ab") as f:
+                if f.tell() < capacity * row_bytes:
+                    f.truncate(capacity * row_bytes)
+        self._vectors = np.memmap(
+            self._path("vectors.f32"),
+            dtype=np.float32,
+            mode="r+",
+            shape=(capacity, self.dim),
+        )
+        self._offsets = np.memmap(
+            self._path("offsets.i64"), dtype=np.int64, mode="r+", shape=(capacity,)
+        )
+
+    def _write_meta(self) -> None:
+        path = self._path("meta.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "dim": self.dim}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _load_index(self) -> None:
+        path = self._path("ivf.npz")
+        if not os.path.exists(path):
+            if self.count > self.flat_limit:
+                self._train_index()
+            return
+        with np.load(path) as data:
+            centroids, assignment = data["centroids"], data["assignment"]
+        if centroids.shape[1] != self.dim or len(assignment) > self.count:
+            self._train_index()
+            return
+        self._index = IVFIndex(centroids, assignment)
+        self._index_saved_count = len(assignment)
+        # Vectors added after the index was saved
+        if len(assignment) < self.count:
+            self._index.add(
+                len(assignment), self._vectors[len(assignment) : self.count]
+            )
+
+    def _save_index(self) -> None:
+        index = self._index
+        assignment = np.zeros(self.count, dtype=np.int32)
+        for list_id, members in enumerate(index.lists):
+            assignment[np.frombuffer(members, dtype=np.int32)] = list_id
+        path = self._path("ivf.npz")
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(f, centroids=index.centroids, assignment=assignment)
+        os.replace(f"{path}.tmp", path)
+        self._index_saved_count = self.count
+
+    def _train_index(self) -> None:
+        """Train the index on the current vectors and swap it in"""
+        count, vectors = self.count, self._vectors
+        started = time.perf_counter()
+        index = IVFIndex.train(vectors[:count])
+        with self._lock:
+            # Vectors added while training
+            if self.count > count:
+                index.add(count, self._vectors[count : self.count])
+            self._index = index
+            self._save_index()
+            self._training = False
+        logger.info(
+            f"Trained memory index of {count} vectors in {len(index.lists)} lists "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def add(
+        self,
+        texts: List[str],
+        vectors: np.ndarray,
+        extras: Optional[List[dict]] = None,
+    ) -> List[int]:
+        """
+        Append texts and their embeddings. Training the index, when due,
+        runs in this thread without blocking searches.
+
+        Args:
+            texts: The texts
+            vectors: Their embeddings
+            extras: Fields stored in the record of each text
+
+        Returns:
+            The ids of the texts
+        """
+        vectors = _normalize(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"the store's {self.dim}"
+                )
+            first_id = self.count
+            needed = self.count + len(texts)
+            if needed > self.capacity:
+                capacity = max(self.INITIAL_CAPACITY, self.capacity)
+                while capacity < needed:
+                    capacity *= 2
+                if self._vectors is not None:
+                    self._vectors.flush()
+                    self._offsets.flush()
+                self._open(capacity)
+
+            now = time.time()
+            with open(self._path("texts.jsonl"), "ab") as f:
+                for i, text in enumerate(texts):
+                    self._offsets[first_id + i] = f.tell()
+                    record = {"text": text, "time": now}
+                    if extras:
+                        record.update(extras[i])
+                    record = json.dumps(record, ensure_ascii=False)
+                    f.write(record.encode("utf-8") + b"\n")
+            self._vectors[first_id:needed] = vectors
+            self.count = needed
+            self._write_meta()
+
+            if self._index is not None:
+                self._index.add(first_id, vectors)
+                if self.count - self._index_saved_count >= max(
+                    1000, self._index_saved_count // 10
+                ):
+                    self._save_index()
+            train = not self._training and (
+                (self._index is None and self.count > self.flat_limit)
+                or (
+                    self._index is not None
+                    and self.count >= self._index.trained_count * self.retrain_growth
+                )
+            )
+            if train:
+                self._training = True
+        if train:
+            self._train_index()
+        return list(range(first_id, needed))
+
+    def search(
+        self, query: np.ndarray, k: int, exclude: Tuple[int, ...] = ()
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the k stored vectors most similar to the query, within the
+        latency budget.
+
+        Args:
+            query: The query embedding
+            k: Number of results
+            exclude: Ids not to return
+
+        Returns:
+            (id, cosine similarity) pairs, most similar first
+        """
+        query = _normalize(np.asarray(query).reshape(1, -1))[0]
+        deadline = time.perf_counter() + self.latency_budget
+        wanted = k + len(exclude)
+        with self._lock:
+            if self.count == 0:
+                return []
+            if self._index is None:
+                ids, scores = [], []
+                for start in range(0, self.count, self.FLAT_CHUNK):
+                    chunk = self._vectors[
+                        start : min(start + self.FLAT_CHUNK, self.count)
+                    ]
+                    chunk_scores = chunk @ query
+                    top = np.argpartition(-chunk_scores, min(wanted, len(chunk) - 1))[
+                        :wanted
+                    ]
+                    ids.append(top + start)
+                    scores.append(chunk_scores[top])
+                    if time.perf_counter() >= deadline:
+                        break
+                ids, scores = np.concatenate(ids), np.concatenate(scores)
+            else:
+                ids, scores, _ = self._index.search(
+                    self._vectors, query, wanted, deadline, self.max_lists
+                )
+        excluded = set(exclude)
+        results = [
+            (int(ids[i]), float(scores[i]))
+            for i in np.argsort(-scores)
+            if int(ids[i]) not in excluded
+        ]
+        return results[:k]
+
+    def get_texts(self, ids: List[int]) -> List[dict]:
+        """The records ({"text", "time"} and the extra fields) of the given ids"""
+        records = []
+        with open(self._path("texts.jsonl"), "rb") as f:
+            for memory_id in ids:
+                f.seek(int(self._offsets[memory_id]))
+                records.append(json.loads(f.readline()))
+        return records
+
+
+_stores: dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(directory: str, latency_budget_ms: float = 20.0) -> VectorStore:
+    """
+    Return the process-wide store of `directory`. Every agent using the
+    directory must share it, since each store keeps its own count and appends
+    at that position. The latency budget of the latest call applies.
+    """
+    key = os.path.abspath(directory)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = VectorStore(
+                directory, latency_budget_ms=latency_budget_ms
+            )
+        else:
+            store.latency_budget = latency_budget_ms / 1000
+        return store
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+
+from ..utils.metrics import metrics
+
+
+class ASRBatcher:
+    """
+    Micro-batches transcription requests from all sessions.
+
+    Requests are collected until the oldest one has waited `window_ms`, or
+    until `max_batch_size` requests are queued, and are then transcribed
+    together by one call to `transcribe_batch` in a worker thread. Requests
+    arriving while a batch is being decoded go into the next batch.
+    """
+
+    def __init__(
+        self,
+        transcribe_batch: Callable[[list[np.ndarray]], list[str]],
+        window_ms: float = 5.0,
+        max_batch_size: int = 16,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            transcribe_batch: Transcribes a list of float32 audio arrays and
+                returns the texts in the same order. Called in a worker thread.
+            window_ms: How long the oldest request may wait for others to join
+            max_batch_size: Maximum number of requests decoded together
+        """
+        self.transcribe_batch = transcribe_batch
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+
+        # (audio, future, enqueue time)
+        self._queue: list[tuple[np.ndarray, asyncio.Future, float]] = []
+        self._batch_full: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+        self._batch_size = metrics.summary(
+            "asr_batch_size", "Number of ASR requests decoded in one batch"
+        )
+        self._batch_wait = metrics.summary(
+            "asr_batch_wait_ms", "Time ASR requests waited in the queue (ms)"
+        )
+        self._queue_depth = metrics.gauge(
+            "asr_queue_depth", "ASR requests waiting to be batched"
+        )
+
+    async def transcribe(self, audio: np.ndarray) -> str:
+        """
+        Queue an audio array for transcription and wait for the result.
+
+        Args:
+            audio: The float32 audio to transcribe
+
+        Returns:
+            str: The transcription result
+        """
+        if self._batch_full is None:
+            self._batch_full = asyncio.Event()
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((audio, future, time.perf_counter()))
+        self._queue_depth.inc()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        elif len(self._queue) >= self.max_batch_size:
+            self._batch_full.set()
+
+        return await future
+
+    async def _run(self) -> None:
+        while self._queue:
+            remaining = self.window - (time.perf_counter() - self._queue[0][2])
+            if remaining > 0 and len(self._queue) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_full.clear()
+
+            batch = self._queue[: self.max_batch_size]
+            del self._queue[: self.max_batch_size]
+            self._queue_depth.dec(len(batch))
+
+            now = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self._batch_wait.observe((now - enqueued_at) * 1000)
+            self._batch_size.observe(len(batch))
+
+            try:
+                texts = await asyncio.to_thread(
+                    self.transcribe_batch, [audio for audio, _, _ in batch]
+                )
+            except Exception as e:
+                logger.error(
+                    f"Batched transcription of {len(batch)} requests failed: {e}"
+                )
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), text in zip(batch, texts):
+                if not future.done():  # The caller may have been cancelled
+                    future.set_result(text)
@@ -1,6 +1,7 @@
 import abc
 import numpy as np
 import asyncio
+from typing import Any
 
 
 class ASRInterface(metaclass=abc.ABCMeta):
@@ -33,6 +34,69 @@ class ASRInterface(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    @property
+    def supports_streaming(self) -> bool:
+        """Whether this engine implements the streaming methods below.
+
+        Streaming engines transcribe the audio while the user is still
+        speaking, so the final text is ready right after the end of speech.
+        """
+        return False
+
+    def start_stream(self) -> Any:
+        """Start transcribing a new utterance.
+
+        Returns:
+            An engine-specific stream handle, passed to the other streaming methods.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+
+    def accept_chunk(self, stream: Any, audio: np.ndarray) -> None:
+        """Feed a chunk of the utterance to the stream.
+
+        Args:
+            stream: The handle returned by start_stream.
+            audio: The float32 samples of the chunk.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+
+    def partial(self, stream: Any) -> str:
+        """Return the transcription of the audio fed so far.
+
+        Args:
+            stream: The handle returned by start_stream.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+
+    def finalize(self, stream: Any) -> str:
+        """Mark the end of the utterance and return the final transcription.
+
+        Args:
+            stream: The handle returned by start_stream. It cannot be used afterwards.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+
+    async def async_accept_chunk(self, stream: Any, audio: np.ndarray) -> str:
+        """Asynchronously feed a chunk to the stream.
+
+        Args:
+            stream: The handle returned by start_stream.
+            audio: The float32 samples of the chunk.
+
+        Returns:
+            str: The partial transcription after this chunk.
+        """
+
+        def _accept() -> str:
+            self.accept_chunk(stream, audio)
+            return self.partial(stream)
+
+        return await asyncio.to_thread(_accept)
+
+    async def async_finalize(self, stream: Any) -> str:
+        """Asynchronously finalize the stream and return the final transcription."""
+        return await asyncio.to_thread(self.finalize, stream)
+
     def nparray_to_audio_file(
         self, audio: np.ndarray, sample_rate: int, file_path: str
     ) -> None:
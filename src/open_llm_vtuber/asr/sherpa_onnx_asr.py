@@ -3,6 +3,7 @@ import numpy as np
 import sherpa_onnx
 from loguru import logger
 from .asr_interface import ASRInterface
+from .asr_batcher import ASRBatcher
 from .utils import download_and_extract, check_and_extract_local_file
 import onnxruntime
 
@@ -37,6 +38,14 @@ class VoiceRecognition(ASRInterface):
         feature_dim: int = 80,  # Feature dimension
         use_itn: bool = True,  # Use ITN for SenseVoice models
         provider: str = "cpu",  # Provider for inference (cpu or cuda)
+        streaming_model_type: str = "",  # "transducer", "paraformer" or "zipformer2_ctc". Empty to disable streaming
+        streaming_encoder: str = None,  # Path to the streaming encoder model (transducer, paraformer)
+        streaming_decoder: str = None,  # Path to the streaming decoder model (transducer, paraformer)
+        streaming_joiner: str = None,  # Path to the streaming joiner model (transducer)
+        streaming_ctc: str = None,  # Path to the streaming model.onnx (zipformer2_ctc)
+        streaming_tokens: str = None,  # Path to tokens.txt of the streaming model
+        batch_window_ms: float = 5.0,  # How long a request waits for others to be decoded together
+        max_batch_size: int = 16,  # Maximum number of requests decoded together. 1 disables batching
     ) -> None:
         self.model_type = model_type
         self.encoder = encoder
@@ -64,6 +73,12 @@ class VoiceRecognition(ASRInterface):
         self.SAMPLE_RATE = sample_rate
         self.feature_dim = feature_dim
         self.use_itn = use_itn
+        self.streaming_model_type = streaming_model_type
+        self.streaming_encoder = streaming_encoder
+        self.streaming_decoder = streaming_decoder
+        self.streaming_joiner = streaming_joiner
+        self.streaming_ctc = streaming_ctc
+        self.streaming_tokens = streaming_tokens
 
         # we need to find a way to get cuda version of sherpa-onnx before we can
         # use the gpu provider.
@@ -81,6 +96,19 @@ class VoiceRecognition(ASRInterface):
         logger.info(f"Sherpa-Onnx-ASR: Using {self.provider} for inference")
 
         self.recognizer = self._create_recognizer()
+        self.online_recognizer = (
+            self._create_online_recognizer() if self.streaming_model_type else None
+        )
+        # Requests from all sessions share the recognizer, so decode them in batches
+        self.batcher = (
+            ASRBatcher(
+                self.transcribe_batch,
+                window_ms=batch_window_ms,
+                max_batch_size=max_batch_size,
+            )
+            if max_batch_size > 1
+            else None
+        )
 
     def _create_recognizer(self):
         if self.model_type == "transducer":
@@ -198,8 +226,96 @@ class VoiceRecognition(ASRInterface):
 
         return recognizer
 
-    def transcribe_np(self, audio: np.ndarray) -> str:
-        stream = self.recognizer.create_stream()
+    def _create_online_recognizer(self):
+        if self.streaming_model_type == "transducer":
+            recognizer = sherpa_onnx.OnlineRecognizer.from_transducer(
+                tokens=self.streaming_tokens,
+                encoder=self.streaming_encoder,
+                decoder=self.streaming_decoder,
+                joiner=self.streaming_joiner,
+                num_threads=self.num_threads,
+                sample_rate=self.SAMPLE_RATE,
+                feature_dim=self.feature_dim,
+                decoding_method=self.decoding_method,
+                hotwords_file=self.hotwords_file,
+                hotwords_score=self.hotwords_score,
+                modeling_unit=self.modeling_unit or "cjkchar",
+                bpe_vocab=self.bpe_vocab,
+                blank_penalty=self.blank_penalty,
+                debug=self.debug,
+                provider=self.provider,
+            )
+        elif self.streaming_model_type == "paraformer":
+            recognizer = sherpa_onnx.OnlineRecognizer.from_paraformer(
+                tokens=self.streaming_tokens,
+                encoder=self.streaming_encoder,
+                decoder=self.streaming_decoder,
+                num_threads=self.num_threads,
+                sample_rate=self.SAMPLE_RATE,
+                feature_dim=self.feature_dim,
+                decoding_method=self.decoding_method,
+                debug=self.debug,
+                provider=self.provider,
+            )
+        elif self.streaming_model_type == "zipformer2_ctc":
+            recognizer = sherpa_onnx.OnlineRecognizer.from_zipformer2_ctc(
+                tokens=self.streaming_tokens,
+                model=self.streaming_ctc,
+                num_threads=self.num_threads,
+                sample_rate=self.SAMPLE_RATE,
+                feature_dim=self.feature_dim,
+                decoding_method=self.decoding_method,
+                debug=self.debug,
+                provider=self.provider,
+            )
+        else:
+            raise ValueError(
+                f"Invalid streaming model type: {self.streaming_model_type}"
+            )
+
+        logger.info(f"Sherpa-Onnx-ASR: Streaming enabled ({self.streaming_model_type})")
+        return recognizer
+
+    @property
+    def supports_streaming(self) -> bool:
+        return self.online_recognizer is not None
+
+    def start_stream(self) -> sherpa_onnx.OnlineStream:
+        return self.online_recognizer.create_stream()
+
+    def accept_chunk(self, stream: sherpa_onnx.OnlineStream, audio: np.ndarray) -> None:
         stream.accept_waveform(self.SAMPLE_RATE, audio)
-        self.recognizer.decode_streams([stream])
-        return stream.result.text
+        while self.online_recognizer.is_ready(stream):
+            self.online_recognizer.decode_stream(stream)
+
+    def partial(self, stream: sherpa_onnx.OnlineStream) -> str:
+        return self.online_recognizer.get_result(stream)
+
+    def finalize(self, stream: sherpa_onnx.OnlineStream) -> str:
+        # Most of the utterance is decoded already, only the last frames
+        # (pushed through by the tail padding) are left.
+        tail_paddings = np.zeros(int(0.3 * self.SAMPLE_RATE), dtype=np.float32)
+        stream.accept_waveform(self.SAMPLE_RATE, tail_paddings)
+        stream.input_finished()
+        while self.online_recognizer.is_ready(stream):
+            self.online_recognizer.decode_stream(stream)
+        return self.online_recognizer.get_result(stream)
+
+    def transcribe_batch(self, audios: list[np.ndarray]) -> list[str]:
+        streams = []
+        for audio in audios:
+            stream = self.recognizer.create_stream()
+            stream.accept_waveform(self.SAMPLE_RATE, audio)
+            streams.append(stream)
+        self.recognizer.decode_streams(streams)
+        return [stream.result.text for stream in streams]
+
+    def transcribe_np(self, audio: np.ndarray) -> str:
+        return self.transcribe_batch([audio])[0]
+
+    async def async_transcribe_np(self, audio: np.ndarray) -> str:
+        if self.batcher is None:
+            return await super().async_transcribe_np(audio)
+        if audio.dtype != np.float32:
+            audio = audio.astype(np.float32)
+        return await self.batcher.transcribe(audio)
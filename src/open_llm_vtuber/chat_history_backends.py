@@ -0,0 +1,774 @@
+"""
+Storage backends of the chat history.
+
+`chat_history_manager` validates the ids and builds the records; a backend
+only stores them. Storing a message costs the same however long the history
+is:
+
+- jsonl: one append-only file per history, `<conf_uid>/<history_uid>.jsonl`.
+  Each line is a record: the metadata, a message, or an edit of the latest
+  message. Reading a history replays its records.
+- sqlite: one SQLite database per character, `<conf_uid>/history.sqlite3`,
+  in WAL mode.
+
+Each backend keeps a summary of every history (latest message and message
+count) up to date on each write, so histories are listed without reading
+their messages.
+
+Histories of the previous format (a JSON array per history, rewritten on
+every message) are moved to the backend once, see `migrate_json_histories`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+
+
+class HistoryBackend(ABC):
+    """Stores the chat histories of each character (conf_uid)"""
+
+    name: str
+
+    def __init__(self, history_dir: str = "chat_history"):
+        """
+        Args:
+            history_dir: Directory with a subdirectory per character
+        """
+        self.history_dir = history_dir
+
+    def conf_dir(self, conf_uid: str) -> str:
+        path = os.path.join(self.history_dir, conf_uid)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @abstractmethod
+    def create(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        """Create an empty history with its metadata record"""
+
+    @abstractmethod
+    def exists(self, conf_uid: str, history_uid: str) -> bool:
+        """Whether the history exists"""
+
+    def append(self, conf_uid: str, history_uid: str, message: dict) -> None:
+        """Append a message, creating the history if needed"""
+        self.append_many(conf_uid, history_uid, [message])
+
+    @abstractmethod
+    def append_many(
+        self, conf_uid: str, history_uid: str, messages: List[dict]
+    ) -> None:
+        """Append messages in one write, creating the history if needed"""
+
+    @abstractmethod
+    def sync(self, conf_uid: str, history_uid: str) -> None:
+        """Make the writes to a history durable (fsync)"""
+
+    @abstractmethod
+    def get_messages(self, conf_uid: str, history_uid: str) -> List[dict]:
+        """All messages of a history, oldest first"""
+
+    @abstractmethod
+    def get_metadata(self, conf_uid: str, history_uid: str) -> dict:
+        """The metadata record of a history, or {} if it has none"""
+
+    @abstractmethod
+    def set_metadata(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        """Replace the metadata record of a history"""
+
+    @abstractmethod
+    def get_latest_message(self, conf_uid: str, history_uid: str) -> Optional[dict]:
+        """The latest message of a history, or None if it has none"""
+
+    @abstractmethod
+    def modify_latest_message(
+        self, conf_uid: str, history_uid: str, role: str, content: str
+    ) -> bool:
+        """
+        Replace the content of the latest message if it has the given role.
+
+        Returns:
+            bool: Whether the message was modified
+        """
+
+    @abstractmethod
+    def delete(self, conf_uid: str, history_uid: str) -> bool:
+        """Delete a history. Returns whether it existed."""
+
+    @abstractmethod
+    def rename(self, conf_uid: str, history_uid: str, new_history_uid: str) -> bool:
+        """Give a history a new uid. Returns whether it existed."""
+
+    @abstractmethod
+    def list_summaries(self, conf_uid: str) -> List[dict]:
+        """
+        Summaries of the histories of a character, without reading their
+        messages.
+
+        Returns:
+            List[dict]: {"uid", "latest_message" (None if the history is
+            empty), "message_count"} per history
+        """
+
+    @abstractmethod
+    def import_history(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        metadata: Optional[dict],
+        messages: List[dict],
+    ) -> None:
+        """Write a whole history at once, replacing it if it exists"""
+
+
+# ======== JSONL ========
+
+
+def _encode(record: dict) -> bytes:
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _decode(line: bytes, path: str) -> Optional[dict]:
+    try:
+        return json.loads(line)
+    except ValueError:
+        # e.g. a line cut short by a crash
+        logger.warning(f"Skipping unreadable record in {path}")
+        return None
+
+
+class JSONLHistoryBackend(HistoryBackend):
+    """
+    One append-only JSONL file per history.
+
+    Records are a message ({"role": "human" | "ai" | ..., ...}), the
+    metadata ({"role": "metadata", ...}, the last one counts) or an edit of
+    the latest message ({"op": "edit", "role": ..., "content": ...}).
+
+    The summaries of a character's histories are loaded from its index file
+    on the first listing and then updated on each write. A summary records
+    the size and mtime of its file; files changed by anything else are
+    summarized again when the histories are listed.
+    """
+
+    name = "jsonl"
+    SUFFIX = ".jsonl"
+    INDEX_FILENAME = "history.index"
+    # Bytes read at a time when reading a file backwards
+    BLOCK_SIZE = 8192
+
+    def __init__(self, history_dir: str = "chat_history"):
+        super().__init__(history_dir)
+        # Summary of each history, per character whose index is loaded
+        self._indexes: Dict[str, Dict[str, dict]] = {}
+        # Characters whose index changed since it was saved
+        self._dirty_indexes: Set[str] = set()
+        self._index_lock = threading.Lock()
+
+    def _path(self, conf_uid: str, history_uid: str) -> str:
+        return os.path.join(self.history_dir, conf_uid, f"{history_uid}{self.SUFFIX}")
+
+    def _append_records(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        records: List[dict],
+        update: Optional[Callable[[dict], None]] = None,
+    ) -> None:
+        """Append records and apply `update` to the history's summary"""
+        data = b"".join(_encode(record) for record in records)
+        with open(self._path(conf_uid, history_uid), "a+b") as f:
+            size = f.tell()
+            # Do not continue a line cut short by a crash
+            if size > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+            stat = os.fstat(f.fileno())
+
+        with self._index_lock:
+            index = self._indexes.get(conf_uid)
+            if index is None:
+                # Loaded and checked on the next listing
+                return
+            summary = index.get(history_uid)
+            if summary is None and size == 0:
+                summary = index[history_uid] = {
+                    "latest_message": None,
+                    "message_count": 0,
+                }
+            elif summary is None or summary["size"] != size:
+                # Changed by something else, summarized on the next listing
+                index.pop(history_uid, None)
+                return
+            if update:
+                update(summary)
+            summary["size"], summary["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            self._dirty_indexes.add(conf_uid)
+
+    def _set_summary(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        latest_message: Optional[dict],
+        message_count: int,
+    ) -> None:
+        """Record the summary of a history that was just written whole"""
+        stat = os.stat(self._path(conf_uid, history_uid))
+        with self._index_lock:
+            index = self._indexes.get(conf_uid)
+            if index is not None:
+                index[history_uid] = {
+                    "latest_message": latest_message,
+                    "message_count": message_count,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+                self._dirty_indexes.add(conf_uid)
+
+    def _records(self, path: str) -> List[dict]:
+        with open(path, "rb") as f:
+            lines = [line for line in f.read().split(b"\n") if line.strip()]
+        try:
+            # Parsing the records as one array is several times faster
+            return json.loads(b"[" + b",".join(lines) + b"]")
+        except ValueError:
+            records = (_decode(line, path) for line in lines)
+            return [record for record in records if record is not None]
+
+    def _reversed_records(self, path: str) -> Iterator[dict]:
+        """The records of a file, latest first, reading only as far as needed"""
+        with open(path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            partial = b""
+            while end > 0:
+                start = max(0, end - self.BLOCK_SIZE)
+                f.seek(start)
+                lines = (f.read(end - start) + partial).split(b"\n")
+                end = start
+                # The first line may continue in the previous block
+                partial = lines.pop(0) if start > 0 else b""
+                for line in reversed(lines):
+                    if line.strip():
+                        record = _decode(line, path)
+                        if record is not None:
+                            yield record
+
+    def create(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        self.conf_dir(conf_uid)
+        with open(self._path(conf_uid, history_uid), "wb") as f:
+            f.write(_encode(metadata))
+        self._set_summary(conf_uid, history_uid, None, 0)
+
+    def exists(self, conf_uid: str, history_uid: str) -> bool:
+        return os.path.exists(self._path(conf_uid, history_uid))
+
+    def append_many(
+        self, conf_uid: str, history_uid: str, messages: List[dict]
+    ) -> None:
+        self.conf_dir(conf_uid)
+
+        def update(summary: dict) -> None:
+            summary["latest_message"] = messages[-1]
+            summary["message_count"] += len(messages)
+
+        self._append_records(conf_uid, history_uid, messages, update)
+
+    def sync(self, conf_uid: str, history_uid: str) -> None:
+        # Opened for writing, Windows cannot flush a read-only file
+        with open(self._path(conf_uid, history_uid), "ab") as f:
+            os.fsync(f.fileno())
+
+    def get_messages(self, conf_uid: str, history_uid: str) -> List[dict]:
+        messages = []
+        for record in self._records(self._path(conf_uid, history_uid)):
+            if record.get("op") == "edit":
+                if messages and messages[-1]["role"] == record["role"]:
+                    messages[-1]["content"] = record["content"]
+            elif record.get("role") != "metadata":
+                messages.append(record)
+        return messages
+
+    def get_metadata(self, conf_uid: str, history_uid: str) -> dict:
+        path = self._path(conf_uid, history_uid)
+        with open(path, "rb") as f:
+            data = f.read()
+        # Quotes in strings are escaped, so this only matches a metadata record
+        end = len(data)
+        while (found := data.rfind(b'"role": "metadata"', 0, end)) >= 0:
+            start = data.rfind(b"\n", 0, found) + 1
+            line_end = data.find(b"\n", found)
+            record = _decode(data[start : line_end if line_end >= 0 else None], path)
+            if record is not None and record.get("role") == "metadata":
+                return record
+            end = start
+        return {}
+
+    def set_metadata(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        self._append_records(conf_uid, history_uid, [metadata])
+
+    def _latest_message(self, path: str) -> Optional[dict]:
+        edit = None
+        for record in self._reversed_records(path):
+            if record.get("op") == "edit":
+                # The latest edit holds the content
+                edit = edit or record
+            elif record.get("role") != "metadata":
+                if edit is not None and edit["role"] == record["role"]:
+                    record["content"] = edit["content"]
+                return record
+        return None
+
+    def get_latest_message(self, conf_uid: str, history_uid: str) -> Optional[dict]:
+        return self._latest_message(self._path(conf_uid, history_uid))
+
+    def modify_latest_message(
+        self, conf_uid: str, history_uid: str, role: str, content: str
+    ) -> bool:
+        latest = self.get_latest_message(conf_uid, history_uid)
+        if latest is None or latest["role"] != role:
+            return False
+
+        def update(summary: dict) -> None:
+            if summary["latest_message"] is not None:
+                summary["latest_message"] = {
+                    **summary["latest_message"],
+                    "content": content,
+                }
+
+        self._append_records(
+            conf_uid,
+            history_uid,
+            [{"op": "edit", "role": role, "content": content}],
+            update,
+        )
+        return True
+
+    def delete(self, conf_uid: str, history_uid: str) -> bool:
+        path = self._path(conf_uid, history_uid)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        with self._index_lock:
+            index = self._indexes.get(conf_uid)
+            if index is not None and index.pop(history_uid, None) is not None:
+                self._dirty_indexes.add(conf_uid)
+        return True
+
+    def rename(self, conf_uid: str, history_uid: str, new_history_uid: str) -> bool:
+        path = self._path(conf_uid, history_uid)
+        if not os.path.exists(path):
+            return False
+        os.rename(path, self._path(conf_uid, new_history_uid))
+        with self._index_lock:
+            index = self._indexes.get(conf_uid)
+            if index is not None and history_uid in index:
+                index[new_history_uid] = index.pop(history_uid)
+                self._dirty_indexes.add(conf_uid)
+        return True
+
+    def _load_index(self, conf_dir: str) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(conf_dir, self.INDEX_FILENAME), "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"Rebuilding the unreadable history index of {conf_dir}")
+            return {}
+
+    def _save_index(self, conf_dir: str, index: Dict[str, dict]) -> None:
+        path = os.path.join(conf_dir, self.INDEX_FILENAME)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    def _summarize(self, path: str, stat: os.stat_result) -> dict:
+        """Summarize a history file without parsing its messages"""
+        with open(path, "rb") as f:
+            data = f.read()
+        records = data.count(b"\n") + (not data.endswith(b"\n") and len(data) > 0)
+        return {
+            "latest_message": self._latest_message(path),
+            # Quotes in strings are escaped, so these only match record keys
+            "message_count": records
+            - data.count(b'"role": "metadata"')
+            - data.count(b'"op": "edit"'),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def list_summaries(self, conf_uid: str) -> List[dict]:
+        conf_dir = self.conf_dir(conf_uid)
+        with self._index_lock:
+            index = self._indexes.get(conf_uid)
+            if index is None:
+                index = self._load_index(conf_dir)
+            summaries = {}
+            changed = conf_uid in self._dirty_indexes
+            for entry in os.scandir(conf_dir):
+                if not entry.name.endswith(self.SUFFIX):
+                    continue
+                history_uid = entry.name[: -len(self.SUFFIX)]
+                stat = entry.stat()
+                summary = index.get(history_uid)
+                if summary is None or (summary["size"], summary["mtime_ns"]) != (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ):
+                    summary = self._summarize(entry.path, stat)
+                    changed = True
+                summaries[history_uid] = summary
+            changed = changed or summaries.keys() != index.keys()
+            self._indexes[conf_uid] = summaries
+            if changed:
+                self._save_index(conf_dir, summaries)
+                self._dirty_indexes.discard(conf_uid)
+        return [
+            {
+                "uid": history_uid,
+                "latest_message": summary["latest_message"],
+                "message_count": summary["message_count"],
+            }
+            for history_uid, summary in summaries.items()
+        ]
+
+    def import_history(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        metadata: Optional[dict],
+        messages: List[dict],
+    ) -> None:
+        self.conf_dir(conf_uid)
+        path = self._path(conf_uid, history_uid)
+        records = ([metadata] if metadata else []) + messages
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(b"".join(_encode(record) for record in records))
+        os.replace(f"{path}.tmp", path)
+        self._set_summary(
+            conf_uid, history_uid, messages[-1] if messages else None, len(messages)
+        )
+
+
+# ======== SQLite ========
+
+
+class SQLiteHistoryBackend(HistoryBackend):
+    """
+    One SQLite database (WAL mode) per character. The summary of a history
+    is kept in its row of `histories`, updated in the same transaction as
+    its messages.
+    """
+
+    name = "sqlite"
+    FILENAME = "history.sqlite3"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS histories (
+            uid TEXT PRIMARY KEY,
+            metadata TEXT,
+            latest TEXT,
+            message_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY,
+            history_uid TEXT NOT NULL,
+            role TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS messages_history ON messages (history_uid, id);
+    """
+
+    def __init__(self, history_dir: str = "chat_history"):
+        super().__init__(history_dir)
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        # A connection is used by one thread at a time
+        self._lock = threading.RLock()
+
+    def _db(self, conf_uid: str) -> sqlite3.Connection:
+        db = self._connections.get(conf_uid)
+        if db is None:
+            db = sqlite3.connect(
+                os.path.join(self.conf_dir(conf_uid), self.FILENAME),
+                check_same_thread=False,
+                isolation_level=None,
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            # With WAL, commits are durable once the WAL is checkpointed and
+            # the database is never corrupted by a crash
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(self.SCHEMA)
+            self._add_summary_columns(db)
+            self._connections[conf_uid] = db
+        return db
+
+    def _add_summary_columns(self, db: sqlite3.Connection) -> None:
+        """Add the summary to databases created without it"""
+        columns = {row[1] for row in db.execute("PRAGMA table_info(histories)")}
+        if "message_count" in columns:
+            return
+        with db:
+            db.execute("BEGIN")
+            db.execute("ALTER TABLE histories ADD COLUMN latest TEXT")
+            db.execute(
+                "ALTER TABLE histories ADD COLUMN "
+                "message_count INTEGER NOT NULL DEFAULT 0"
+            )
+            db.execute(
+                "UPDATE histories SET "
+                "message_count = (SELECT COUNT(*) FROM messages "
+                "WHERE history_uid = histories.uid), "
+                "latest = (SELECT data FROM messages "
+                "WHERE history_uid = histories.uid ORDER BY id DESC LIMIT 1)"
+            )
+
+    def _ensure_history(self, db: sqlite3.Connection, history_uid: str) -> None:
+        db.execute(
+            "INSERT OR IGNORE INTO histories (uid, metadata) VALUES (?, NULL)",
+            (history_uid,),
+        )
+
+    def create(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        with self._lock:
+            self._db(conf_uid).execute(
+                "INSERT OR REPLACE INTO histories (uid, metadata) VALUES (?, ?)",
+                (history_uid, json.dumps(metadata, ensure_ascii=False)),
+            )
+
+    def exists(self, conf_uid: str, history_uid: str) -> bool:
+        with self._lock:
+            row = (
+                self._db(conf_uid)
+                .execute("SELECT 1 FROM histories WHERE uid = ?", (history_uid,))
+                .fetchone()
+            )
+        return row is not None
+
+    def append_many(
+        self, conf_uid: str, history_uid: str, messages: List[dict]
+    ) -> None:
+        rows = [
+            (history_uid, message["role"], json.dumps(message, ensure_ascii=False))
+            for message in messages
+        ]
+        with self._lock:
+            db = self._db(conf_uid)
+            with db:
+                db.execute("BEGIN")
+                self._ensure_history(db, history_uid)
+                db.executemany(
+                    "INSERT INTO messages (history_uid, role, data) VALUES (?, ?, ?)",
+                    rows,
+                )
+                db.execute(
+                    "UPDATE histories SET latest = ?, "
+                    "message_count = message_count + ? WHERE uid = ?",
+                    (rows[-1][2], len(rows), history_uid),
+                )
+
+    def sync(self, conf_uid: str, history_uid: str) -> None:
+        # With synchronous=NORMAL commits are not synced, a checkpoint syncs
+        # the WAL and the database
+        with self._lock:
+            self._db(conf_uid).execute("PRAGMA wal_checkpoint(FULL)")
+
+    def get_messages(self, conf_uid: str, history_uid: str) -> List[dict]:
+        with self._lock:
+            rows = (
+                self._db(conf_uid)
+                .execute(
+                    "SELECT data FROM messages WHERE history_uid = ? ORDER BY id",
+                    (history_uid,),
+                )
+                .fetchall()
+            )
+        # Parsing the messages as one array is several times faster
+        return json.loads("[" + ",".join(data for (data,) in rows) + "]")
+
+    def get_metadata(self, conf_uid: str, history_uid: str) -> dict:
+        with self._lock:
+            row = (
+                self._db(conf_uid)
+                .execute("SELECT metadata FROM histories WHERE uid = ?", (history_uid,))
+                .fetchone()
+            )
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def set_metadata(self, conf_uid: str, history_uid: str, metadata: dict) -> None:
+        with self._lock:
+            self._db(conf_uid).execute(
+                "UPDATE histories SET metadata = ? WHERE uid = ?",
+                (json.dumps(metadata, ensure_ascii=False), history_uid),
+            )
+
+    def _latest(
+        self, db: sqlite3.Connection, history_uid: str
+    ) -> Optional[Tuple[int, str]]:
+        return db.execute(
+            "SELECT id, data FROM messages WHERE history_uid = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (history_uid,),
+        ).fetchone()
+
+    def get_latest_message(self, conf_uid: str, history_uid: str) -> Optional[dict]:
+        with self._lock:
+            row = self._latest(self._db(conf_uid), history_uid)
+        return json.loads(row[1]) if row else None
+
+    def modify_latest_message(
+        self, conf_uid: str, history_uid: str, role: str, content: str
+    ) -> bool:
+        with self._lock:
+            db = self._db(conf_uid)
+            with db:
+                db.execute("BEGIN")
+                row = self._latest(db, history_uid)
+                if row is None:
+                    return False
+                message = json.loads(row[1])
+                if message["role"] != role:
+                    return False
+                message["content"] = content
+                data = json.dumps(message, ensure_ascii=False)
+                db.execute("UPDATE messages SET data = ? WHERE id = ?", (data, row[0]))
+                db.execute(
+                    "UPDATE histories SET latest = ? WHERE uid = ?",
+                    (data, history_uid),
+                )
+        return True
+
+    def delete(self, conf_uid: str, history_uid: str) -> bool:
+        with self._lock:
+            db = self._db(conf_uid)
+            with db:
+                db.execute("BEGIN")
+                db.execute("DELETE FROM messages WHERE history_uid = ?", (history_uid,))
+                deleted = db.execute(
+                    "DELETE FROM histories WHERE uid = ?", (history_uid,)
+                ).rowcount
+        return deleted > 0
+
+    def rename(self, conf_uid: str, history_uid: str, new_history_uid: str) -> bool:
+        with self._lock:
+            db = self._db(conf_uid)
+            with db:
+                db.execute("BEGIN")
+                renamed = db.execute(
+                    "UPDATE histories SET uid = ? WHERE uid = ?",
+                    (new_history_uid, history_uid),
+                ).rowcount
+                db.execute(
+                    "UPDATE messages SET history_uid = ? WHERE history_uid = ?",
+                    (new_history_uid, history_uid),
+                )
+        return renamed > 0
+
+    def list_summaries(self, conf_uid: str) -> List[dict]:
+        with self._lock:
+            rows = (
+                self._db(conf_uid)
+                .execute("SELECT uid, latest, message_count FROM histories")
+                .fetchall()
+            )
+        return [
+            {
+                "uid": uid,
+                "latest_message": json.loads(latest) if latest else None,
+                "message_count": message_count,
+            }
+            for uid, latest, message_count in rows
+        ]
+
+    def import_history(
+        self,
+        conf_uid: str,
+        history_uid: str,
+        metadata: Optional[dict],
+        messages: List[dict],
+    ) -> None:
+        with self._lock:
+            db = self._db(conf_uid)
+            with db:
+                db.execute("BEGIN")
+                db.execute("DELETE FROM messages WHERE history_uid = ?", (history_uid,))
+                rows = [
+                    (
+                        history_uid,
+                        message["role"],
+                        json.dumps(message, ensure_ascii=False),
+                    )
+                    for message in messages
+                ]
+                db.execute(
+                    "INSERT OR REPLACE INTO histories "
+                    "(uid, metadata, latest, message_count) VALUES (?, ?, ?, ?)",
+                    (
+                        history_uid,
+                        json.dumps(metadata, ensure_ascii=False) if metadata else None,
+                        rows[-1][2] if rows else None,
+                        len(rows),
+                    ),
+                )
+                db.executemany(
+                    "INSERT INTO messages (history_uid, role, data) VALUES (?, ?, ?)",
+                    rows,
+                )
+
+
+# ======== Factory and migration ========
+
+HISTORY_BACKENDS = {
+    JSONLHistoryBackend.name: JSONLHistoryBackend,
+    SQLiteHistoryBackend.name: SQLiteHistoryBackend,
+}
+
+
+def create_history_backend(
+    backend: str, history_dir: str = "chat_history"
+) -> HistoryBackend:
+    """Create a history backend by name ("jsonl" or "sqlite")"""
+    if backend not in HISTORY_BACKENDS:
+        raise ValueError(f"Unknown chat history backend: {backend}")
+    return HISTORY_BACKENDS[backend](history_dir)
+
+
+def migrate_json_histories(backend: HistoryBackend, conf_uid: str) -> int:
+    """
+    Move the histories of a character from the previous format (one JSON
+    array per history) to the backend. A migrated file is renamed to
+    `<history_uid>.json.migrated`, so it is moved only once and can be
+    restored by hand.
+
+    Returns:
+        int: Number of histories migrated
+    """
+    conf_dir = backend.conf_dir(conf_uid)
+    migrated = 0
+    for filename in os.listdir(conf_dir):
+        if not filename.endswith(".json"):
+            continue
+        path = os.path.join(conf_dir, filename)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            metadata = None
+            if records and records[0].get("role") == "metadata":
+                metadata = records.pop(0)
+            backend.import_history(conf_uid, filename[:-5], metadata, records)
+            os.replace(path, f"{path}.migrated")
+            migrated += 1
+        except Exception as e:
+            logger.error(f"Failed to migrate history file {path}: {e}")
+    if migrated:
+        logger.info(
+            f"Migrated {migrated} chat histories of {conf_uid} to the "
+            f"{backend.name} backend"
+        )
+    return migrated
@@ -1,11 +1,24 @@
+"""
+Chat histories of each character (conf_uid), kept by a pluggable storage
+backend, see `chat_history_backends`. Stored messages are written behind by
+a `HistoryWriter`; everything else writes a history's queued messages
+before touching it.
+"""
+
 import os
 import re
-import json
 import uuid
 from datetime import datetime
-from typing import Literal, List, TypedDict, Optional
+from typing import Literal, List, TypedDict, Optional, Set, Tuple
 from loguru import logger
 
+from .chat_history_backends import (
+    HistoryBackend,
+    create_history_backend,
+    migrate_json_histories,
+)
+from .chat_history_writer import FsyncPolicy, HistoryWriter
+
 
 class HistoryMessage(TypedDict):
     role: Literal["human", "ai"]
@@ -24,7 +37,8 @@ def _is_safe_filename(filename: str) -> bool:
     # Allow alphanumeric, hyphen, underscore, and common unicode characters
     # Block any filesystem special characters, control characters, and path separators
     pattern = re.compile(r"^[\w\-_\u0020-\u007E\u00A0-\uFFFF]+$")
-    return bool(pattern.match(filename))
+    # "." and ".." would point at the directory or its parent
+    return bool(pattern.match(filename)) and filename not in (".", "..")
 
 
 def _sanitize_path_component(component: str) -> str:
@@ -38,30 +52,64 @@ def _sanitize_path_component(component: str) -> str:
     return sanitized
 
 
-def _ensure_conf_dir(conf_uid: str) -> str:
-    """Ensure the directory for a specific conf exists and return its path"""
-    if not conf_uid:
-        raise ValueError("conf_uid cannot be empty")
+_backend: HistoryBackend = create_history_backend("jsonl")
+_writer = HistoryWriter(_backend)
+# Characters whose histories of the previous format were migrated
+_migrated_conf_uids: Set[str] = set()
 
-    safe_conf_uid = _sanitize_path_component(conf_uid)
-    base_dir = os.path.join("chat_history", safe_conf_uid)
-    os.makedirs(base_dir, exist_ok=True)
-    return base_dir
+
+def set_history_backend(
+    backend: str,
+    history_dir: str = "chat_history",
+    flush_interval: float = 0.5,
+    fsync: FsyncPolicy = "none",
+) -> None:
+    """
+    Select where chat histories are stored and how they are written.
+
+    Args:
+        backend: "jsonl" or "sqlite", see `chat_history_backends`
+        history_dir: Directory with a subdirectory per character
+        flush_interval: Seconds a stored message may wait before it is
+            written, 0 to write it in `store_message`
+        fsync: "none" or "batch", see `HistoryWriter`
+    """
+    global _backend, _writer
+    if (
+        _backend.name == backend
+        and _backend.history_dir == history_dir
+        and _writer.flush_interval == flush_interval
+        and _writer.fsync == fsync
+    ):
+        return
+    _writer.close()
+    if _backend.name != backend or _backend.history_dir != history_dir:
+        _backend = create_history_backend(backend, history_dir)
+        _migrated_conf_uids.clear()
+        logger.info(f"Chat history backend: {backend} in {history_dir}")
+    _writer = HistoryWriter(_backend, flush_interval, fsync)
 
 
-def _get_safe_history_path(conf_uid: str, history_uid: str) -> str:
-    """Get sanitized path for history file"""
+def flush_histories() -> None:
+    """Write the stored messages that are still queued"""
+    _writer.flush()
+
+
+def _safe_conf_uid(conf_uid: str) -> str:
+    """Sanitize conf_uid and migrate its histories to the backend once"""
     safe_conf_uid = _sanitize_path_component(conf_uid)
-    safe_history_uid = _sanitize_path_component(history_uid)
-    base_dir = os.path.join("chat_history", safe_conf_uid)
-    full_path = os.path.normpath(os.path.join(base_dir, f"{safe_history_uid}.json"))
-    if not full_path.startswith(base_dir):
-        raise ValueError("Invalid path: Path traversal detected")
-    return full_path
+    if safe_conf_uid not in _migrated_conf_uids:
+        migrate_json_histories(_backend, safe_conf_uid)
+        _migrated_conf_uids.add(safe_conf_uid)
+    return safe_conf_uid
+
+
+def _safe_uids(conf_uid: str, history_uid: str) -> Tuple[str, str]:
+    return _safe_conf_uid(conf_uid), _sanitize_path_component(history_uid)
 
 
 def create_new_history(conf_uid: str) -> str:
-    """Create a new history file with a unique ID and return the history_uid"""
+    """Create a new history with a unique ID and return the history_uid"""
     if not conf_uid:
         logger.warning("No conf_uid provided")
         return ""
@@ -69,24 +117,23 @@ def create_new_history(conf_uid: str) -> str:
     # Use uuid.uuid4().hex to generate a UUID without hyphens
     # New format: UUID_YYYY-MM-DD_HH-MM-SS
     history_uid = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{uuid.uuid4().hex}"
-    conf_dir = _ensure_conf_dir(conf_uid)  # conf_uid is sanitized here
 
-    # Create history file with empty metadata
+    # Create history with empty metadata
     try:
-        filepath = os.path.join(conf_dir, f"{history_uid}.json")
-        initial_data = [
+        safe_conf_uid = _safe_conf_uid(conf_uid)
+        _backend.create(
+            safe_conf_uid,
+            history_uid,
             {
                 "role": "metadata",
                 "timestamp": datetime.now().isoformat(timespec="seconds"),
-            }
-        ]
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(initial_data, f, ensure_ascii=False, indent=2)
+            },
+        )
     except Exception as e:
-        logger.error(f"Failed to create new history file: {e}")
+        logger.error(f"Failed to create new history: {e}")
         return ""
 
-    logger.debug(f"Created new history file with empty metadata: {filepath}")
+    logger.debug(f"Created new history with empty metadata: {history_uid}")
     return history_uid
 
 
@@ -98,7 +145,7 @@ def store_message(
     name: str | None = None,
     avatar: str | None = None,
 ):
-    """Store a message in a specific history file
+    """Store a message in a specific history
 
     Args:
         conf_uid: Configuration unique identifier
@@ -115,17 +162,8 @@ def store_message(
             logger.warning("Missing history_uid")
         return
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-    logger.debug(f"Storing {role} message to {filepath}")
-
-    history_data = []
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                history_data = json.load(f)
-        except Exception:
-            logger.error(f"Failed to load history file: {filepath}")
-            pass
+    safe_conf_uid, safe_history_uid = _safe_uids(conf_uid, history_uid)
+    logger.debug(f"Storing {role} message to {safe_history_uid}")
 
     now_str = datetime.now().isoformat(timespec="seconds")
     new_item = {
@@ -140,35 +178,27 @@ def store_message(
     if avatar is not None:
         new_item["avatar"] = avatar
 
-    history_data.append(new_item)
-
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(history_data, f, ensure_ascii=False, indent=2)
-    logger.debug(f"Successfully stored {role} message")
+    # Written in the background, without blocking the event loop
+    _writer.append(safe_conf_uid, safe_history_uid, new_item)
 
 
 def get_metadata(conf_uid: str, history_uid: str) -> dict:
-    """Get metadata from history file"""
+    """Get metadata of a history"""
     if not conf_uid or not history_uid:
         return {}
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-    if not os.path.exists(filepath):
-        return {}
-
+    safe_conf_uid, safe_history_uid = _safe_uids(conf_uid, history_uid)
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            history_data = json.load(f)
-
-        if history_data and history_data[0]["role"] == "metadata":
-            return history_data[0]
+        with _writer.hold(safe_conf_uid, safe_history_uid):
+            if _backend.exists(safe_conf_uid, safe_history_uid):
+                return _backend.get_metadata(safe_conf_uid, safe_history_uid)
     except Exception as e:
         logger.error(f"Failed to get metadata: {e}")
     return {}
 
 
 def update_metadate(conf_uid: str, history_uid: str, metadata: dict) -> bool:
-    """Set metadata in history file
+    """Set metadata of a history
 
     Updates existing metadata with new fields, preserving existing ones.
     If no metadata exists, creates new metadata entry.
@@ -176,28 +206,20 @@ def update_metadate(conf_uid: str, history_uid: str, metadata: dict) -> bool:
     if not conf_uid or not history_uid:
         return False
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-    if not os.path.exists(filepath):
-        return False
-
+    safe_conf_uid, safe_history_uid = _safe_uids(conf_uid, history_uid)
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            history_data = json.load(f)
-
-        if history_data and history_data[0]["role"] == "metadata":
-            # Update existing metadata while preserving other fields
-            history_data[0].update(metadata)
-        else:
-            # Create new metadata with timestamp if none exists
-            new_metadata = {
+        with _writer.hold(safe_conf_uid, safe_history_uid):
+            if not _backend.exists(safe_conf_uid, safe_history_uid):
+                return False
+
+            # Update existing metadata while preserving other fields, or
+            # create new metadata with timestamp if none exists
+            new_metadata = _backend.get_metadata(safe_conf_uid, safe_history_uid) or {
                 "role": "metadata",
                 "timestamp": datetime.now().isoformat(timespec="seconds"),
             }
-            new_metadata.update(metadata)  # Add new fields
-            history_data.insert(0, new_metadata)
-
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(history_data, f, ensure_ascii=False, indent=2)
+            new_metadata.update(metadata)
+            _backend.set_metadata(safe_conf_uid, safe_history_uid, new_metadata)
 
         logger.debug(f"Updated metadata for history {history_uid}")
         return True
@@ -215,35 +237,33 @@ def get_history(conf_uid: str, history_uid: str) -> List[HistoryMessage]:
             logger.warning("Missing history_uid")
         return []
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-
-    if not os.path.exists(filepath):
-        logger.warning(f"History file not found: {filepath}")
-        return []
-
+    safe_conf_uid, safe_history_uid = _safe_uids(conf_uid, history_uid)
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            history_data = json.load(f)
-            # Filter out metadata
-            return [msg for msg in history_data if msg["role"] != "metadata"]
-    except Exception:
+        with _writer.hold(safe_conf_uid, safe_history_uid):
+            if not _backend.exists(safe_conf_uid, safe_history_uid):
+                logger.warning(f"History not found: {safe_history_uid}")
+                return []
+            return _backend.get_messages(safe_conf_uid, safe_history_uid)
+    except Exception as e:
+        logger.error(f"Failed to read history {safe_history_uid}: {e}")
         return []
 
 
 def delete_history(conf_uid: str, history_uid: str) -> bool:
-    """Delete a specific history file"""
+    """Delete a specific history"""
     if not conf_uid or not history_uid:
         logger.warning("Missing conf_uid or history_uid")
         return False
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
+    safe_conf_uid, safe_history_uid = _safe_uids(conf_uid, history_uid)
     try:
-        if os.path.exists(filepath):
-            os.remove(filepath)
-            logger.debug(f"Successfully deleted history file: {filepath}")
+        with _writer.hold(safe_conf_uid, safe_history_uid):
+            deleted = _backend.delete(safe_conf_uid, safe_history_uid)
+        if deleted:
+            logger.debug(f"Successfully deleted history: {safe_history_uid}")
             return True
     except Exception as e:
-        logger.error(f"Failed to delete history file: {e}")
+        logger.error(f"Failed to delete history: {e}")
     return False
 
 
@@ -253,50 +273,36 @@ def get_history_list(conf_uid: str) -> List[dict]:
         return []
 
     histories = []
-    conf_dir = _ensure_conf_dir(conf_uid)
     empty_history_uids = []
 
     try:
-        for filename in os.listdir(conf_dir):
-            if not filename.endswith(".json"):
+        safe_conf_uid = _safe_conf_uid(conf_uid)
+        _writer.flush(safe_conf_uid)
+        # From the backend's index, no history is read
+        summaries = _backend.list_summaries(safe_conf_uid)
+        for summary in summaries:
+            latest_message = summary["latest_message"]
+            if latest_message is None:
+                empty_history_uids.append(summary["uid"])
                 continue
 
-            history_uid = filename[:-5]
-            filepath = os.path.join(conf_dir, filename)
-
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    messages = json.load(f)
-
-                    # Filter out metadata for checking if history is empty
-                    actual_messages = [
-                        msg for msg in messages if msg["role"] != "metadata"
-                    ]
-                    if not actual_messages:
-                        empty_history_uids.append(history_uid)
-                        continue
-
-                    latest_message = actual_messages[-1]
-                    history_info = {
-                        "uid": history_uid,
-                        "latest_message": latest_message,
-                        "timestamp": (
-                            latest_message["timestamp"] if latest_message else None
-                        ),
-                    }
-                    histories.append(history_info)
-            except Exception as e:
-                logger.error(f"Error reading history file {filename}: {e}")
-                continue
+            histories.append(
+                {
+                    "uid": summary["uid"],
+                    "latest_message": latest_message,
+                    "timestamp": latest_message.get("timestamp"),
+                    "message_count": summary["message_count"],
+                }
+            )
 
-        # Clean up empty histories if there are other non-empty ones
-        if len(empty_history_uids) > 0 and len(os.listdir(conf_dir)) > 1:
+        # Clean up empty histories if there are other ones
+        if len(empty_history_uids) > 0 and len(summaries) > 1:
             for uid in empty_history_uids:
                 try:
-                    os.remove(os.path.join(conf_dir, f"{uid}.json"))
-                    logger.info(f"Removed empty history file: {uid}")
+                    _backend.delete(safe_conf_uid, uid)
+                    logger.info(f"Removed empty history: {uid}")
                 except Exception as e:
-                    logger.error(f"Failed to remove empty history file {uid}: {e}")
+                    logger.error(f"Failed to remove empty history {uid}: {e}")
 
         histories.sort(
             key=lambda x: x["timestamp"] if x["timestamp"] else "", reverse=True
@@ -314,34 +320,28 @@ def modify_latest_message(
     role: Literal["human", "ai", "system"],
     new_content: str,
 ) -> bool:
-    """Modify the latest message in a specific history file if it matches the given role"""
+    """Modify the latest message in a specific history if it matches the given role"""
     if not conf_uid or not history_uid:
         logger.warning("Missing conf_uid or history_uid")
         return False
 
-    filepath = _get_safe_history_path(conf_uid, history_uid)
-    if not os.path.exists(filepath):
-        logger.warning(f"History file not found: {filepath}")
-        return False
-
+    safe_conf_uid, safe_history_uid = _safe_uids(conf_uid, history_uid)
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            history_data = json.load(f)
-
-        if not history_data:
-            logger.warning("History is empty")
-            return False
+        # Not written yet, no need to write it twice
+        if _writer.modify_queued(safe_conf_uid, safe_history_uid, role, new_content):
+            logger.debug(f"Successfully modified latest {role} message")
+            return True
 
-        latest_message = history_data[-1]
-        if latest_message["role"] != role:
-            logger.warning(
-                f"Latest message role ({latest_message['role']}) doesn't match requested role ({role})"
-            )
-            return False
+        with _writer.hold(safe_conf_uid, safe_history_uid):
+            if not _backend.exists(safe_conf_uid, safe_history_uid):
+                logger.warning(f"History not found: {safe_history_uid}")
+                return False
 
-        latest_message["content"] = new_content
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(history_data, f, ensure_ascii=False, indent=2)
+            if not _backend.modify_latest_message(
+                safe_conf_uid, safe_history_uid, role, new_content
+            ):
+                logger.warning(f"Latest message of the history is not a {role} message")
+                return False
 
         logger.debug(f"Successfully modified latest {role} message")
         return True
@@ -354,21 +354,20 @@ def modify_latest_message(
 def rename_history_file(
     conf_uid: str, old_history_uid: str, new_history_uid: str
 ) -> bool:
-    """Rename a history file with a new history_uid"""
+    """Rename a history with a new history_uid"""
     if not conf_uid or not old_history_uid or not new_history_uid:
         logger.warning("Missing required parameters for rename")
         return False
 
-    old_filepath = _get_safe_history_path(conf_uid, old_history_uid)
-    new_filepath = _get_safe_history_path(conf_uid, new_history_uid)
+    safe_conf_uid, safe_old_uid = _safe_uids(conf_uid, old_history_uid)
+    safe_new_uid = _sanitize_path_component(new_history_uid)
 
     try:
-        if os.path.exists(old_filepath):
-            os.rename(old_filepath, new_filepath)
-            logger.info(
-                f"Renamed history file from {old_history_uid} to {new_history_uid}"
-            )
+        with _writer.hold(safe_conf_uid, safe_old_uid):
+            renamed = _backend.rename(safe_conf_uid, safe_old_uid, safe_new_uid)
+        if renamed:
+            logger.info(f"Renamed history from {old_history_uid} to {new_history_uid}")
             return True
     except Exception as e:
-        logger.error(f"Failed to rename history file: {e}")
+        logger.error(f"Failed to rename history: {e}")
     return False
@@ -0,0 +1,194 @@
+"""
+Write-behind queue for chat history messages.
+
+`store_message` is called from the conversation handlers on the event loop.
+Instead of writing to the backend there, the messages are queued and a
+background thread writes them every `flush_interval` seconds, all queued
+messages of a history in one write. Anything else that touches a history
+(reading it, editing it, deleting it) first writes its queued messages, so
+the writes of a history are never reordered and are always visible to
+readers.
+"""
+
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Literal, Optional, Set, Tuple
+
+from loguru import logger
+
+from .chat_history_backends import HistoryBackend
+from .utils.metrics import metrics
+
+FsyncPolicy = Literal["none", "batch"]
+
+
+class HistoryWriter:
+    """
+    Queues the messages of the chat histories and writes them from a
+    background thread, coalescing the messages of each history.
+
+    fsync policies:
+    - none: the OS decides when the writes reach the disk. Queued messages
+      are lost if the process is killed.
+    - batch: the histories are synced after each write, at most once per
+      history every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        backend: HistoryBackend,
+        flush_interval: float = 0.5,
+        fsync: FsyncPolicy = "none",
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            backend: Where the histories are written
+            flush_interval: Seconds a message may wait in the queue. 0 writes
+                each message when it is stored, in the caller.
+            fsync: When the writes are synced to the disk, see above
+        """
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        # (conf_uid, history_uid) -> queued messages, oldest history first
+        self._pending: Dict[Tuple[str, str], List[dict]] = {}
+        # Histories being written (or held, see hold), one writer at a time
+        self._writing: Set[Tuple[str, str]] = set()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+        self._queued = metrics.gauge(
+            "history_queued_messages", "Chat history messages waiting to be written"
+        )
+        self._flush_ms = metrics.summary(
+            "history_flush_ms", "Time to write the queued messages of a history (ms)"
+        )
+
+    def append(self, conf_uid: str, history_uid: str, message: dict) -> None:
+        """Queue a message to be appended to a history"""
+        key = (conf_uid, history_uid)
+        if self.flush_interval <= 0 or self._closed:
+            with self.hold(*key):
+                self._write(key, [message])
+            return
+
+        with self._cond:
+            messages = self._pending.get(key)
+            if messages is None:
+                self._pending[key] = [message]
+            else:
+                messages.append(message)
+            self._queued.inc()
+            if self._worker is None:
+                self._start()
+            elif len(self._pending) == 1 and messages is None:
+                # The worker was idle
+                self._cond.notify_all()
+
+    def modify_queued(
+        self, conf_uid: str, history_uid: str, role: str, content: str
+    ) -> bool:
+        """
+        Modify the latest message of a history if it is still queued and of
+        the given role. Returns whether it was.
+        """
+        with self._cond:
+            messages = self._pending.get((conf_uid, history_uid))
+            if not messages or messages[-1]["role"] != role:
+                return False
+            messages[-1]["content"] = content
+            return True
+
+    @contextmanager
+    def hold(self, conf_uid: str, history_uid: str) -> Iterator[None]:
+        """
+        Write the queued messages of a history and keep the worker from
+        writing to it in the block.
+        """
+        key = (conf_uid, history_uid)
+        with self._cond:
+            while key in self._writing:
+                self._cond.wait()
+            messages = self._pending.pop(key, None)
+            self._writing.add(key)
+        try:
+            if messages:
+                self._queued.dec(len(messages))
+                self._write(key, messages)
+            yield
+        finally:
+            with self._cond:
+                self._writing.discard(key)
+                self._cond.notify_all()
+
+    def flush(self, conf_uid: Optional[str] = None) -> None:
+        """Write the queued messages of a character, or of all of them"""
+        with self._cond:
+            keys = [
+                key
+                for key in (*self._pending, *self._writing)
+                if conf_uid is None or key[0] == conf_uid
+            ]
+        for key in keys:
+            with self.hold(*key):
+                pass
+
+    def close(self) -> None:
+        """Write everything queued and stop the worker"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join()
+            atexit.unregister(self.close)
+        # Messages queued while the worker was stopping
+        self.flush()
+
+    def _start(self) -> None:
+        self._worker = threading.Thread(
+            target=self._run, name="history-writer", daemon=True
+        )
+        self._worker.start()
+        # The thread is a daemon, the queue is written when the process exits
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Let more messages come before writing
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                keys = list(self._pending)
+            for key in keys:
+                with self.hold(*key):
+                    pass
+
+    def _write(self, key: Tuple[str, str], messages: List[dict]) -> None:
+        started = time.perf_counter()
+        try:
+            self.backend.append_many(*key, messages)
+            if self.fsync == "batch":
+                self.backend.sync(*key)
+        except Exception as e:
+            logger.error(
+                f"Failed to write {len(messages)} messages to history {key[1]}: {e}"
+            )
+            return
+        self._flush_ms.observe((time.perf_counter() - started) * 1000)
@@ -36,6 +36,7 @@ from .tts import (
     GPTSoVITSConfig,
     FishAPITTSConfig,
     SherpaOnnxTTSConfig,
+    TTSCacheConfig,
 )
 from .vad import (
     VADConfig,
@@ -48,10 +49,7 @@ from .agent import (
     AgentSettings,
     StatelessLLMConfigs,
     BasicMemoryAgentConfig,
-    Mem0Config,
-    Mem0VectorStoreConfig,
-    Mem0LLMConfig,
-    Mem0EmbedderConfig,
+    VectorMemoryAgentConfig,
 )
 
 # Import utility functions
@@ -77,10 +75,7 @@ __all__ = [
     "AgentSettings",
     "StatelessLLMConfigs",
     "BasicMemoryAgentConfig",
-    "Mem0Config",
-    "Mem0VectorStoreConfig",
-    "Mem0LLMConfig",
-    "Mem0EmbedderConfig",
+    "VectorMemoryAgentConfig",
     # ASR related classes
     "ASRConfig",
     "AzureASRConfig",
@@ -102,6 +97,7 @@ __all__ = [
     "GPTSoVITSConfig",
     "FishAPITTSConfig",
     "SherpaOnnxTTSConfig",
+    "TTSCacheConfig",
     # VAD related classes
     "VADConfig",
     "SileroVADConfig",
@@ -29,6 +29,10 @@ class BasicMemoryAgentConfig(I18nMixin, BaseModel):
 
     faster_first_response: Optional[bool] = Field(True, alias="faster_first_response")
     segment_method: Literal["regex", "pysbd"] = Field("pysbd", alias="segment_method")
+    adaptive_chunking: bool = Field(False, alias="adaptive_chunking")
+    context_max_tokens: int = Field(0, alias="context_max_tokens")
+    context_tokenizer: Optional[str] = Field(None, alias="context_tokenizer")
+    summary_llm_provider: Optional[str] = Field(None, alias="summary_llm_provider")
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
         "llm_provider": Description(
             en="LLM provider to use for this agent",
@@ -42,64 +46,82 @@ class BasicMemoryAgentConfig(I18nMixin, BaseModel):
             en="Method for segmenting sentences: 'regex' or 'pysbd' (default: 'pysbd')",
             zh="分割句子的方法：'regex' 或 'pysbd'（默认：'pysbd'）",
         ),
-    }
-
-
-class Mem0VectorStoreConfig(I18nMixin, BaseModel):
-    """Configuration for Mem0 vector store."""
-
-    provider: str = Field(..., alias="provider")
-    config: Dict = Field(..., alias="config")
-
-    DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
-        "provider": Description(
-            en="Vector store provider (e.g., qdrant)", zh="向量存储提供者（如 qdrant）"
+        "adaptive_chunking": Description(
+            en="Size speech chunks to the TTS queue: cut long sentences early when the queue is nearly empty, merge short ones when it is full (default: False)",
+            zh="根据 TTS 队列调整语音分段：队列快空时提前切分长句，队列较满时合并短句（默认：False）",
         ),
-        "config": Description(
-            en="Provider-specific configuration", zh="提供者特定配置"
+        "context_max_tokens": Description(
+            en="Token budget of the prompt; older turns are folded into a summary written in the background by summary_llm_provider, or dropped without one. 0 disables the limit (default: 0)",
+            zh="提示词的 token 上限；较早的对话会由 summary_llm_provider 在后台总结为摘要，未设置时直接丢弃。0 表示不限制（默认：0）",
         ),
-    }
-
-
-class Mem0LLMConfig(I18nMixin, BaseModel):
-    """Configuration for Mem0 LLM."""
-
-    provider: str = Field(..., alias="provider")
-    config: Dict = Field(..., alias="config")
-
-    DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
-        "provider": Description(en="LLM provider name", zh="语言模型提供者名称"),
-        "config": Description(
-            en="Provider-specific configuration", zh="提供者特定配置"
+        "context_tokenizer": Description(
+            en="Hugging Face tokenizer used to count tokens, e.g. 'Qwen/Qwen2.5-7B-Instruct'. Empty to estimate from the characters (default: empty)",
+            zh="用于计算 token 数的 Hugging Face 分词器，例如 'Qwen/Qwen2.5-7B-Instruct'。留空则按字符数估算（默认：空）",
         ),
-    }
-
-
-class Mem0EmbedderConfig(I18nMixin, BaseModel):
-    """Configuration for Mem0 embedder."""
-
-    provider: str = Field(..., alias="provider")
-    config: Dict = Field(..., alias="config")
-
-    DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
-        "provider": Description(en="Embedder provider name", zh="嵌入模型提供者名称"),
-        "config": Description(
-            en="Provider-specific configuration", zh="提供者特定配置"
+        "summary_llm_provider": Description(
+            en="LLM provider from llm_configs that writes the summary, e.g. a cheaper model. Use another model than llm_provider if it runs locally, so summaries do not delay replies. Empty to drop older turns without a summary (default: empty)",
+            zh="用于生成摘要的 LLM 提供商（来自 llm_configs），例如一个更便宜的模型。若 llm_provider 在本地运行，请使用另一个模型，以免摘要拖慢回复。留空则不生成摘要，直接丢弃较早的对话（默认：空）",
         ),
     }
 
 
-class Mem0Config(I18nMixin, BaseModel):
-    """Configuration for Mem0."""
+class VectorMemoryAgentConfig(I18nMixin, BaseModel):
+    """Configuration for the agent with local long-term memory (mem0_agent)."""
 
-    vector_store: Mem0VectorStoreConfig = Field(..., alias="vector_store")
-    llm: Mem0LLMConfig = Field(..., alias="llm")
-    embedder: Mem0EmbedderConfig = Field(..., alias="embedder")
+    llm_provider: Optional[str] = Field(None, alias="llm_provider")
+    faster_first_response: Optional[bool] = Field(True, alias="faster_first_response")
+    segment_method: Literal["regex", "pysbd"] = Field("pysbd", alias="segment_method")
+    embedding_provider: Literal[
+        "hashing", "sentence_transformers", "openai_compatible"
+    ] = Field("hashing", alias="embedding_provider")
+    embedding_model: Optional[str] = Field(None, alias="embedding_model")
+    embedding_base_url: Optional[str] = Field(None, alias="embedding_base_url")
+    memory_dir: str = Field("memory", alias="memory_dir")
+    top_k: int = Field(5, alias="top_k")
+    min_score: float = Field(0.3, alias="min_score")
+    retrieval_budget_ms: float = Field(20.0, alias="retrieval_budget_ms")
 
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
-        "vector_store": Description(en="Vector store configuration", zh="向量存储配置"),
-        "llm": Description(en="LLM configuration", zh="语言模型配置"),
-        "embedder": Description(en="Embedder configuration", zh="嵌入模型配置"),
+        "llm_provider": Description(
+            en="LLM provider to use for this agent",
+            zh="该智能体使用的大语言模型选项",
+        ),
+        "faster_first_response": Description(
+            en="Whether to respond as soon as encountering a comma in the first sentence to reduce latency (default: True)",
+            zh="是否在第一句回应时遇上逗号就直接生成音频以减少首句延迟（默认：True）",
+        ),
+        "segment_method": Description(
+            en="Method for segmenting sentences: 'regex' or 'pysbd' (default: 'pysbd')",
+            zh="分割句子的方法：'regex' 或 'pysbd'（默认：'pysbd'）",
+        ),
+        "embedding_provider": Description(
+            en="Embedder of the memories: 'hashing' (no model, matches shared words only), 'sentence_transformers' (local model) or 'openai_compatible' (embeddings endpoint, e.g. Ollama) (default: 'hashing')",
+            zh="记忆的嵌入方式：'hashing'（无需模型，仅匹配相同词语）、'sentence_transformers'（本地模型）或 'openai_compatible'（嵌入接口，如 Ollama）（默认：'hashing'）",
+        ),
+        "embedding_model": Description(
+            en="Embedding model, e.g. 'sentence-transformers/all-MiniLM-L6-v2' or 'nomic-embed-text'",
+            zh="嵌入模型，例如 'sentence-transformers/all-MiniLM-L6-v2' 或 'nomic-embed-text'",
+        ),
+        "embedding_base_url": Description(
+            en="Base URL of the embeddings endpoint, e.g. 'http://localhost:11434/v1'",
+            zh="嵌入接口的基础 URL，例如 'http://localhost:11434/v1'",
+        ),
+        "memory_dir": Description(
+            en="Directory of the memory stores, one per character and embedder (default: 'memory')",
+            zh="记忆存储目录，每个角色和嵌入方式各一个（默认：'memory'）",
+        ),
+        "top_k": Description(
+            en="Most memories recalled per turn (default: 5)",
+            zh="每轮最多召回的记忆数（默认：5）",
+        ),
+        "min_score": Description(
+            en="Lowest cosine similarity of a recalled memory (default: 0.3)",
+            zh="召回记忆的最低余弦相似度（默认：0.3）",
+        ),
+        "retrieval_budget_ms": Description(
+            en="Time the memory search may take, in milliseconds; the best memories found by then are used (default: 20)",
+            zh="记忆检索的时间上限（毫秒），超时则使用已找到的最佳结果（默认：20）",
+        ),
     }
 
 
@@ -138,14 +160,17 @@ class AgentSettings(I18nMixin, BaseModel):
     basic_memory_agent: Optional[BasicMemoryAgentConfig] = Field(
         None, alias="basic_memory_agent"
     )
-    mem0_agent: Optional[Mem0Config] = Field(None, alias="mem0_agent")
+    mem0_agent: Optional[VectorMemoryAgentConfig] = Field(None, alias="mem0_agent")
     hume_ai_agent: Optional[HumeAIConfig] = Field(None, alias="hume_ai_agent")
 
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
         "basic_memory_agent": Description(
             en="Configuration for basic memory agent", zh="基础记忆代理配置"
         ),
-        "mem0_agent": Description(en="Configuration for Mem0 agent", zh="Mem0代理配置"),
+        "mem0_agent": Description(
+            en="Configuration for the agent with local long-term memory",
+            zh="本地长期记忆代理配置",
+        ),
         "hume_ai_agent": Description(
             en="Configuration for Hume AI agent", zh="Hume AI 代理配置"
         ),
@@ -190,6 +190,16 @@ class SherpaOnnxASRConfig(I18nMixin):
     num_threads: int = Field(4, alias="num_threads")
     use_itn: bool = Field(True, alias="use_itn")
     provider: Literal["cpu", "cuda"] = Field("cpu", alias="provider")
+    streaming_model_type: Literal["", "transducer", "paraformer", "zipformer2_ctc"] = (
+        Field("", alias="streaming_model_type")
+    )
+    streaming_encoder: Optional[str] = Field(None, alias="streaming_encoder")
+    streaming_decoder: Optional[str] = Field(None, alias="streaming_decoder")
+    streaming_joiner: Optional[str] = Field(None, alias="streaming_joiner")
+    streaming_ctc: Optional[str] = Field(None, alias="streaming_ctc")
+    streaming_tokens: Optional[str] = Field(None, alias="streaming_tokens")
+    batch_window_ms: float = Field(5.0, alias="batch_window_ms")
+    max_batch_size: int = Field(16, alias="max_batch_size")
 
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
         "model_type": Description(
@@ -231,6 +241,38 @@ class SherpaOnnxASRConfig(I18nMixin):
             en="Provider for inference (cpu or cuda) (cuda option needs additional settings. Please check our docs)",
             zh="推理平台（cpu 或 cuda）(cuda 需要额外配置，请参考文档)",
         ),
+        "streaming_model_type": Description(
+            en="Type of the streaming model used for partial transcripts while the user is speaking (leave empty to disable)",
+            zh="用于在用户说话时生成实时转录的流式模型类型（留空以禁用）",
+        ),
+        "streaming_encoder": Description(
+            en="Path to streaming encoder model (for transducer and paraformer)",
+            zh="流式编码器模型路径（用于 transducer 和 paraformer）",
+        ),
+        "streaming_decoder": Description(
+            en="Path to streaming decoder model (for transducer and paraformer)",
+            zh="流式解码器模型路径（用于 transducer 和 paraformer）",
+        ),
+        "streaming_joiner": Description(
+            en="Path to streaming joiner model (for transducer)",
+            zh="流式连接器模型路径（用于 transducer）",
+        ),
+        "streaming_ctc": Description(
+            en="Path to streaming CTC model (for zipformer2_ctc)",
+            zh="流式 CTC 模型路径（用于 zipformer2_ctc）",
+        ),
+        "streaming_tokens": Description(
+            en="Path to tokens file of the streaming model",
+            zh="流式模型的词元文件路径",
+        ),
+        "batch_window_ms": Description(
+            en="How long (ms) a transcription request waits so requests from other users can be decoded in the same batch",
+            zh="转录请求等待的时间（毫秒），以便与其他用户的请求合并为一批解码",
+        ),
+        "max_batch_size": Description(
+            en="Maximum number of transcription requests decoded together (1 disables batching)",
+            zh="一次合并解码的最大转录请求数（1 表示禁用批处理）",
+        ),
     }
 
     @model_validator(mode="after")
@@ -273,6 +315,36 @@ class SherpaOnnxASRConfig(I18nMixin):
                     "sense_voice and tokens must be provided for sense_voice model type"
                 )
 
+        streaming_model_type = values.streaming_model_type
+        if streaming_model_type == "transducer":
+            if not all(
+                [
+                    values.streaming_encoder,
+                    values.streaming_decoder,
+                    values.streaming_joiner,
+                    values.streaming_tokens,
+                ]
+            ):
+                raise ValueError(
+                    "streaming_encoder, streaming_decoder, streaming_joiner, and streaming_tokens must be provided for transducer streaming model type"
+                )
+        elif streaming_model_type == "paraformer":
+            if not all(
+                [
+                    values.streaming_encoder,
+                    values.streaming_decoder,
+                    values.streaming_tokens,
+                ]
+            ):
+                raise ValueError(
+                    "streaming_encoder, streaming_decoder, and streaming_tokens must be provided for paraformer streaming model type"
+                )
+        elif streaming_model_type == "zipformer2_ctc":
+            if not all([values.streaming_ctc, values.streaming_tokens]):
+                raise ValueError(
+                    "streaming_ctc and streaming_tokens must be provided for zipformer2_ctc streaming model type"
+                )
+
         return values
 
 
@@ -170,6 +170,8 @@ class LlamaCppConfig(StatelessLLMBaseConfig):
     """Configuration for LlamaCpp."""
 
     model_path: str = Field(..., alias="model_path")
+    state_dir: str = Field("cache/llama_state", alias="state_dir")
+    max_state_files: int = Field(8, alias="max_state_files")
     interrupt_method: Literal["system", "user"] = Field(
         "system", alias="interrupt_method"
     )
@@ -178,6 +180,14 @@ class LlamaCppConfig(StatelessLLMBaseConfig):
         "model_path": Description(
             en="Path to the GGUF model file", zh="GGUF 模型文件路径"
         ),
+        "state_dir": Description(
+            en="Directory where the model state (KV cache) of each chat history is saved, so switching or resuming a history does not process it again. Empty to disable (default: cache/llama_state)",
+            zh="保存每个聊天记录的模型状态（KV 缓存）的目录，切换或恢复聊天记录时无需重新处理。留空则禁用（默认：cache/llama_state）",
+        ),
+        "max_state_files": Description(
+            en="Number of saved chat history states to keep; the least recently used are removed (default: 8)",
+            zh="保留的聊天记录状态文件数量，最久未使用的会被删除（默认：8）",
+        ),
     }
 
     DESCRIPTIONS: ClassVar[dict[str, Description]] = {
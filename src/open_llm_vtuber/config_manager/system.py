@@ -1,6 +1,6 @@
 # config_manager/system.py
 from pydantic import Field, model_validator
-from typing import Dict, ClassVar
+from typing import Dict, ClassVar, Literal
 from .i18n import I18nMixin, Description
 
 
@@ -13,6 +13,14 @@ class SystemConfig(I18nMixin):
     config_alts_dir: str = Field(..., alias="config_alts_dir")
     tool_prompts: Dict[str, str] = Field(..., alias="tool_prompts")
     enable_proxy: bool = Field(False, alias="enable_proxy")
+    tts_max_concurrency: int = Field(8, alias="tts_max_concurrency")
+    chat_history_backend: Literal["jsonl", "sqlite"] = Field(
+        "jsonl", alias="chat_history_backend"
+    )
+    chat_history_flush_interval: float = Field(0.5, alias="chat_history_flush_interval")
+    chat_history_fsync: Literal["none", "batch"] = Field(
+        "none", alias="chat_history_fsync"
+    )
 
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
         "conf_version": Description(en="Configuration version", zh="配置文件版本"),
@@ -25,9 +33,25 @@ class SystemConfig(I18nMixin):
             en="Tool prompts to be inserted into persona prompt",
             zh="要插入到角色提示词中的工具提示词",
         ),
-         "enable_proxy": Description(
+        "enable_proxy": Description(
             en="Enable proxy mode for multiple clients",
-            zh="启用代理模式以支持多个客户端使用一个 ws 连接"
+            zh="启用代理模式以支持多个客户端使用一个 ws 连接",
+        ),
+        "tts_max_concurrency": Description(
+            en="Maximum number of sentences synthesized at once across all clients",
+            zh="所有客户端同时合成的最大句子数",
+        ),
+        "chat_history_backend": Description(
+            en="Storage of the chat histories: 'jsonl' (an append-only file per history) or 'sqlite' (a database per character). Histories in the old JSON format are migrated on first use (default: 'jsonl')",
+            zh="聊天记录的存储方式：'jsonl'（每个记录一个只追加的文件）或 'sqlite'（每个角色一个数据库）。旧 JSON 格式的记录会在首次使用时自动迁移（默认：'jsonl'）",
+        ),
+        "chat_history_flush_interval": Description(
+            en="Seconds a chat message may wait before it is written to the history, in the background. 0 writes it at once, blocking the server (default: 0.5)",
+            zh="聊天消息在后台写入记录前最多等待的秒数。0 表示立即写入，会阻塞服务器（默认：0.5）",
+        ),
+        "chat_history_fsync": Description(
+            en="When written chat histories are synced to the disk: 'none' (left to the OS) or 'batch' (after each background write) (default: 'none')",
+            zh="聊天记录何时同步到磁盘：'none'（由操作系统决定）或 'batch'（每次后台写入后）（默认：'none'）",
         ),
     }
 
@@ -36,4 +60,8 @@ class SystemConfig(I18nMixin):
         port = values.port
         if port < 0 or port > 65535:
             raise ValueError("Port must be between 0 and 65535")
+        if values.tts_max_concurrency < 1:
+            raise ValueError("tts_max_concurrency must be at least 1")
+        if values.chat_history_flush_interval < 0:
+            raise ValueError("chat_history_flush_interval must not be negative")
         return values
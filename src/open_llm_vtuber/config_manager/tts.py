@@ -301,6 +301,39 @@ class SherpaOnnxTTSConfig(I18nMixin):
     }
 
 
+class TTSCacheConfig(I18nMixin):
+    """Configuration for the TTS audio cache."""
+
+    enabled: bool = Field(True, alias="enabled")
+    cache_dir: str = Field("tts_cache", alias="cache_dir")
+    max_memory_mb: float = Field(64, alias="max_memory_mb")
+    max_disk_mb: float = Field(512, alias="max_disk_mb")
+    max_text_length: int = Field(200, alias="max_text_length")
+
+    DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
+        "enabled": Description(
+            en="Reuse synthesized audio for repeated sentences",
+            zh="对重复的句子复用已合成的音频",
+        ),
+        "cache_dir": Description(
+            en="Directory of the on-disk cache (kept across restarts)",
+            zh="磁盘缓存目录（重启后保留）",
+        ),
+        "max_memory_mb": Description(
+            en="Maximum size of the in-memory cache in MB",
+            zh="内存缓存的最大大小（MB）",
+        ),
+        "max_disk_mb": Description(
+            en="Maximum size of the on-disk cache in MB, 0 to disable it",
+            zh="磁盘缓存的最大大小（MB），0 表示禁用",
+        ),
+        "max_text_length": Description(
+            en="Sentences longer than this many characters are not cached",
+            zh="超过此字符数的句子不会被缓存",
+        ),
+    }
+
+
 class TTSConfig(I18nMixin):
     """Configuration for Text-to-Speech."""
 
@@ -331,6 +364,8 @@ class TTSConfig(I18nMixin):
     sherpa_onnx_tts: Optional[SherpaOnnxTTSConfig] = Field(
         None, alias="sherpa_onnx_tts"
     )
+    tts_cache: TTSCacheConfig = Field(default_factory=TTSCacheConfig, alias="tts_cache")
+    max_concurrency: int = Field(4, alias="max_concurrency")
 
     DESCRIPTIONS: ClassVar[Dict[str, Description]] = {
         "tts_model": Description(
@@ -357,6 +392,13 @@ class TTSConfig(I18nMixin):
         "sherpa_onnx_tts": Description(
             en="Configuration for Sherpa Onnx TTS", zh="Sherpa Onnx TTS 配置"
         ),
+        "tts_cache": Description(
+            en="Configuration for the TTS audio cache", zh="TTS 音频缓存配置"
+        ),
+        "max_concurrency": Description(
+            en="Maximum number of sentences the TTS engine synthesizes at once",
+            zh="TTS 引擎同时合成的最大句子数",
+        ),
     }
 
     @model_validator(mode="after")
@@ -9,10 +9,11 @@ from loguru import logger
 from ..chat_group import ChatGroupManager
 from ..chat_history_manager import store_message
 from ..service_context import ServiceContext
+from ..utils.audio_buffer import AudioBuffer
 from .group_conversation import process_group_conversation
 from .single_conversation import process_single_conversation
 from .conversation_utils import EMOJI_LIST
-from .types import GroupConversationState
+from .types import GroupConversationState, WebSocketSender
 
 
 async def handle_conversation_trigger(
@@ -24,7 +25,8 @@ async def handle_conversation_trigger(
     client_contexts: Dict[str, ServiceContext],
     client_connections: Dict[str, WebSocket],
     chat_group_manager: ChatGroupManager,
-    received_data_buffers: Dict[str, np.ndarray],
+    received_data_buffers: Dict[str, AudioBuffer],
+    streaming_transcripts: Dict[str, str],
     current_conversation_tasks: Dict[str, Optional[asyncio.Task]],
     broadcast_to_group: Callable,
 ) -> None:
@@ -42,8 +44,11 @@ async def handle_conversation_trigger(
     elif msg_type == "text-input":
         user_input = data.get("text", "")
     else:  # mic-audio-end
-        user_input = received_data_buffers[client_uid]
-        received_data_buffers[client_uid] = np.array([])
+        user_input = received_data_buffers[client_uid].take()
+        # Streaming ASR already transcribed this utterance while it was spoken
+        transcript = streaming_transcripts.pop(client_uid, None)
+        if transcript:
+            user_input = transcript
 
     images = data.get("images")
     session_emoji = np.random.choice(EMOJI_LIST)
@@ -75,7 +80,7 @@ async def handle_conversation_trigger(
         current_conversation_tasks[client_uid] = asyncio.create_task(
             process_single_conversation(
                 context=context,
-                websocket_send=websocket.send_text,
+                websocket_send=WebSocketSender(websocket),
                 client_uid=client_uid,
                 user_input=user_input,
                 images=images,
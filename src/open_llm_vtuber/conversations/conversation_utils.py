@@ -6,7 +6,7 @@ import json
 from loguru import logger
 
 from ..message_handler import message_handler
-from .types import WebSocketSend, BroadcastContext
+from .types import WebSocketSend, BroadcastContext, send_audio_payload
 from .tts_manager import TTSTaskManager
 from ..agent.output_types import SentenceOutput, AudioOutput
 from ..agent.input_types import BatchInput, TextData, ImageData, TextSource, ImageSource
@@ -93,8 +93,10 @@ async def handle_sentence_output(
         logger.debug(f"🏃 Processing output: '''{tts_text}'''...")
 
         if translate_engine:
-            if len(re.sub(r'[\s.,!?，。！？\'"』」）】\s]+', "", tts_text)):
-                tts_text = translate_engine.translate(tts_text)
+            if len(
+                re.sub(r'[\s.,!?，。！？\'"』」）】\s]+', "", tts_text)
+            ) and translate_engine.needs_translation(tts_text):
+                tts_text = await translate_engine.async_translate(tts_text)
             logger.info(f"🏃 Text after translation: '''{tts_text}'''...")
         else:
             logger.debug("🚫 No translation engine available. Skipping translation.")
@@ -124,7 +126,7 @@ async def handle_audio_output(
             display_text=display_text,
             actions=actions.to_dict() if actions else None,
         )
-        await websocket_send(json.dumps(audio_payload))
+        await send_audio_payload(websocket_send, audio_payload)
     return full_response
 
 
@@ -18,6 +18,7 @@ from .types import (
     GroupConversationState,
     BroadcastContext,
     WebSocketSend,
+    WebSocketSender,
 )
 from ..service_context import ServiceContext
 from ..chat_history_manager import store_message
@@ -47,7 +48,7 @@ async def process_group_conversation(
         session_emoji: Emoji identifier for the conversation
     """
     # Create TTSTaskManager for each member
-    tts_managers = {uid: TTSTaskManager() for uid in group_members}
+    tts_managers = {uid: TTSTaskManager(session_id=uid) for uid in group_members}
 
     try:
         logger.info(f"Group Conversation Chain {session_emoji} started!")
@@ -77,7 +78,7 @@ async def process_group_conversation(
         input_text = await process_group_input(
             user_input=user_input,
             initiator_context=initiator_context,
-            initiator_ws_send=client_connections[initiator_client_uid].send_text,
+            initiator_ws_send=WebSocketSender(client_connections[initiator_client_uid]),
             broadcast_func=broadcast_func,
             group_members=group_members,
             initiator_client_uid=initiator_client_uid,
@@ -221,7 +222,7 @@ async def handle_group_member_turn(
     await broadcast_thinking_state(broadcast_func, group_members)
 
     context = client_contexts[current_member_uid]
-    current_ws_send = client_connections[current_member_uid].send_text
+    current_ws_send = WebSocketSender(client_connections[current_member_uid])
 
     new_messages = state.conversation_history[state.memory_index[current_member_uid] :]
     new_context = "\n".join(new_messages) if new_messages else ""
@@ -321,6 +322,7 @@ async def process_member_response(
     full_response = ""
 
     try:
+        context.agent_engine.set_tts_status(tts_manager)
         agent_output = context.agent_engine.chat(batch_input)
 
         async for output in agent_output:
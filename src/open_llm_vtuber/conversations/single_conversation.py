@@ -41,7 +41,7 @@ async def process_single_conversation(
         str: Complete response text
     """
     # Create TTSTaskManager for this conversation
-    tts_manager = TTSTaskManager()
+    tts_manager = TTSTaskManager(session_id=client_uid)
 
     try:
         # Send initial signals
@@ -137,6 +137,7 @@ async def process_agent_response(
     """
     full_response = ""
     try:
+        context.agent_engine.set_tts_status(tts_manager)
         agent_output = context.agent_engine.chat(batch_input)
         async for output in agent_output:
             response_part = await process_agent_output(
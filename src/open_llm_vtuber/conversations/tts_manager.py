@@ -1,22 +1,26 @@
 import asyncio
-import json
 import re
-import uuid
-from datetime import datetime
+import time
 from typing import List, Optional, Dict
+
+import numpy as np
 from loguru import logger
 
 from ..agent.output_types import DisplayText, Actions
 from ..live2d_model import Live2dModel
 from ..tts.tts_interface import TTSInterface
-from ..utils.stream_audio import prepare_audio_payload
-from .types import WebSocketSend
+from ..tts.tts_scheduler import tts_scheduler
+from ..utils.stream_audio import prepare_audio_payload, prepare_pcm_audio_payload
+from ..utils.volume_envelope import VolumeEnvelope, quantize_volumes, volumes_to_list
+from .types import WebSocketSend, send_audio_payload
 
 
 class TTSTaskManager:
     """Manages TTS tasks and ensures ordered delivery to frontend while allowing parallel TTS generation"""
 
-    def __init__(self) -> None:
+    def __init__(self, session_id: str = "") -> None:
+        # Session the sentences are scheduled for, see TTSScheduler
+        self.session_id = session_id
         self.task_list: List[asyncio.Task] = []
         self._lock = asyncio.Lock()
         # Queue to store ordered payloads
@@ -26,6 +30,26 @@ class TTSTaskManager:
         # Counter for maintaining order
         self._sequence_counter = 0
         self._next_sequence_to_send = 0
+        # Minimum length of streamed audio sent in one payload
+        self.min_payload_seconds = 0.5
+        # When the client will have played all audio sent so far
+        self._playback_end = 0.0
+
+    @property
+    def queued_sentences(self) -> int:
+        """Sentences being synthesized or waiting to be sent"""
+        return self._sequence_counter - self._next_sequence_to_send
+
+    @property
+    def playback_seconds_remaining(self) -> float:
+        """Estimated seconds of sent audio the client has not played yet"""
+        return max(0.0, self._playback_end - time.monotonic())
+
+    def _track_playback(self, payload: Dict) -> None:
+        """Add a sent payload to the estimated playback time"""
+        volumes = payload.get("volumes") or []
+        seconds = len(volumes) * (payload.get("slice_length") or 0) / 1000
+        self._playback_end = max(self._playback_end, time.monotonic()) + seconds
 
     async def speak(
         self,
@@ -92,20 +116,33 @@ class TTSTaskManager:
     async def _process_payload_queue(self, websocket_send: WebSocketSend) -> None:
         """
         Process and send payloads in correct order.
+        A sentence can have several payloads (streamed audio chunks); its
+        payloads are sent as they arrive, and the next sentence starts once
+        the last one has been queued.
         Runs continuously until all payloads are processed.
         """
-        buffered_payloads: Dict[int, Dict] = {}
+        buffered_payloads: Dict[int, List[Optional[Dict]]] = {}
 
         while True:
             try:
                 # Get payload from queue
                 payload, sequence_number = await self._payload_queue.get()
-                buffered_payloads[sequence_number] = payload
+                buffered_payloads.setdefault(sequence_number, []).append(payload)
 
                 # Send payloads in order
                 while self._next_sequence_to_send in buffered_payloads:
-                    next_payload = buffered_payloads.pop(self._next_sequence_to_send)
-                    await websocket_send(json.dumps(next_payload))
+                    payloads = buffered_payloads[self._next_sequence_to_send]
+                    finished = False
+                    for next_payload in payloads:
+                        if next_payload is None:  # end of the sentence
+                            finished = True
+                        else:
+                            await send_audio_payload(websocket_send, next_payload)
+                            self._track_playback(next_payload)
+                    payloads.clear()
+                    if not finished:
+                        break
+                    del buffered_payloads[self._next_sequence_to_send]
                     self._next_sequence_to_send += 1
 
                 self._payload_queue.task_done()
@@ -126,6 +163,7 @@ class TTSTaskManager:
             actions=actions,
         )
         await self._payload_queue.put((audio_payload, sequence_number))
+        await self._payload_queue.put((None, sequence_number))
 
     async def _process_tts(
         self,
@@ -136,20 +174,76 @@ class TTSTaskManager:
         tts_engine: TTSInterface,
         sequence_number: int,
     ) -> None:
-        """Process TTS generation and queue the result for ordered delivery"""
-        audio_file_path = None
-        try:
-            audio_file_path = await self._generate_audio(tts_engine, tts_text)
-            payload = prepare_audio_payload(
-                audio_path=audio_file_path,
+        """
+        Stream TTS audio and queue it for ordered delivery.
+
+        Synthesis waits for a slot from the TTS scheduler. Audio chunks are
+        coalesced into payloads of at least `min_payload_seconds` and
+        forwarded while synthesis goes on.
+        The actions are sent with the first payload only.
+        """
+        logger.debug(f"🏃Generating audio for '''{tts_text}'''...")
+        pending = bytearray()
+        envelope: Optional[VolumeEnvelope] = None
+        # RMS of the slices in `pending`, computed as the chunks arrive
+        rms_parts: List[np.ndarray] = []
+        payloads_sent = 0
+
+        async def flush(final: bool) -> None:
+            nonlocal payloads_sent
+            if final:
+                rms_parts.append(envelope.finish())
+                # Only send whole 16-bit samples
+                size = len(pending) - len(pending) % 2
+            else:
+                min_bytes = int(self.min_payload_seconds * envelope.sample_rate) * 2
+                if len(pending) < min_bytes:
+                    return
+                # Cut at a slice boundary so the volumes line up with the audio
+                size = len(pending) - len(pending) % envelope.slice_bytes
+            rms = np.concatenate(rms_parts)
+            rms_parts.clear()
+            if size == 0:
+                return
+            payload = prepare_pcm_audio_payload(
+                pcm=bytes(pending[:size]),
+                sample_rate=envelope.sample_rate,
                 display_text=display_text,
-                actions=actions,
+                actions=actions if payloads_sent == 0 else None,
+                # Normalized to the loudest slice of the sentence so far
+                volumes=volumes_to_list(quantize_volumes(rms, envelope.peak)),
             )
-            # Queue the payload with its sequence number
+            del pending[:size]
             await self._payload_queue.put((payload, sequence_number))
+            payloads_sent += 1
+
+        try:
+            async with tts_scheduler.slot(self.session_id, sequence_number, tts_engine):
+                async for chunk in tts_engine.async_stream_audio(tts_text):
+                    if (
+                        envelope is not None
+                        and chunk.sample_rate != envelope.sample_rate
+                    ):
+                        await flush(final=True)
+                        pending.clear()
+                        envelope = None
+                    if envelope is None:
+                        envelope = VolumeEnvelope(chunk.sample_rate)
+                    pending.extend(chunk.pcm)
+                    rms_parts.append(envelope.add(chunk.pcm))
+                    await flush(final=False)
+            if envelope is not None:
+                await flush(final=True)
+
+        except asyncio.CancelledError:
+            # Interrupted: the sentence will not be played, queue nothing
+            logger.debug(f"TTS cancelled for: {tts_text}")
+            raise
 
         except Exception as e:
             logger.error(f"Error preparing audio payload: {e}")
+
+        if payloads_sent == 0:
             # Queue silent payload for error case
             payload = prepare_audio_payload(
                 audio_path=None,
@@ -157,26 +251,20 @@ class TTSTaskManager:
                 actions=actions,
             )
             await self._payload_queue.put((payload, sequence_number))
-
-        finally:
-            if audio_file_path:
-                tts_engine.remove_file(audio_file_path)
-                logger.debug("Audio cache file cleaned.")
-
-    async def _generate_audio(self, tts_engine: TTSInterface, text: str) -> str:
-        """Generate audio file from text"""
-        logger.debug(f"🏃Generating audio for '''{text}'''...")
-        return await tts_engine.async_generate_audio(
-            text=text,
-            file_name_no_ext=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}",
-        )
+        # Mark the end of this sentence
+        await self._payload_queue.put((None, sequence_number))
 
     def clear(self) -> None:
-        """Clear all pending tasks and reset state"""
+        """Cancel queued and running TTS tasks and reset state"""
+        for task in self.task_list:
+            # Tasks waiting for a scheduler slot give it up, running ones
+            # stop synthesizing
+            task.cancel()
         self.task_list.clear()
         if self._sender_task:
             self._sender_task.cancel()
         self._sequence_counter = 0
         self._next_sequence_to_send = 0
+        self._playback_end = 0.0
         # Create a new queue to clear any pending items
         self._payload_queue = asyncio.Queue()
@@ -1,8 +1,10 @@
 from typing import List, Dict, Callable, Optional, TypedDict, Awaitable, ClassVar
 from dataclasses import dataclass, field
+from fastapi import WebSocket
 from pydantic import BaseModel
 
 from ..agent.output_types import Actions, DisplayText
+from ..utils.stream_audio import audio_payload_to_frame, audio_payload_to_json
 
 # Type definitions
 WebSocketSend = Callable[[str], Awaitable[None]]
@@ -21,6 +23,39 @@ class AudioPayload(TypedDict):
     forwarded: Optional[bool]
 
 
+class WebSocketSender:
+    """
+    A WebSocketSend for one client connection.
+
+    Calling it sends a text message, like `websocket.send_text`. Audio
+    payloads sent with `send_audio` use the transport the client negotiated
+    with a `set-audio-transport` message: binary frames or JSON.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+
+    async def __call__(self, message: str) -> None:
+        await self.websocket.send_text(message)
+
+    async def send_audio(self, payload: dict) -> None:
+        state = self.websocket.state
+        if getattr(state, "binary_audio", False):
+            sequence = getattr(state, "audio_sequence", 0)
+            state.audio_sequence = sequence + 1
+            await self.websocket.send_bytes(audio_payload_to_frame(payload, sequence))
+        else:
+            await self.websocket.send_text(audio_payload_to_json(payload))
+
+
+async def send_audio_payload(websocket_send: WebSocketSend, payload: dict) -> None:
+    """Send an audio payload, as a binary frame if the client negotiated it"""
+    if isinstance(websocket_send, WebSocketSender):
+        await websocket_send.send_audio(payload)
+    else:
+        await websocket_send(audio_payload_to_json(payload))
+
+
 @dataclass
 class BroadcastContext:
     """Context for broadcasting messages in group chat"""
@@ -1,4 +1,5 @@
 import json
+import re
 import chardet
 from loguru import logger
 
@@ -24,6 +25,7 @@ class Live2dModel:
     model_info: dict
     emo_map: dict
     emo_str: str
+    _emo_pattern: re.Pattern | None
 
     def __init__(
         self, live2d_model_name: str, model_dict_path: str = "model_dict.json"
@@ -51,6 +53,20 @@ class Live2dModel:
         self.emo_str: str = " ".join([f"[{key}]," for key in self.emo_map.keys()])
         # emo_str is a string of the keys in the emoMap dictionary. The keys are enclosed in square brackets.
         # example: `"[fear], [anger], [disgust], [sadness], [joy], [neutral], [surprise]"`
+        self._emo_pattern = self._compile_emo_pattern(self.emo_map)
+
+    @staticmethod
+    def _compile_emo_pattern(emo_map: dict) -> re.Pattern | None:
+        """
+        Compile a pattern matching every emotion keyword of the emotion map, so
+        a string is searched for all of them in one pass.
+        Keywords earlier in the emotion map win, as they did when they were
+        checked one after the other. Returns None if the map is empty.
+        """
+        if not emo_map:
+            return None
+        keys = "|".join(re.escape(key) for key in emo_map)
+        return re.compile(rf"\[({keys})\]", re.IGNORECASE)
 
     def _load_file_content(self, file_path: str) -> str:
         """Load the content of a file with robust encoding handling."""
@@ -143,6 +159,27 @@ class Live2dModel:
 
         return matched_model
 
+    def parse_emotions(self, target_str: str) -> tuple[list, str]:
+        """
+        Find the emotion keywords in the input string in one pass.
+
+        Parameters:
+            target_str (str): The string to check for emotions.
+
+        Returns:
+            tuple[list, str]: The values (the expression index) of the emotions found in the string, in order, and the string with the emotion keywords removed.
+        """
+        if self._emo_pattern is None or "[" not in target_str:
+            return [], target_str
+
+        expression_list = []
+
+        def collect(match: re.Match) -> str:
+            expression_list.append(self.emo_map[match.group(1).lower()])
+            return ""
+
+        return expression_list, self._emo_pattern.sub(collect, target_str)
+
     def extract_emotion(self, str_to_check: str) -> list:
         """
         Check the input string for any emotion keywords and return a list of values (the expression index) of the emotions found in the string.
@@ -153,42 +190,22 @@ class Live2dModel:
         Returns:
             list: A list of values of the emotions found in the string. An empty list is returned if no emotions are found.
         """
-
-        expression_list = []
-        str_to_check = str_to_check.lower()
-
-        i = 0
-        while i < len(str_to_check):
-            if str_to_check[i] != "[":
-                i += 1
-                continue
-            for key in self.emo_map.keys():
-                emo_tag = f"[{key}]"
-                if str_to_check[i : i + len(emo_tag)] == emo_tag:
-                    expression_list.append(self.emo_map[key])
-                    i += len(emo_tag) - 1
-                    break
-            i += 1
-        return expression_list
+        if self._emo_pattern is None or "[" not in str_to_check:
+            return []
+        return [
+            self.emo_map[key.lower()] for key in self._emo_pattern.findall(str_to_check)
+        ]
 
     def remove_emotion_keywords(self, target_str: str) -> str:
         """
         Remove the emotion keywords from the input string and return the cleaned string.
 
         Parameters:
-            str_to_check (str): The string to check for emotions.
+            target_str (str): The string to remove the emotion keywords from.
 
         Returns:
             str: The cleaned string with the emotion keywords removed.
         """
-
-        lower_str = target_str.lower()
-
-        for key in self.emo_map.keys():
-            lower_key = f"[{key}]".lower()
-            while lower_key in lower_str:
-                start_index = lower_str.find(lower_key)
-                end_index = start_index + len(lower_key)
-                target_str = target_str[:start_index] + target_str[end_index:]
-                lower_str = lower_str[:start_index] + lower_str[end_index:]
-        return target_str
+        if self._emo_pattern is None or "[" not in target_str:
+            return target_str
+        return self._emo_pattern.sub("", target_str)
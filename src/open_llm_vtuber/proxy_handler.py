@@ -8,6 +8,7 @@ import aiohttp
 from starlette.websockets import WebSocketDisconnect
 
 from .proxy_message_queue import ProxyMessageQueue
+from .utils.stream_audio import audio_message_to_frame
 
 
 class ProxyHandler:
@@ -26,6 +27,10 @@ class ProxyHandler:
         self.server_url = server_url
         self.server_ws: Optional[aiohttp.ClientWebSocketResponse] = None
         self.clients: Dict[str, WebSocket] = {}
+        # Next frame sequence number of each client that negotiated the
+        # binary audio transport. The server connection stays on JSON, since
+        # it is shared by all clients.
+        self.audio_sequences: Dict[str, int] = {}
         self.connected = False
         self.server_task: Optional[asyncio.Task] = None
         self.lock = asyncio.Lock()
@@ -119,8 +124,16 @@ class ProxyHandler:
         try:
             # Handle messages from this client
             while True:
-                message = await websocket.receive_json()
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
 
+                # Binary frames carry raw PCM audio, see utils/audio_frame.py
+                if message.get("bytes") is not None:
+                    await self.forward_to_server(message["bytes"], client_id)
+                    continue
+
+                message = json.loads(message["text"])
                 # Process text-input messages through the queue
                 if message.get("type") == "text-input":
                     # Queue the message with the sender's ID
@@ -134,6 +147,8 @@ class ProxyHandler:
                     self.message_queue.conversation_active = False
                     # Forward the interrupt signal directly
                     await self.forward_to_server(message, client_id)
+                elif message.get("type") == "set-audio-transport":
+                    await self.set_audio_transport(client_id, message)
                 else:
                     # Forward other message types directly
                     await self.forward_to_server(message, client_id)
@@ -152,6 +167,7 @@ class ProxyHandler:
             client_id: The ID of the disconnected client
         """
         self.clients.pop(client_id, None)
+        self.audio_sequences.pop(client_id, None)
         logger.info(
             f"Client {client_id} removed. Remaining clients: {len(self.clients)}"
         )
@@ -189,19 +205,51 @@ class ProxyHandler:
         self.message_queue.clear()
         logger.info("Proxy disconnected from server")
 
-    async def forward_to_server(self, message: dict, sender_id: Optional[str] = None):
+    async def forward_to_server(
+        self, message: dict | bytes, sender_id: Optional[str] = None
+    ):
         """
         Forward a message from a client to the server.
 
         Args:
-            message: The message to forward
+            message: The message to forward. Bytes (binary audio frames) are
+                sent unchanged as a binary message.
             sender_id: ID of the client sending the message, to exclude from broadcast
         """
         if not self.connected or not self.server_ws:
             await self.connect_to_server()
 
         if self.server_ws and not self.server_ws.closed:
-            await self.server_ws.send_json(message)
+            if isinstance(message, bytes):
+                await self.server_ws.send_bytes(message)
+            else:
+                await self.server_ws.send_json(message)
+
+    async def set_audio_transport(self, client_id: str, message: dict):
+        """
+        Handle a client's `set-audio-transport` message in the proxy. Audio
+        messages from the server are converted to binary frames for the
+        clients that asked for them.
+
+        Args:
+            client_id: The ID of the client
+            message: The `set-audio-transport` message
+        """
+        transport = message.get("transport", "json")
+        if transport not in ("binary", "json"):
+            logger.warning(
+                f"Client {client_id} asked for unknown transport {transport}"
+            )
+            transport = "json"
+
+        if transport == "binary":
+            self.audio_sequences[client_id] = 0
+        else:
+            self.audio_sequences.pop(client_id, None)
+        logger.info(f"Proxy client {client_id} uses {transport} audio transport")
+        await self.clients[client_id].send_json(
+            {"type": "audio-transport", "transport": transport}
+        )
 
     async def forward_server_messages(self):
         """Forward messages from server to all connected clients"""
@@ -284,7 +332,14 @@ class ProxyHandler:
                 continue
 
             try:
-                await websocket.send_json(message)
+                if client_id in self.audio_sequences and message.get("type") == "audio":
+                    sequence = self.audio_sequences[client_id]
+                    self.audio_sequences[client_id] = sequence + 1
+                    await websocket.send_bytes(
+                        audio_message_to_frame(message, sequence)
+                    )
+                else:
+                    await websocket.send_json(message)
             except Exception as e:
                 logger.error(f"Error sending to client {client_id}: {e}")
                 disconnected_clients.append(client_id)
@@ -8,20 +8,22 @@ from loguru import logger
 from .service_context import ServiceContext
 from .websocket_handler import WebSocketHandler
 from .proxy_handler import ProxyHandler
+from .utils.metrics import metrics
+
 
 def init_proxy_route(server_url: str) -> APIRouter:
     """
     Create and return API routes for handling proxy connections.
-    
+
     Args:
         server_url: The WebSocket URL of the actual server
-        
+
     Returns:
         APIRouter: Configured router with proxy WebSocket endpoint
     """
     router = APIRouter()
     proxy_handler = ProxyHandler(server_url)
-    
+
     @router.websocket("/proxy-ws")
     async def proxy_endpoint(websocket: WebSocket):
         """WebSocket endpoint for proxy connections"""
@@ -30,7 +32,7 @@ def init_proxy_route(server_url: str) -> APIRouter:
         except Exception as e:
             logger.error(f"Error in proxy connection: {e}")
             raise
-            
+
     return router
 
 
@@ -90,6 +92,11 @@ def init_webtool_routes(default_context_cache: ServiceContext) -> APIRouter:
         """Redirect /web_tool to /web_tool/index.html"""
         return Response(status_code=302, headers={"Location": "/web-tool/index.html"})
 
+    @router.get("/metrics")
+    async def get_metrics():
+        """Return a snapshot of the server's performance metrics"""
+        return metrics.snapshot()
+
     @router.post("/asr")
     async def transcribe_audio(file: UploadFile = File(...)):
         """
@@ -14,9 +14,12 @@ from .translate.translate_interface import TranslateInterface
 
 from .asr.asr_factory import ASRFactory
 from .tts.tts_factory import TTSFactory
+from .tts.tts_cache import CachedTTSEngine, get_tts_audio_cache
+from .tts.tts_scheduler import tts_scheduler
 from .vad.vad_factory import VADFactory
 from .agent.agent_factory import AgentFactory
 from .translate.translate_factory import TranslateFactory
+from .chat_history_manager import set_history_backend
 
 from .config_manager import (
     Config,
@@ -120,6 +123,13 @@ class ServiceContext:
         if not self.system_config:
             self.system_config = config.system_config
 
+        tts_scheduler.global_limit = config.system_config.tts_max_concurrency
+        set_history_backend(
+            config.system_config.chat_history_backend,
+            flush_interval=config.system_config.chat_history_flush_interval,
+            fsync=config.system_config.chat_history_fsync,
+        )
+
         if not self.character_config:
             self.character_config = config.character_config
 
@@ -176,10 +186,29 @@ class ServiceContext:
     def init_tts(self, tts_config: TTSConfig) -> None:
         if not self.tts_engine or (self.character_config.tts_config != tts_config):
             logger.info(f"Initializing TTS: {tts_config.tts_model}")
-            self.tts_engine = TTSFactory.get_tts_engine(
-                tts_config.tts_model,
-                **getattr(tts_config, tts_config.tts_model.lower()).model_dump(),
+            engine_config = getattr(
+                tts_config, tts_config.tts_model.lower()
+            ).model_dump()
+            tts_engine = TTSFactory.get_tts_engine(
+                tts_config.tts_model, **engine_config
             )
+            cache_config = tts_config.tts_cache
+            if cache_config.enabled:
+                # The cache namespace is derived from the new engine and voice,
+                # so entries of the previous engine are never served for it
+                tts_engine = CachedTTSEngine(
+                    tts_engine,
+                    engine_type=tts_config.tts_model,
+                    engine_config=engine_config,
+                    cache=get_tts_audio_cache(
+                        cache_config.cache_dir,
+                        max_memory_bytes=int(cache_config.max_memory_mb * 2**20),
+                        max_disk_bytes=int(cache_config.max_disk_mb * 2**20),
+                    ),
+                    max_text_length=cache_config.max_text_length,
+                )
+            tts_scheduler.set_engine_limit(tts_engine, tts_config.max_concurrency)
+            self.tts_engine = tts_engine
             # saving config should be done after successful initialization
             self.character_config.tts_config = tts_config
         else:
@@ -223,6 +252,7 @@ class ServiceContext:
                 live2d_model=self.live2d_model,
                 tts_preprocessor_config=self.character_config.tts_preprocessor_config,
                 character_avatar=avatar,  # Add avatar parameter
+                conf_uid=self.character_config.conf_uid,
             )
 
             logger.debug(f"Agent choice: {agent_config.conversation_agent_choice}")
@@ -2,6 +2,7 @@ import json
 import httpx
 from loguru import logger
 from .translate_interface import TranslateInterface
+from ..utils.language_id import normalize_language_code
 
 
 class DeepLXTranslate(TranslateInterface):
@@ -11,18 +12,36 @@ class DeepLXTranslate(TranslateInterface):
     def __init__(self, api_endpoint: str, target_lang: str):
         self.api_endpoint = api_endpoint
         self.target_lang = target_lang
+        self.target_language = normalize_language_code(target_lang)
 
     # translate v2 endpoint from DeepLX
     def translate(self, text: str) -> str:
+        req = None
         try:
-            data = {"text": [text], "target_lang": self.target_lang}
-            post_data = json.dumps(data)
-            req = httpx.post(url=self.api_endpoint, data=post_data).text
-            res = json.loads(req)["translations"]
-            res = " ".join([d["text"] for d in res])
+            req = httpx.post(url=self.api_endpoint, data=self._post_data(text)).text
+            return self._parse_response(req)
         except Exception as e:
             logger.critical(f"Error translating text '{text}'. Error message: {e}")
             logger.critical(f"Response: {req}")
             raise e
 
-        return res
+    async def async_translate(self, text: str) -> str:
+        req = None
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    url=self.api_endpoint, data=self._post_data(text)
+                )
+            req = response.text
+            return self._parse_response(req)
+        except Exception as e:
+            logger.critical(f"Error translating text '{text}'. Error message: {e}")
+            logger.critical(f"Response: {req}")
+            raise e
+
+    def _post_data(self, text: str) -> str:
+        return json.dumps({"text": [text], "target_lang": self.target_lang})
+
+    def _parse_response(self, req: str) -> str:
+        res = json.loads(req)["translations"]
+        return " ".join([d["text"] for d in res])
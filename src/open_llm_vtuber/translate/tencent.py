@@ -8,6 +8,7 @@ import httpx
 from loguru import logger
 
 from .translate_interface import TranslateInterface
+from ..utils.language_id import normalize_language_code
 
 
 def sign(key, msg):
@@ -36,6 +37,7 @@ class TencentTranslate(TranslateInterface):
         self.algorithm = "TC3-HMAC-SHA256"
         self.source_lang = source_lang
         self.target_lang = target_lang
+        self.target_language = normalize_language_code(target_lang)
 
     def create_signature(self, date, service):
         """Create signature"""
@@ -93,8 +95,8 @@ class TencentTranslate(TranslateInterface):
 
         return headers
 
-    def translate(self, text: str) -> str:
-        """Translate text"""
+    def _prepare_request(self, text: str) -> tuple[dict, str]:
+        """Prepare the signed headers and payload of a translation request"""
         timestamp = int(time.time())
         date = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
 
@@ -107,7 +109,11 @@ class TencentTranslate(TranslateInterface):
             }
         )
 
-        headers = self._prepare_headers(payload, timestamp, date)
+        return self._prepare_headers(payload, timestamp, date), payload
+
+    def translate(self, text: str) -> str:
+        """Translate text"""
+        headers, payload = self._prepare_request(text)
 
         try:
             response = httpx.post(
@@ -119,3 +125,19 @@ class TencentTranslate(TranslateInterface):
         except Exception as e:
             logger.critical(f"API call error: {e}")
             raise e
+
+    async def async_translate(self, text: str) -> str:
+        """Translate text. Cancelling this aborts the request."""
+        headers, payload = self._prepare_request(text)
+
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    url="https://" + self.host, headers=headers, data=payload
+                )
+            res = response.json()
+            logger.info(f"Request successful: {res}")
+            return res.get("Response", {}).get("TargetText", "Translation failed")
+        except Exception as e:
+            logger.critical(f"API call error: {e}")
+            raise e
@@ -1,9 +1,38 @@
 import abc
+import asyncio
+from typing import Optional
+
+from ..utils.language_id import identify_script_language
 
 
 class TranslateInterface(metaclass=abc.ABCMeta):
+    # ISO 639-1 code of the language translated to, if known
+    target_language: Optional[str] = None
+
     @abc.abstractmethod
     def translate(self, text: str) -> str:
         """
         Translate the input text to the target language."""
         raise NotImplementedError
+
+    async def async_translate(self, text: str) -> str:
+        """
+        Asynchronously translate the input text to the target language.
+
+        By default, this runs the synchronous translate in a thread, so an
+        interrupted conversation does not wait for it. Subclasses can override
+        this method so that cancelling it also aborts the request.
+        """
+        return await asyncio.to_thread(self.translate, text)
+
+    def needs_translation(self, text: str) -> bool:
+        """
+        Whether text is not in the target language already. Text that is,
+        e.g. a Japanese phrase in a reply translated to Japanese, can skip
+        the translation request. Only a language the script decides is
+        trusted: Latin text may be a related language the identification
+        mistakes for the target, and is always translated.
+        """
+        if self.target_language is None:
+            return True
+        return identify_script_language(text) != self.target_language
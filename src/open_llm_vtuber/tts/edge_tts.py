@@ -1,9 +1,14 @@
+import asyncio
 import sys
 import os
+from contextlib import aclosing
+from typing import AsyncIterator
 
 import edge_tts
 from loguru import logger
-from .tts_interface import TTSInterface
+from .tts_interface import AudioChunk, TTSInterface
+from .streaming import decode_with_ffmpeg
+from ..utils.audio_codec import StreamDecoder, can_decode
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
@@ -14,11 +19,15 @@ sys.path.append(current_dir)
 
 
 class TTSEngine(TTSInterface):
+    audio_format = "mp3"
+
     def __init__(self, voice="en-US-AvaMultilingualNeural"):
         self.voice = voice
 
         self.temp_audio_file = "temp"
-        self.file_extension = "mp3"
+        self.file_extension = self.audio_format
+        # edge-tts always sends 24 kHz mono mp3
+        self.sample_rate = 24000
         self.new_audio_dir = "cache"
 
         if not os.path.exists(self.new_audio_dir):
@@ -49,6 +58,45 @@ class TTSEngine(TTSInterface):
 
         return file_name
 
+    async def async_stream_audio(self, text: str) -> AsyncIterator[AudioChunk]:
+        """
+        Stream speech from edge-tts. The mp3 data is decoded to PCM while it
+        is still being received, in-process if libsndfile can read mp3 and
+        by ffmpeg otherwise.
+        """
+        communicate = edge_tts.Communicate(text, self.voice)
+
+        async def mp3_chunks() -> AsyncIterator[bytes]:
+            async for message in communicate.stream():
+                if message["type"] == "audio":
+                    yield message["data"]
+
+        try:
+            # Closing the stream right away on interrupt ends the request
+            async with aclosing(mp3_chunks()) as chunks:
+                if can_decode(self.audio_format):
+                    async for pcm in self._decode_in_process(chunks):
+                        yield AudioChunk(pcm=pcm, sample_rate=self.sample_rate)
+                else:
+                    async for pcm in decode_with_ffmpeg(chunks, self.sample_rate):
+                        yield AudioChunk(pcm=pcm, sample_rate=self.sample_rate)
+        except Exception as e:
+            logger.critical(f"\nError: edge-tts unable to generate audio: {e}")
+            logger.critical("It's possible that edge-tts is blocked in your region.")
+            raise
+
+    async def _decode_in_process(
+        self, mp3_chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        decoder = StreamDecoder(self.audio_format)
+        async for data in mp3_chunks:
+            samples = await asyncio.to_thread(decoder.feed, data)
+            if len(samples):
+                yield samples.tobytes()
+        samples = await asyncio.to_thread(decoder.finish)
+        if len(samples):
+            yield samples.tobytes()
+
 
 # en-US-AvaMultilingualNeural
 # en-US-EmmaMultilingualNeural
@@ -1,7 +1,8 @@
-from typing import Literal
+from typing import AsyncIterator, Literal
 from fish_audio_sdk import Session, TTSRequest
 from loguru import logger
-from .tts_interface import TTSInterface
+from .tts_interface import AudioChunk, TTSInterface
+from .streaming import produce_in_thread
 
 
 class TTSEngine(TTSInterface):
@@ -10,6 +11,7 @@ class TTSEngine(TTSInterface):
     """
 
     file_extension: str = "wav"
+    stream_sample_rate: int = 44100
 
     def __init__(
         self,
@@ -58,3 +60,27 @@ class TTSEngine(TTSInterface):
             return None
 
         return file_name
+
+    async def async_stream_audio(self, text: str) -> AsyncIterator[AudioChunk]:
+        """
+        Stream raw PCM from the Fish TTS API as it is received.
+        """
+        request = TTSRequest(
+            text=text,
+            reference_id=self.reference_id,
+            latency=self.latency,
+            format="pcm",
+            sample_rate=self.stream_sample_rate,
+        )
+
+        def produce(emit) -> None:
+            for chunk in self.session.tts(request):
+                if not emit(chunk):
+                    return
+
+        try:
+            async for pcm in produce_in_thread(produce):
+                yield AudioChunk(pcm=pcm, sample_rate=self.stream_sample_rate)
+        except Exception as e:
+            logger.critical(f"\nError: Fish TTS API fail to generate audio: {e}")
+            raise
@@ -3,9 +3,12 @@
 ####
 
 import re
+from typing import AsyncIterator
+
 import requests
 from loguru import logger
-from .tts_interface import TTSInterface
+from .tts_interface import AudioChunk, TTSInterface
+from .streaming import parse_wav_header, produce_in_thread
 
 
 class TTSEngine(TTSInterface):
@@ -29,13 +32,12 @@ class TTSEngine(TTSInterface):
         self.text_split_method = text_split_method
         self.batch_size = batch_size
         self.media_type = media_type
+        self.audio_format = media_type
         self.streaming_mode = streaming_mode
 
-    def generate_audio(self, text, file_name_no_ext=None):
-        file_name = self.generate_cache_file_name(file_name_no_ext, self.media_type)
+    def _request_params(self, text):
         cleaned_text = re.sub(r"\[.*?\]", "", text)
-        # Prepare the data for the POST request
-        data = {
+        return {
             "text": cleaned_text,
             "text_lang": self.text_lang,
             "ref_audio_path": self.ref_audio_path,
@@ -47,6 +49,11 @@ class TTSEngine(TTSInterface):
             "streaming_mode": self.streaming_mode,
         }
 
+    def generate_audio(self, text, file_name_no_ext=None):
+        file_name = self.generate_cache_file_name(file_name_no_ext, self.media_type)
+        # Prepare the data for the POST request
+        data = self._request_params(text)
+
         # Send POST request to the TTS API
         response = requests.get(self.api_url, params=data, timeout=120)
 
@@ -62,3 +69,53 @@ class TTSEngine(TTSInterface):
                 f"Error: Failed to generate audio. Status code: {response.status_code}"
             )
             return None
+
+    async def async_stream_audio(self, text) -> AsyncIterator[AudioChunk]:
+        """
+        In streaming mode with wav output, yield the PCM as the server sends it.
+        Otherwise fall back to generating a file.
+        """
+        if (
+            str(self.streaming_mode).lower() not in ("true", "1")
+            or self.media_type != "wav"
+        ):
+            async for chunk in super().async_stream_audio(text):
+                yield chunk
+            return
+
+        def produce(emit) -> None:
+            with requests.get(
+                self.api_url,
+                params=self._request_params(text),
+                stream=True,
+                timeout=120,
+            ) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(
+                        f"Failed to generate audio. Status code: {response.status_code}"
+                    )
+                for data in response.iter_content(chunk_size=4096):
+                    if not emit(data):
+                        return
+
+        header = b""
+        sample_rate = None
+        try:
+            async for data in produce_in_thread(produce):
+                if sample_rate is None:
+                    header += data
+                    wav_format = parse_wav_header(header)
+                    if wav_format is None:
+                        continue
+                    sample_rate, channels, bits_per_sample, data_offset = wav_format
+                    if channels != 1 or bits_per_sample != 16:
+                        raise ValueError(
+                            f"Expected 16-bit mono audio, got {channels} channels "
+                            f"of {bits_per_sample}-bit audio"
+                        )
+                    data = header[data_offset:]
+                if data:
+                    yield AudioChunk(pcm=data, sample_rate=sample_rate)
+        except Exception as e:
+            logger.critical(f"Error: Failed to stream audio from GPT-SoVITS: {e}")
+            raise
@@ -15,10 +15,12 @@ sys.path.append(current_dir)
 
 
 class TTSEngine(TTSInterface):
+    audio_format = "aiff"
+
     def __init__(self):
         self.engine = pyttsx3.init()
         self.temp_audio_file = "temp"
-        self.file_extension = "aiff"
+        self.file_extension = self.audio_format
         self.new_audio_dir = "cache"
         self.lock = threading.Lock()
 
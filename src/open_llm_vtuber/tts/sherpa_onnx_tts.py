@@ -1,10 +1,14 @@
 import sys
 import os
 
+from typing import AsyncIterator
+
+import numpy as np
 import sherpa_onnx
 import soundfile as sf
 from loguru import logger
-from .tts_interface import TTSInterface
+from .tts_interface import AudioChunk, TTSInterface
+from .streaming import produce_in_thread
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
@@ -110,3 +114,32 @@ class TTSEngine(TTSInterface):
         except Exception as e:
             logger.critical(f"\nError: sherpa-onnx unable to generate audio: {e}")
             return None
+
+    async def async_stream_audio(self, text: str) -> AsyncIterator[AudioChunk]:
+        """
+        Stream speech from sherpa-onnx TTS. The generation callback hands over
+        the samples of every `max_num_sentences` sentences as they are done.
+
+        Parameters:
+            text (str): The text to speak.
+
+        Yields:
+            AudioChunk: The synthesized speech.
+        """
+
+        def produce(emit) -> None:
+            def callback(samples: np.ndarray, progress: float) -> int:
+                pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+                # sherpa-onnx continues while the callback returns 1 and
+                # stops when it returns 0
+                return 1 if emit(pcm) else 0
+
+            self.tts.generate(text, sid=self.sid, speed=self.speed, callback=callback)
+
+        sample_rate = self.tts.sample_rate
+        try:
+            async for pcm in produce_in_thread(produce):
+                yield AudioChunk(pcm=pcm, sample_rate=sample_rate)
+        except Exception as e:
+            logger.critical(f"\nError: sherpa-onnx unable to generate audio: {e}")
+            raise
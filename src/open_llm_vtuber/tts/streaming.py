@@ -0,0 +1,164 @@
+"""
+Helpers for TTS engines that implement `async_stream_audio`.
+"""
+
+import asyncio
+import struct
+import subprocess
+from typing import AsyncIterator, Callable, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def produce_in_thread(
+    produce: Callable[[Callable[[T], bool]], None],
+) -> AsyncIterator[T]:
+    """
+    Run a blocking producer in a worker thread and yield its items as they
+    are produced.
+
+    Args:
+        produce: Called in the worker thread with an `emit(item)` function.
+            `emit` returns False once the consumer has stopped iterating,
+            and the producer should then return early.
+
+    Yields:
+        The items passed to `emit`, in order.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = False
+
+    def emit(item: T) -> bool:
+        if stopped:
+            return False
+        loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        return True
+
+    def run() -> None:
+        try:
+            produce(emit)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, None))
+
+    loop.run_in_executor(None, run)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # The producer notices on its next emit
+        stopped = True
+
+
+async def decode_with_ffmpeg(
+    encoded: AsyncIterator[bytes], sample_rate: int, read_size: int = 4096
+) -> AsyncIterator[bytes]:
+    """
+    Decode a stream of encoded audio (mp3, ogg, ...) to 16-bit mono PCM with
+    an ffmpeg process, yielding PCM as soon as ffmpeg produces it.
+
+    Args:
+        encoded: The encoded audio bytes, in order
+        sample_rate: Sample rate of the output PCM
+        read_size: Maximum number of bytes per yielded chunk
+
+    Yields:
+        bytes: 16-bit little-endian mono PCM
+    """
+    process = subprocess.Popen(
+        [
+            "ffmpeg",
+            "-loglevel",
+            "error",
+            "-i",
+            "pipe:0",
+            "-f",
+            "s16le",
+            "-ac",
+            "1",
+            "-ar",
+            str(sample_rate),
+            "pipe:1",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+    async def feed() -> None:
+        try:
+            async for data in encoded:
+                await asyncio.to_thread(process.stdin.write, data)
+        finally:
+            await asyncio.to_thread(process.stdin.close)
+
+    def read(emit: Callable[[bytes], bool]) -> None:
+        while data := process.stdout.read1(read_size):
+            if not emit(data):
+                return
+
+    feeder = asyncio.create_task(feed())
+    try:
+        async for pcm in produce_in_thread(read):
+            yield pcm
+        await feeder  # raise errors from the encoded stream
+    finally:
+        feeder.cancel()
+        if process.poll() is None:
+            process.kill()
+        await asyncio.to_thread(process.wait)
+
+
+def parse_wav_header(data: bytes) -> tuple[int, int, int, int] | None:
+    """
+    Parse the header at the start of a (possibly incomplete) WAV stream.
+
+    Streaming servers write a header with placeholder sizes, so only the
+    format fields and the position of the data chunk are used.
+
+    Args:
+        data: The first bytes of the stream
+
+    Returns:
+        tuple: (sample_rate, channels, bits_per_sample, data_offset), or None
+            if `data` does not contain the whole header yet
+
+    Raises:
+        ValueError: If the stream is not a PCM WAV stream
+    """
+    if len(data) < 12:
+        return None
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV stream")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        (chunk_size,) = struct.unpack_from("<I", data, offset + 4)
+        if chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV stream has no fmt chunk before its data")
+            audio_format, channels, sample_rate, bits_per_sample = fmt
+            if audio_format not in (1, 0xFFFE):  # PCM, WAVE_FORMAT_EXTENSIBLE
+                raise ValueError(f"Unsupported WAV format: {audio_format}")
+            return sample_rate, channels, bits_per_sample, offset + 8
+        if chunk_id == b"fmt ":
+            if offset + 24 > len(data):
+                return None
+            audio_format, channels, sample_rate = struct.unpack_from(
+                "<HHI", data, offset + 8
+            )
+            (bits_per_sample,) = struct.unpack_from("<H", data, offset + 22)
+            fmt = (audio_format, channels, sample_rate, bits_per_sample)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
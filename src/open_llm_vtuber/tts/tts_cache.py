@@ -0,0 +1,394 @@
+"""
+Content-addressed cache for synthesized speech.
+
+Entries are keyed by a hash of the normalized text and a namespace, which is
+itself a hash of the engine type and the voice-relevant engine config. Model
+and reference-audio files named in the config contribute their size and
+modification time, so replacing a model in place also changes the namespace.
+Switching engines or voices in `ServiceContext.init_tts` therefore never
+serves stale audio: the new engine looks up a different namespace, and the
+old entries age out of both tiers.
+
+The memory tier is an LRU bounded in bytes. The disk tier keeps one file
+per entry under `cache_dir`, is capped in bytes (least recently used files
+are deleted first) and survives restarts.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import AsyncIterator
+
+from loguru import logger
+
+from ..utils.metrics import metrics
+from .tts_interface import AudioChunk, TTSInterface
+
+# Engine config fields that change how a request is sent or run,
+# but not the voice it produces
+NON_VOICE_FIELDS = {
+    "api_key",
+    "region",
+    "base_url",
+    "client_url",
+    "api_url",
+    "server_url",
+    "provider",
+    "num_threads",
+    "debug",
+    "device",
+    "latency",
+}
+
+# Disk entries start with the sample rate of the PCM that follows
+_HEADER_FORMAT = "<I"
+_HEADER_SIZE = struct.calcsize(_HEADER_FORMAT)
+_ENTRY_EXTENSION = ".pcm"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different spellings share a cache entry"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def _fingerprint(value):
+    """Add the size and mtime of files named in the config to the namespace"""
+    if isinstance(value, str) and value:
+        paths = [p.strip() for p in value.split(",")]
+        stats = []
+        for path in paths:
+            if not os.path.isfile(path):
+                return value
+            st = os.stat(path)
+            stats.append([st.st_size, st.st_mtime_ns])
+        return {"value": value, "files": stats}
+    return value
+
+
+def cache_namespace(engine_type: str, engine_config: dict) -> str:
+    """
+    Hash the engine type and the voice-relevant part of its config.
+
+    Args:
+        engine_type: The tts_model name, e.g. "edge_tts"
+        engine_config: The engine's config as a dict
+
+    Returns:
+        str: A hex digest identifying the voice
+    """
+    voice_config = {
+        key: _fingerprint(value)
+        for key, value in sorted(engine_config.items())
+        if key not in NON_VOICE_FIELDS
+    }
+    data = json.dumps([engine_type, voice_config], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class TTSAudioCache:
+    """A two-tier (memory LRU, then disk) store of synthesized PCM by key"""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_memory_bytes: int,
+        max_disk_bytes: int,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory of the disk tier
+            max_memory_bytes: Maximum PCM bytes kept in memory
+            max_disk_bytes: Maximum PCM bytes kept on disk, 0 to disable the
+                disk tier
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: OrderedDict[str, AudioChunk] = OrderedDict()
+        self._memory_bytes = 0
+        # key -> file size, least recently used first. Built on first use.
+        self._disk: OrderedDict[str, int] | None = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self._memory_hits = metrics.counter(
+            "tts_cache_memory_hits", "TTS requests served from the memory cache"
+        )
+        self._disk_hits = metrics.counter(
+            "tts_cache_disk_hits", "TTS requests served from the disk cache"
+        )
+        self._misses = metrics.counter(
+            "tts_cache_misses", "TTS requests that had to be synthesized"
+        )
+        self._bytes_served = metrics.counter(
+            "tts_cache_bytes_served", "PCM bytes served from the TTS cache"
+        )
+        self._memory_gauge = metrics.gauge(
+            "tts_cache_memory_bytes", "PCM bytes held in the TTS memory cache"
+        )
+        self._disk_gauge = metrics.gauge(
+            "tts_cache_disk_bytes", "Bytes held in the TTS disk cache"
+        )
+
+    def get(self, key: str) -> AudioChunk | None:
+        """Look up an entry, promoting disk hits to memory. Blocking on disk."""
+        with self._lock:
+            chunk = self._memory.get(key)
+            if chunk is not None:
+                self._memory.move_to_end(key)
+        if chunk is not None:
+            self._memory_hits.inc()
+            self._bytes_served.inc(len(chunk.pcm))
+            return chunk
+
+        chunk = self._read_disk(key)
+        if chunk is None:
+            self._misses.inc()
+            return None
+        self._disk_hits.inc()
+        self._bytes_served.inc(len(chunk.pcm))
+        self._put_memory(key, chunk)
+        return chunk
+
+    def put(self, key: str, chunk: AudioChunk) -> None:
+        """Store an entry in both tiers. Blocking on disk."""
+        self._put_memory(key, chunk)
+        self._write_disk(key, chunk)
+
+    # ==== Memory tier
+
+    def _put_memory(self, key: str, chunk: AudioChunk) -> None:
+        size = len(chunk.pcm)
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old.pcm)
+            self._memory[key] = chunk
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted.pcm)
+            self._memory_gauge.set(self._memory_bytes)
+
+    # ==== Disk tier
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + _ENTRY_EXTENSION)
+
+    def _load_disk_index(self) -> OrderedDict[str, int]:
+        """Scan the cache directory once, oldest access first. Hold the lock."""
+        if self._disk is not None:
+            return self._disk
+
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith(_ENTRY_EXTENSION):
+                        continue
+                    st = os.stat(os.path.join(root, name))
+                    entries.append(
+                        (st.st_mtime, name[: -len(_ENTRY_EXTENSION)], st.st_size)
+                    )
+        entries.sort()
+        self._disk = OrderedDict((key, size) for _, key, size in entries)
+        self._disk_bytes = sum(self._disk.values())
+        self._disk_gauge.set(self._disk_bytes)
+        if self._disk:
+            logger.info(
+                f"TTS cache: found {len(self._disk)} entries "
+                f"({self._disk_bytes / 2**20:.1f} MB) in {self.cache_dir}"
+            )
+        return self._disk
+
+    def _read_disk(self, key: str) -> AudioChunk | None:
+        if self.max_disk_bytes <= 0:
+            return None
+        with self._lock:
+            if key not in self._load_disk_index():
+                return None
+            self._disk.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Keep the access order across restarts
+            os.utime(path)
+        except OSError as e:
+            logger.warning(f"TTS cache: failed to read {path}: {e}")
+            self._remove_disk_entry(key)
+            return None
+
+        if len(data) < _HEADER_SIZE:
+            self._remove_disk_entry(key)
+            return None
+        (sample_rate,) = struct.unpack_from(_HEADER_FORMAT, data)
+        return AudioChunk(pcm=data[_HEADER_SIZE:], sample_rate=sample_rate)
+
+    def _write_disk(self, key: str, chunk: AudioChunk) -> None:
+        size = _HEADER_SIZE + len(chunk.pcm)
+        if size > self.max_disk_bytes:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(struct.pack(_HEADER_FORMAT, chunk.sample_rate))
+                f.write(chunk.pcm)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"TTS cache: failed to write {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            index = self._load_disk_index()
+            self._disk_bytes -= index.pop(key, 0)
+            index[key] = size
+            self._disk_bytes += size
+            evicted = []
+            while self._disk_bytes > self.max_disk_bytes and index:
+                old_key, old_size = index.popitem(last=False)
+                self._disk_bytes -= old_size
+                evicted.append(old_key)
+            self._disk_gauge.set(self._disk_bytes)
+
+        for old_key in evicted:
+            self._unlink(old_key)
+
+    def _remove_disk_entry(self, key: str) -> None:
+        with self._lock:
+            index = self._load_disk_index()
+            self._disk_bytes -= index.pop(key, 0)
+            self._disk_gauge.set(self._disk_bytes)
+        self._unlink(key)
+
+    def _unlink(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"TTS cache: failed to remove {self._path(key)}: {e}")
+
+
+_caches: dict[str, TTSAudioCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_tts_audio_cache(
+    cache_dir: str, max_memory_bytes: int, max_disk_bytes: int
+) -> TTSAudioCache:
+    """
+    Return the process-wide cache for `cache_dir`, so every session shares
+    one memory tier and one disk index. The limits of the latest call apply.
+    """
+    key = os.path.abspath(cache_dir)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = TTSAudioCache(
+                cache_dir, max_memory_bytes, max_disk_bytes
+            )
+        else:
+            cache.max_memory_bytes = max_memory_bytes
+            cache.max_disk_bytes = max_disk_bytes
+        return cache
+
+
+class CachedTTSEngine(TTSInterface):
+    """
+    Wraps any TTS engine and serves repeated sentences from a TTSAudioCache.
+
+    Only `async_stream_audio` is cached: cache hits are yielded as a single
+    chunk, misses are streamed from the wrapped engine as usual and stored
+    once the sentence has been synthesized completely. The file-based
+    `generate_audio` API is passed through unchanged.
+    """
+
+    def __init__(
+        self,
+        engine: TTSInterface,
+        engine_type: str,
+        engine_config: dict,
+        cache: TTSAudioCache,
+        max_text_length: int = 200,
+    ):
+        """
+        Initialize the wrapper.
+
+        Args:
+            engine: The TTS engine to wrap
+            engine_type: The tts_model name of the engine
+            engine_config: The engine's config, used for the cache namespace
+            cache: The cache to use
+            max_text_length: Longer texts are not cached, since long replies
+                rarely repeat
+        """
+        self.engine = engine
+        self.cache = cache
+        self.max_text_length = max_text_length
+        self.namespace = cache_namespace(engine_type, engine_config)
+
+    def __getattr__(self, name):
+        # Engine-specific attributes (sample_rate, voice, ...) of the wrapped engine
+        if name == "engine":
+            raise AttributeError(name)
+        return getattr(self.engine, name)
+
+    def cache_key(self, text: str) -> str:
+        data = f"{self.namespace}\n{normalize_text(text)}"
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def generate_audio(self, text: str, file_name_no_ext=None) -> str:
+        return self.engine.generate_audio(text, file_name_no_ext)
+
+    async def async_generate_audio(self, text: str, file_name_no_ext=None) -> str:
+        return await self.engine.async_generate_audio(text, file_name_no_ext)
+
+    async def async_stream_audio(self, text: str) -> AsyncIterator[AudioChunk]:
+        if len(text) > self.max_text_length:
+            async for chunk in self.engine.async_stream_audio(text):
+                yield chunk
+            return
+
+        key = self.cache_key(text)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            logger.debug(f"TTS cache hit for '''{text}'''")
+            yield cached
+            return
+
+        pcm = bytearray()
+        sample_rate = None
+        cacheable = True
+        async for chunk in self.engine.async_stream_audio(text):
+            if sample_rate is not None and chunk.sample_rate != sample_rate:
+                cacheable = False
+            sample_rate = chunk.sample_rate
+            if cacheable:
+                pcm.extend(chunk.pcm)
+            yield chunk
+
+        # Only reached when the sentence was synthesized completely: engines
+        # raise when they fail partway through, and an interrupted stream
+        # stops at its last yield
+        if cacheable and pcm:
+            await asyncio.to_thread(
+                self.cache.put, key, AudioChunk(bytes(pcm), sample_rate)
+            )
@@ -1,11 +1,35 @@
 import abc
 import os
 import asyncio
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator
 
 from loguru import logger
 
+from ..utils.audio_codec import decode_audio, read_audio_file
+
+
+@dataclass
+class AudioChunk:
+    """
+    A chunk of synthesized speech.
+
+    pcm: 16-bit little-endian mono PCM. Engines that receive audio from the
+        network may split a sample across two chunks.
+    sample_rate: Sample rate of the PCM
+    """
+
+    pcm: bytes
+    sample_rate: int
+
 
 class TTSInterface(metaclass=abc.ABCMeta):
+    # Format of the files written by generate_audio ("wav", "mp3", "ogg",
+    # "aiff", ...). WAV, mp3 and ogg are sent to clients without conversion.
+    audio_format: str = "wav"
+
     async def async_generate_audio(self, text: str, file_name_no_ext=None) -> str:
         """
         Asynchronously generate speech audio file using TTS.
@@ -24,6 +48,58 @@ class TTSInterface(metaclass=abc.ABCMeta):
         """
         return await asyncio.to_thread(self.generate_audio, text, file_name_no_ext)
 
+    async def async_stream_audio(self, text: str) -> AsyncIterator[AudioChunk]:
+        """
+        Asynchronously synthesize speech, yielding PCM chunks as they become
+        available, so playback can start before the whole sentence is done.
+
+        By default, this generates an audio file with async_generate_audio,
+        decodes it in-process and yields it as a single chunk, then removes
+        the file.
+        Engines that can produce audio incrementally should override this.
+
+        text: str
+            the text to speak
+
+        Yields:
+        AudioChunk: the synthesized speech, in order. Nothing is yielded if
+            the engine failed to generate audio.
+
+        Raises:
+        Exception: if the engine fails partway through, so the audio yielded
+            so far is not taken for the whole sentence (e.g. by the cache)
+        """
+        file_name = (
+            f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}"
+        )
+        generation = asyncio.ensure_future(self.async_generate_audio(text, file_name))
+        try:
+            audio_file_path = await asyncio.shield(generation)
+        except asyncio.CancelledError:
+            # An engine running in a thread cannot be stopped; remove its
+            # file once it is written instead of leaving it in the cache
+            generation.add_done_callback(self._remove_generated_file)
+            raise
+        if not audio_file_path:
+            return
+
+        def decode() -> tuple:
+            data, _ = read_audio_file(audio_file_path)
+            return decode_audio(data, self.audio_format)
+
+        try:
+            samples, sample_rate = await asyncio.to_thread(decode)
+            yield AudioChunk(pcm=samples.tobytes(), sample_rate=sample_rate)
+        finally:
+            self.remove_file(audio_file_path)
+
+    def _remove_generated_file(self, generation: asyncio.Future) -> None:
+        """Remove the file of an abandoned async_generate_audio call"""
+        if generation.cancelled() or generation.exception() is not None:
+            return
+        if generation.result():
+            self.remove_file(generation.result(), verbose=False)
+
     @abc.abstractmethod
     def generate_audio(self, text: str, file_name_no_ext=None) -> str:
         """
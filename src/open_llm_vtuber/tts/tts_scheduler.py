@@ -0,0 +1,208 @@
+import asyncio
+import heapq
+import itertools
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from ..utils.metrics import Summary, metrics
+from .tts_interface import TTSInterface
+
+
+@dataclass(order=True)
+class _Waiter:
+    sequence: int
+    order: int
+    engine_key: int = field(compare=False)
+    engine_limit: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+@dataclass
+class _SessionState:
+    waiting: list[_Waiter] = field(default_factory=list)  # heap by sequence
+    running: int = 0
+    wait_ms: Summary = field(default_factory=Summary)
+    removed: bool = False  # forget the session once it is idle
+
+
+class TTSScheduler:
+    """
+    Limits how many sentences are synthesized at once, across all sessions.
+
+    A sentence waits for a slot until both fewer than `global_limit`
+    sentences are being synthesized in total and fewer than the engine's
+    limit on its engine. Within a session, the sentence with the lowest
+    sequence number always goes first, so the audio that is needed first
+    is ready first. Free slots go to the sessions in round-robin order, so
+    a long answer cannot starve other sessions.
+    """
+
+    def __init__(self, global_limit: int = 8, default_engine_limit: int = 4):
+        """
+        Initialize the scheduler.
+
+        Args:
+            global_limit: Maximum number of sentences synthesized at once
+            default_engine_limit: Maximum number of sentences synthesized at
+                once by an engine without a limit of its own
+        """
+        self.global_limit = global_limit
+        self.default_engine_limit = default_engine_limit
+
+        self._engine_limits: weakref.WeakKeyDictionary[TTSInterface, int] = (
+            weakref.WeakKeyDictionary()
+        )
+        # id(engine) -> sentences being synthesized, only while non-zero
+        self._engine_running: dict[int, int] = {}
+        # session id -> state, in the order the sessions are served
+        self._sessions: OrderedDict[str, _SessionState] = OrderedDict()
+        self._running = 0
+        self._order = itertools.count()
+
+        self._queue_depth = metrics.gauge(
+            "tts_queue_depth", "Sentences waiting for a TTS slot"
+        )
+        self._running_gauge = metrics.gauge(
+            "tts_running", "Sentences being synthesized"
+        )
+        self._wait = metrics.summary(
+            "tts_wait_ms", "Time sentences waited for a TTS slot (ms)"
+        )
+        metrics.register_collector(
+            "tts_sessions",
+            self.stats,
+            "TTS queue depth, running sentences and wait time (ms) per session",
+        )
+
+    def set_engine_limit(self, engine: TTSInterface, limit: int) -> None:
+        """Set the maximum number of sentences `engine` synthesizes at once"""
+        self._engine_limits[engine] = max(1, limit)
+
+    @asynccontextmanager
+    async def slot(
+        self, session_id: str, sequence: int, engine: TTSInterface
+    ) -> AsyncIterator[None]:
+        """
+        Wait for a slot to synthesize a sentence, and hold it in the block.
+
+        Args:
+            session_id: The session the sentence belongs to
+            sequence: The sentence's position in the session's answer
+            engine: The engine that synthesizes it
+        """
+        engine_key = id(engine)
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = _SessionState()
+        state.removed = False
+
+        waiter = _Waiter(
+            sequence=sequence,
+            order=next(self._order),
+            engine_key=engine_key,
+            engine_limit=self._engine_limits.get(engine, self.default_engine_limit),
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.perf_counter(),
+        )
+        heapq.heappush(state.waiting, waiter)
+        self._queue_depth.inc()
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted just as the caller was cancelled
+                self._release(session_id, state, engine_key)
+            else:
+                # Skipped by _dispatch once it reaches the head of the heap
+                self._queue_depth.dec()
+                if state.removed:
+                    self._forget_if_idle(session_id, state)
+                self._dispatch()
+            raise
+
+        try:
+            yield
+        finally:
+            self._release(session_id, state, engine_key)
+
+    def remove_session(self, session_id: str) -> None:
+        """Forget the statistics of a session that has disconnected"""
+        state = self._sessions.get(session_id)
+        if state is None:
+            return
+        state.removed = True
+        self._forget_if_idle(session_id, state)
+
+    def _forget_if_idle(self, session_id: str, state: _SessionState) -> None:
+        """Delete a removed session once nothing of it waits or runs"""
+        # Cancelled waiters stay in the heap until they reach its head
+        if any(waiter.future.done() for waiter in state.waiting):
+            state.waiting = [w for w in state.waiting if not w.future.done()]
+            heapq.heapify(state.waiting)
+        if not state.waiting and state.running == 0:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict[str, dict]:
+        """Queue depth, running sentences and wait times of each session"""
+        return {
+            session_id: {
+                "queued": sum(not w.future.done() for w in state.waiting),
+                "running": state.running,
+                "wait_ms": state.wait_ms.snapshot(),
+            }
+            for session_id, state in list(self._sessions.items())
+        }
+
+    def _release(self, session_id: str, state: _SessionState, engine_key: int) -> None:
+        state.running -= 1
+        self._running -= 1
+        self._running_gauge.dec()
+        self._engine_running[engine_key] -= 1
+        if self._engine_running[engine_key] == 0:
+            del self._engine_running[engine_key]
+        if state.removed:
+            self._forget_if_idle(session_id, state)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots, one session at a time in round-robin order"""
+        while self._running < self.global_limit:
+            for session_id, state in self._sessions.items():
+                # Drop waiters that were cancelled
+                while state.waiting and state.waiting[0].future.done():
+                    heapq.heappop(state.waiting)
+                if not state.waiting:
+                    continue
+                head = state.waiting[0]
+                if self._engine_running.get(head.engine_key, 0) >= head.engine_limit:
+                    # Strict order within a session: wait for this engine
+                    continue
+                break
+            else:
+                return
+
+            heapq.heappop(state.waiting)
+            state.running += 1
+            self._running += 1
+            self._engine_running[head.engine_key] = (
+                self._engine_running.get(head.engine_key, 0) + 1
+            )
+            # The session goes to the back of the line
+            self._sessions.move_to_end(session_id)
+
+            wait_ms = (time.perf_counter() - head.enqueued_at) * 1000
+            state.wait_ms.observe(wait_ms)
+            self._wait.observe(wait_ms)
+            self._queue_depth.dec()
+            self._running_gauge.inc()
+            head.future.set_result(None)
+
+
+tts_scheduler = TTSScheduler()
@@ -0,0 +1,139 @@
+import numpy as np
+from loguru import logger
+
+
+class AudioBuffer:
+    """
+    A growable buffer that accumulates audio samples for one client.
+
+    Appends are amortized O(1): the backing array doubles in size when full
+    instead of being copied on every chunk like `np.append`. The buffer keeps
+    its dtype (float32 by default), so audio is never upcast to float64.
+
+    When more than `max_samples` samples are buffered, the oldest samples are
+    dropped so a stuck microphone cannot grow the buffer without bound.
+    """
+
+    def __init__(
+        self,
+        dtype: np.dtype = np.float32,
+        initial_capacity: int = 16000 * 5,
+        max_samples: int = 16000 * 300,
+    ):
+        """
+        Initialize the audio buffer.
+
+        Args:
+            dtype: Sample type, np.float32 or np.int16
+            initial_capacity: Number of samples to preallocate
+            max_samples: Maximum number of samples kept in the buffer
+        """
+        if max_samples <= 0:
+            raise ValueError("max_samples must be positive")
+
+        self.dtype = np.dtype(dtype)
+        self.max_samples = max_samples
+        self._capacity = min(initial_capacity, max_samples)
+        self._data: np.ndarray | None = None
+        self._start = 0
+        self._end = 0
+        self._overflow_logged = False
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def capacity(self) -> int:
+        """Number of samples the buffer can hold before growing"""
+        return len(self._data) if self._data is not None else self._capacity
+
+    def append(self, samples: np.ndarray) -> None:
+        """
+        Append samples to the buffer.
+
+        Args:
+            samples: 1-D array of samples, converted to the buffer's dtype
+        """
+        samples = np.asarray(samples, dtype=self.dtype).reshape(-1)
+        n = len(samples)
+        if n == 0:
+            return
+
+        if n >= self.max_samples:
+            # The new chunk alone fills the buffer
+            self._log_overflow()
+            samples = samples[-self.max_samples :]
+            n = len(samples)
+            self._start = self._end = 0
+        elif len(self) + n > self.max_samples:
+            # Drop the oldest samples to stay under the cap
+            self._log_overflow()
+            self._start += len(self) + n - self.max_samples
+
+        self._reserve(n)
+        self._data[self._end : self._end + n] = samples
+        self._end += n
+
+    def view(self) -> np.ndarray:
+        """
+        Return a contiguous view of the buffered samples.
+        The view is only valid until the next call to `append` or `reset`.
+        """
+        if self._data is None:
+            return np.empty(0, dtype=self.dtype)
+        return self._data[self._start : self._end]
+
+    def take(self) -> np.ndarray:
+        """
+        Hand off the buffered samples and empty the buffer.
+
+        The returned array is a contiguous view of the current backing array,
+        which is detached from the buffer, so it stays valid while new audio
+        arrives. A new backing array of the same capacity is allocated lazily
+        on the next append.
+
+        Returns:
+            np.ndarray: The buffered samples
+        """
+        samples = self.view()
+        if self._data is not None:
+            self._capacity = len(self._data)
+        self._data = None
+        self._start = self._end = 0
+        self._overflow_logged = False
+        return samples
+
+    def reset(self) -> None:
+        """Discard the buffered samples, keeping the backing array for reuse"""
+        self._start = self._end = 0
+        self._overflow_logged = False
+
+    def _reserve(self, n: int) -> None:
+        """Make room for `n` more samples after `self._end`"""
+        if self._data is None:
+            self._data = np.empty(max(self._capacity, n), dtype=self.dtype)
+            self._start = self._end = 0
+            return
+
+        if self._end + n <= len(self._data):
+            return
+
+        size = len(self)
+        capacity = len(self._data)
+        if size + n <= capacity // 2 or capacity >= 2 * self.max_samples:
+            # Enough free space at the front: move the samples back to index 0
+            self._data[:size] = self._data[self._start : self._end]
+        else:
+            new_capacity = min(max(2 * capacity, size + n), 2 * self.max_samples)
+            new_data = np.empty(new_capacity, dtype=self.dtype)
+            new_data[:size] = self._data[self._start : self._end]
+            self._data = new_data
+        self._start, self._end = 0, size
+
+    def _log_overflow(self) -> None:
+        if not self._overflow_logged:
+            logger.warning(
+                f"Audio buffer exceeded {self.max_samples} samples, "
+                "dropping the oldest audio."
+            )
+            self._overflow_logged = True
@@ -0,0 +1,219 @@
+"""
+In-process audio decoding.
+
+TTS engines write or stream WAV, mp3, ogg or aiff. These are decoded in
+memory with `wave` (16-bit PCM WAV, the common case) or `soundfile`, whose
+bundled libsndfile also reads mp3 since 1.1. Only formats libsndfile cannot
+read fall back to pydub, which runs ffmpeg.
+
+Decoded audio is 16-bit mono PCM, the format the rest of the pipeline (lip
+sync volumes, streaming payloads) works with.
+"""
+
+import io
+import wave
+
+import numpy as np
+import soundfile as sf
+from loguru import logger
+
+# Formats the frontend can play as they are
+PASSTHROUGH_FORMATS = ("wav", "mp3", "ogg")
+
+# Format name -> libsndfile major format
+_SOUNDFILE_FORMATS = {
+    "wav": "WAV",
+    "mp3": "MP3",
+    "ogg": "OGG",
+    "flac": "FLAC",
+    "aiff": "AIFF",
+}
+
+
+def detect_format(data: bytes) -> str | None:
+    """
+    Detect the container of encoded audio from its first bytes.
+
+    Returns:
+        str | None: "wav", "mp3", "ogg", "flac" or "aiff", or None if unknown
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:4] == b"FORM" and data[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    # ID3 tag, or the sync word of an MPEG audio frame
+    if data[:3] == b"ID3" or (
+        len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0
+    ):
+        return "mp3"
+    return None
+
+
+def can_decode(audio_format: str) -> bool:
+    """Whether `audio_format` can be decoded without a subprocess"""
+    major = _SOUNDFILE_FORMATS.get(audio_format)
+    return major is not None and major in sf.available_formats()
+
+
+def _to_mono(samples: np.ndarray) -> np.ndarray:
+    """Mix (frames, channels) int16 samples down to 1-D mono"""
+    if samples.ndim == 1:
+        return samples
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    # Summing the columns is much faster than a mean over the short axis
+    mixed = samples[:, 0].astype(np.int32)
+    for channel in range(1, samples.shape[1]):
+        mixed += samples[:, channel]
+    mixed //= samples.shape[1]
+    return mixed.astype(np.int16)
+
+
+def _decode_pcm_wav(data: bytes) -> tuple[np.ndarray, int] | None:
+    """Decode a 16-bit PCM WAV with the standard library, or return None"""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav_file:
+            if wav_file.getsampwidth() != 2:
+                return None
+            channels = wav_file.getnchannels()
+            sample_rate = wav_file.getframerate()
+            frames = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        # e.g. float or WAVE_FORMAT_EXTENSIBLE files
+        return None
+    samples = np.frombuffer(frames, dtype="<i2")
+    return _to_mono(samples.reshape(-1, channels)), sample_rate
+
+
+def decode_audio(
+    data: bytes, audio_format: str | None = None
+) -> tuple[np.ndarray, int]:
+    """
+    Decode encoded audio to 16-bit mono samples.
+
+    Args:
+        data: The encoded audio
+        audio_format: The expected format, used when it cannot be detected
+            from the data (e.g. "aac")
+
+    Returns:
+        tuple: (int16 samples, sample rate)
+
+    Raises:
+        ValueError: If the audio cannot be decoded
+    """
+    audio_format = detect_format(data) or audio_format
+
+    if audio_format == "wav":
+        decoded = _decode_pcm_wav(data)
+        if decoded is not None:
+            return decoded
+
+    if audio_format is None or can_decode(audio_format):
+        try:
+            samples, sample_rate = sf.read(
+                io.BytesIO(data), dtype="int16", always_2d=True
+            )
+            return _to_mono(samples), sample_rate
+        except Exception as e:
+            if audio_format is not None:
+                raise ValueError(f"Failed to decode {audio_format} audio: {e}")
+
+    # Formats libsndfile cannot read, e.g. aac
+    logger.debug(f"Decoding {audio_format or 'unknown'} audio with ffmpeg")
+    from pydub import AudioSegment
+
+    try:
+        audio = AudioSegment.from_file(io.BytesIO(data), format=audio_format)
+    except Exception as e:
+        raise ValueError(f"Failed to decode {audio_format or 'unknown'} audio: {e}")
+    audio = audio.set_channels(1).set_sample_width(2)
+    return np.frombuffer(audio.raw_data, dtype="<i2"), audio.frame_rate
+
+
+def read_audio_file(path: str) -> tuple[bytes, str | None]:
+    """
+    Read an audio file without decoding it.
+
+    Returns:
+        tuple: (file contents, detected format or None)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, detect_format(data)
+
+
+class StreamDecoder:
+    """
+    Decodes mp3 or ogg that is received incrementally, in-process.
+
+    libsndfile cannot read from a stream that is still growing, so the
+    received prefix is decoded again whenever it has grown by
+    `growth_factor` (decoding a prefix gives the same leading samples as
+    decoding the whole stream). This keeps the total work within a small
+    multiple of one decode, and yields audio long before the stream ends.
+    The last `holdback_samples` of a prefix may belong to an incomplete
+    frame, so they are only yielded once the stream has ended.
+    """
+
+    def __init__(
+        self,
+        audio_format: str,
+        min_decode_bytes: int = 4096,
+        growth_factor: float = 2.0,
+        holdback_samples: int = 2304,
+    ):
+        """
+        Initialize the decoder.
+
+        Args:
+            audio_format: "mp3" or "ogg"
+            min_decode_bytes: Data received before the first decode
+            growth_factor: Decode again once the data has grown by this factor
+            holdback_samples: Samples at the end of a prefix that are not
+                yielded until the stream ends (two mp3 frames)
+        """
+        self.audio_format = audio_format
+        self.min_decode_bytes = min_decode_bytes
+        self.growth_factor = growth_factor
+        self.holdback_samples = holdback_samples
+
+        self.sample_rate: int | None = None
+        self._data = bytearray()
+        self._decoded_size = 0
+        self._samples_out = 0
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """
+        Add received data.
+
+        Returns:
+            np.ndarray: Newly decoded int16 samples, possibly empty
+        """
+        self._data.extend(data)
+        threshold = max(
+            self.min_decode_bytes, int(self._decoded_size * self.growth_factor)
+        )
+        if len(self._data) < threshold:
+            return np.empty(0, dtype=np.int16)
+        return self._decode(final=False)
+
+    def finish(self) -> np.ndarray:
+        """Decode the rest of the stream after the last data was received"""
+        if not self._data:
+            return np.empty(0, dtype=np.int16)
+        return self._decode(final=True)
+
+    def _decode(self, final: bool) -> np.ndarray:
+        self._decoded_size = len(self._data)
+        samples, self.sample_rate = decode_audio(bytes(self._data), self.audio_format)
+        end = len(samples) if final else len(samples) - self.holdback_samples
+        if end <= self._samples_out:
+            return np.empty(0, dtype=np.int16)
+        new = samples[self._samples_out : end]
+        self._samples_out = end
+        return new
@@ -0,0 +1,322 @@
+"""
+Binary audio frames for the `/client-ws` WebSocket.
+
+Client to server
+----------------
+
+Besides the JSON messages (`{"type": "mic-audio-data", "audio": [0.1, ...]}`),
+clients can send microphone audio as binary WebSocket frames. A frame is a
+fixed 12-byte little-endian header followed by raw PCM samples:
+
+    offset  size  field
+    0       1     message type (see `FRAME_MESSAGE_TYPES`)
+    1       1     sample format (0 = int16, 1 = float32)
+    2       2     reserved, must be 0
+    4       4     sample rate (Hz)
+    8       4     sequence number (wraps at 2**32)
+    12      ...   mono PCM samples, little-endian
+
+The header is 4-byte aligned so float32 payloads can be viewed in place with
+`np.frombuffer` without copying.
+
+Server to client
+----------------
+Clients that send `{"type": "set-audio-transport", "transport": "binary"}`
+receive `audio` messages as binary frames instead of JSON with base64 audio:
+
+    offset  size  field
+    0       1     message type (3 = "audio")
+    1       1     audio encoding (see `AUDIO_ENCODINGS`)
+    2       2     reserved, must be 0
+    4       4     sample rate (Hz), 0 if given by the encoded audio
+    8       4     sequence number (wraps at 2**32)
+    12      4     metadata length N
+    16      N     UTF-8 JSON metadata: the `audio` message without its audio
+                  (display_text, actions, volumes, slice_length, forwarded),
+                  padded with spaces to a multiple of 4 bytes
+    16+N    ...   audio bytes
+"""
+
+import json
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+HEADER_FORMAT = "<BBHII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # 12 bytes
+
+# Binary message type id -> WebSocket message type
+FRAME_MESSAGE_TYPES = {
+    1: "mic-audio-data",
+    2: "raw-audio-data",
+}
+
+SAMPLE_FORMAT_INT16 = 0
+SAMPLE_FORMAT_FLOAT32 = 1
+
+_SAMPLE_DTYPES = {
+    SAMPLE_FORMAT_INT16: np.dtype("<i2"),
+    SAMPLE_FORMAT_FLOAT32: np.dtype("<f4"),
+}
+
+
+# Server -> client audio messages
+AUDIO_MESSAGE_TYPE_ID = 3
+METADATA_LENGTH_FORMAT = "<I"
+AUDIO_ENCODINGS = {
+    "pcm_s16le": SAMPLE_FORMAT_INT16,  # raw 16-bit little-endian mono PCM
+    "wav": 2,
+    "mp3": 3,
+    "ogg": 4,
+}
+
+
+@dataclass
+class AudioFrame:
+    """A decoded binary audio frame"""
+
+    msg_type: str
+    sample_rate: int
+    sequence: int
+    audio: np.ndarray  # float32 samples in [-1, 1]
+
+
+def decode_audio_frame(frame: bytes) -> AudioFrame:
+    """
+    Decode a binary audio frame into float32 samples.
+
+    float32 payloads are returned as a read-only view over `frame`;
+    int16 payloads are scaled to [-1, 1] (one conversion, no parsing).
+
+    Args:
+        frame: The raw bytes of the binary WebSocket message
+
+    Returns:
+        AudioFrame: The decoded frame
+
+    Raises:
+        ValueError: If the header or payload is malformed
+    """
+    if len(frame) < HEADER_SIZE:
+        raise ValueError(
+            f"Audio frame too short: {len(frame)} bytes (header is {HEADER_SIZE})"
+        )
+
+    type_id, sample_format, _, sample_rate, sequence = struct.unpack_from(
+        HEADER_FORMAT, frame
+    )
+
+    msg_type = FRAME_MESSAGE_TYPES.get(type_id)
+    if msg_type is None:
+        raise ValueError(f"Unknown audio frame message type: {type_id}")
+
+    dtype = _SAMPLE_DTYPES.get(sample_format)
+    if dtype is None:
+        raise ValueError(f"Unknown audio frame sample format: {sample_format}")
+
+    if (len(frame) - HEADER_SIZE) % dtype.itemsize != 0:
+        raise ValueError(
+            f"Audio frame payload is not a whole number of {dtype.name} samples"
+        )
+
+    samples = np.frombuffer(frame, dtype=dtype, offset=HEADER_SIZE)
+    if sample_format == SAMPLE_FORMAT_INT16:
+        audio = samples.astype(np.float32) / 32768.0
+    elif dtype.isnative:
+        audio = samples
+    else:  # big-endian host, needs a byte swap
+        audio = samples.astype(np.float32)
+
+    return AudioFrame(
+        msg_type=msg_type,
+        sample_rate=sample_rate,
+        sequence=sequence,
+        audio=audio,
+    )
+
+
+def encode_audio_frame(
+    msg_type: str,
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    sequence: int = 0,
+    sample_format: int = SAMPLE_FORMAT_FLOAT32,
+) -> bytes:
+    """
+    Encode float samples in [-1, 1] into a binary audio frame.
+    Mainly useful for clients written in Python and for testing.
+
+    Args:
+        msg_type: "mic-audio-data" or "raw-audio-data"
+        audio: Samples to encode
+        sample_rate: Sample rate of the audio
+        sequence: Sequence number of the frame
+        sample_format: SAMPLE_FORMAT_INT16 or SAMPLE_FORMAT_FLOAT32
+
+    Returns:
+        bytes: The encoded frame
+    """
+    type_ids = {v: k for k, v in FRAME_MESSAGE_TYPES.items()}
+    if msg_type not in type_ids:
+        raise ValueError(f"Message type {msg_type} has no binary frame encoding")
+
+    if sample_format == SAMPLE_FORMAT_INT16:
+        payload = (np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes()
+    elif sample_format == SAMPLE_FORMAT_FLOAT32:
+        payload = np.asarray(audio, dtype="<f4").tobytes()
+    else:
+        raise ValueError(f"Unknown audio frame sample format: {sample_format}")
+
+    header = struct.pack(
+        HEADER_FORMAT,
+        type_ids[msg_type],
+        sample_format,
+        0,
+        sample_rate,
+        sequence & 0xFFFFFFFF,
+    )
+    return header + payload
+
+
+@dataclass
+class AudioMessageFrame:
+    """A decoded server-to-client `audio` frame"""
+
+    metadata: dict
+    audio: bytes
+    encoding: str
+    sample_rate: int
+    sequence: int
+
+
+def encode_audio_message_frame(
+    metadata: dict,
+    audio: bytes,
+    encoding: str,
+    sample_rate: int = 0,
+    sequence: int = 0,
+) -> bytes:
+    """
+    Encode an `audio` message as a binary frame.
+
+    Args:
+        metadata: The message fields other than the audio
+        audio: The audio bytes, in `encoding`
+        encoding: One of `AUDIO_ENCODINGS`
+        sample_rate: Sample rate of raw PCM, 0 for self-describing encodings
+        sequence: Sequence number of the frame
+
+    Returns:
+        bytes: The encoded frame
+    """
+    if encoding not in AUDIO_ENCODINGS:
+        raise ValueError(f"Unknown audio encoding: {encoding}")
+
+    metadata_bytes = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+    # Pad so the audio starts 4-byte aligned
+    metadata_bytes += b" " * (-len(metadata_bytes) % 4)
+
+    header = struct.pack(
+        HEADER_FORMAT,
+        AUDIO_MESSAGE_TYPE_ID,
+        AUDIO_ENCODINGS[encoding],
+        0,
+        sample_rate,
+        sequence & 0xFFFFFFFF,
+    )
+    return b"".join(
+        [
+            header,
+            struct.pack(METADATA_LENGTH_FORMAT, len(metadata_bytes)),
+            metadata_bytes,
+            audio,
+        ]
+    )
+
+
+def decode_audio_message_frame(frame: bytes) -> AudioMessageFrame:
+    """
+    Decode a binary `audio` frame. Mainly useful for clients written in
+    Python and for testing.
+
+    Args:
+        frame: The raw bytes of the binary WebSocket message
+
+    Returns:
+        AudioMessageFrame: The decoded frame
+
+    Raises:
+        ValueError: If the frame is malformed
+    """
+    metadata_start = HEADER_SIZE + struct.calcsize(METADATA_LENGTH_FORMAT)
+    if len(frame) < metadata_start:
+        raise ValueError(f"Audio message frame too short: {len(frame)} bytes")
+
+    type_id, encoding_id, _, sample_rate, sequence = struct.unpack_from(
+        HEADER_FORMAT, frame
+    )
+    if type_id != AUDIO_MESSAGE_TYPE_ID:
+        raise ValueError(f"Not an audio message frame: type {type_id}")
+
+    encodings = {v: k for k, v in AUDIO_ENCODINGS.items()}
+    if encoding_id not in encodings:
+        raise ValueError(f"Unknown audio encoding: {encoding_id}")
+
+    (metadata_length,) = struct.unpack_from(METADATA_LENGTH_FORMAT, frame, HEADER_SIZE)
+    audio_start = metadata_start + metadata_length
+    if len(frame) < audio_start:
+        raise ValueError("Audio message frame metadata is truncated")
+
+    return AudioMessageFrame(
+        metadata=json.loads(frame[metadata_start:audio_start]),
+        audio=bytes(frame[audio_start:]),
+        encoding=encodings[encoding_id],
+        sample_rate=sample_rate,
+        sequence=sequence,
+    )
+
+
+if __name__ == "__main__":
+    # Benchmark: CPU time needed to decode one second of 16 kHz mic audio
+    # sent as a JSON float list versus binary frames.
+    import json
+    import time
+
+    sample_rate = 16000
+    chunk_size = 512  # the frontend VAD sends 512-sample chunks
+    seconds = 30
+    rng = np.random.default_rng(0)
+    chunks = [
+        (rng.standard_normal(chunk_size) * 0.1).astype(np.float32)
+        for _ in range(seconds * sample_rate // chunk_size)
+    ]
+
+    json_messages = [
+        json.dumps({"type": "mic-audio-data", "audio": chunk.tolist()})
+        for chunk in chunks
+    ]
+    float_frames = [encode_audio_frame("mic-audio-data", c) for c in chunks]
+    int16_frames = [
+        encode_audio_frame("mic-audio-data", c, sample_format=SAMPLE_FORMAT_INT16)
+        for c in chunks
+    ]
+
+    def bench(name, messages, decode):
+        start = time.process_time()
+        for message in messages:
+            decode(message)
+        elapsed = time.process_time() - start
+        wire = sum(len(m) for m in messages) / seconds / 1024
+        print(
+            f"{name:<16} {elapsed / seconds * 1000:8.3f} ms CPU per audio-second"
+            f"  ({wire:8.1f} KiB/s on the wire)"
+        )
+
+    bench(
+        "json",
+        json_messages,
+        lambda m: np.array(json.loads(m)["audio"], dtype=np.float32),
+    )
+    bench("binary float32", float_frames, decode_audio_frame)
+    bench("binary int16", int16_frames, decode_audio_frame)
@@ -0,0 +1,325 @@
+"""
+Fast, deterministic language identification.
+
+Most scripts belong to one language, or one language the pipeline cares
+about, so the script of the letters usually decides the language: kana is
+Japanese, Hangul Korean, Han (without kana) Chinese, and so on. Only text in
+Latin script needs a model: a small character trigram model built from the
+most common words of each language and the letters only some of them use.
+
+The result is an ISO 639-1 code, or None if the text does not have enough
+letters to tell, or no language clearly scores best.
+"""
+
+import re
+from collections import Counter
+from typing import Optional
+
+# (language, pattern of the script's letters), in order of precedence for
+# ties. Kana comes before Han: Japanese is written with both, Chinese never
+# uses kana.
+_SCRIPTS = [
+    ("ja", re.compile("[\u3040-\u30ff\u31f0-\u31ff\uff66-\uff9f]")),
+    ("ko", re.compile("[\uac00-\ud7af\u1100-\u11ff\u3130-\u318f]")),
+    ("zh", re.compile("[\u4e00-\u9fff\u3400-\u4dbf\uf900-\ufaff]")),
+    ("ru", re.compile("[\u0400-\u04ff]")),
+    ("ar", re.compile("[\u0600-\u06ff\u0750-\u077f\ufb50-\ufdff\ufe70-\ufeff]")),
+    ("hi", re.compile("[\u0900-\u097f]")),
+    ("el", re.compile("[\u0370-\u03ff\u1f00-\u1fff]")),
+    ("he", re.compile("[\u0590-\u05ff]")),
+    ("hy", re.compile("[\u0530-\u058f]")),
+    ("am", re.compile("[\u1200-\u137f]")),
+    ("my", re.compile("[\u1000-\u109f]")),
+    ("th", re.compile("[\u0e00-\u0e7f]")),
+    ("bn", re.compile("[\u0980-\u09ff]")),
+    ("ta", re.compile("[\u0b80-\u0bff]")),
+]
+_LATIN = re.compile("[A-Za-z\u00c0-\u024f\u1e00-\u1eff]")
+
+# A Han, kana or Hangul character carries about as much as a short word
+_SCRIPT_WEIGHTS = {"ja": 3, "ko": 3, "zh": 3}
+
+# Letters that tell languages sharing a script apart
+_CYRILLIC_LETTERS = [
+    ("kk", re.compile("[әғқңөұүһ]", re.IGNORECASE)),
+    ("uk", re.compile("[їєґ]", re.IGNORECASE)),
+    ("ru", re.compile("[ыэё]", re.IGNORECASE)),
+    ("bg", re.compile("ъ", re.IGNORECASE)),
+]
+_ARABIC_LETTERS = [
+    ("ur", re.compile("[ٹڈڑںےھ]")),
+    ("fa", re.compile("[پچژگیک]")),
+]
+_DEVANAGARI_LETTERS = [("mr", re.compile("ळ|आहे"))]
+
+# The most common words of each language written in Latin script
+_LATIN_WORDS = {
+    "en": "the and to of a in is it you that he was for on are with as i his "
+    "they be at one have this from or had by not but what all were we when "
+    "your can there an which their if do will how about out up them then "
+    "she so these would my me like just don't i'm it's",
+    "de": "der die und in den von zu das mit sich des auf für ist im dem nicht "
+    "ein eine als auch es an werden aus er hat dass sie nach wird bei einer "
+    "um am sind noch wie einem über so zum war haben nur oder aber ich "
+    "du wir ihr mir dich gut sehr",
+    "fr": "le de un être et à il avoir ne je son que se qui ce dans en du elle "
+    "au pour pas sur avec tout plus les des une est mais nous vous ou "
+    "sont cette comme bien très c'est j'ai",
+    "es": "el la de que y a en un ser se no haber por con su para como estar "
+    "tener le lo todo pero más hacer o poder decir este ir otro ese si "
+    "me ya ver porque dar cuando muy sin sobre también es los las del yo "
+    "una está",
+    "it": "il di che è e la per un in a non sono io mi ho lo ma ti si ha le "
+    "cosa con se no questo da ci bene del tu una più gli come sei alla "
+    "della anche molto sì",
+    "pt": "o de a que e do da em um para é com não uma os no se na por mais as "
+    "dos como mas foi ao ele das tem à seu sua ou ser quando muito há nos "
+    "já está eu também só pelo pela você",
+    "nl": "de van het een en in is dat op te zijn met voor niet aan er die om "
+    "ook als dan bij of maar wat nog door naar hij ze ik je we kan over "
+    "heeft wordt zijn dit deze geen",
+    "pl": "w i nie na się z do to że jest o jak ale po co tak za od jego "
+    "jej go mnie ja ty już tylko czy są przez może było być ten ta być "
+    "dla tego bardzo",
+    "da": "og i at det en den til er som på de med han af for ikke der var "
+    "mig sig men et har om vi min havde ham hun nu over da fra du ud sin jeg "
+    "dem os op man hans hvor eller hvad skal",
+    "sv": "och i att det som en på är av för med till den har de inte om ett "
+    "han men var jag sig från vi så kan man när år säger hon under också "
+    "efter eller nu sin där vid mot ska skulle",
+    "sk": "a v sa na je že to s z do som si ako ale by aj pre tak o už len "
+    "ktorý ktorá ktoré sú bol bola bolo po keď ešte veľmi môže",
+    "cs": "a v se na je že to s z do jsem si jako ale by i pro tak o už jen "
+    "který která které jsou byl byla bylo po když ještě velmi může",
+    "tr": "bir ve bu da de için ne ile o çok ama ben sen mi daha gibi var "
+    "değil olarak kadar sonra her şey bana beni onu en",
+    "id": "yang dan di itu dengan untuk tidak ini dari dalam akan pada juga "
+    "saya ke karena ada mereka kita bisa atau sudah apa aku kamu",
+    "vi": "và của là có không người này được một những cho trong đã với các "
+    "tôi bạn anh em thì để khi rất như",
+}
+
+# Letters used by only some of the languages above
+_LATIN_LETTERS = {
+    "de": "äöüß",
+    "fr": "éèêëçàâîïôùûœ",
+    "es": "ñ¿¡áéíóú",
+    "it": "àèéìòù",
+    "pt": "ãõçáâêéíóú",
+    "pl": "ąęłńśźżćó",
+    "da": "æøå",
+    "sv": "åäö",
+    "sk": "äľĺŕôščžýáíéúťďň",
+    "cs": "ěščřžýáíéůúťďň",
+    "tr": "ğşıçöü",
+    "vi": "ăâđêôơưạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹ",
+}
+
+_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+# Score a language must reach to be chosen for Latin text
+_MIN_LATIN_SCORE = 1.0
+# Latin text shorter than this is not identified: a single stopword ("Hi!",
+# "Ja.") reaches the score in many languages
+_MIN_LATIN_LETTERS = 5
+# Lead over the runner-up the chosen language needs
+_MIN_LATIN_MARGIN = 0.25
+
+
+def _trigrams(word: str) -> list[str]:
+    padded = f" {word} "
+    return [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+def _build_latin_model() -> dict[str, dict[str, float]]:
+    """
+    Trigram and letter -> {language: weight}. A feature shared by several
+    languages counts for less, so the rare ones decide.
+    """
+    features: dict[str, set[str]] = {}
+    for language, words in _LATIN_WORDS.items():
+        for word in words.split():
+            for trigram in _trigrams(word):
+                features.setdefault(trigram, set()).add(language)
+    for language, letters in _LATIN_LETTERS.items():
+        for letter in letters:
+            features.setdefault(letter, set()).add(language)
+    return {
+        feature: {language: 1 / len(languages) for language in languages}
+        for feature, languages in features.items()
+    }
+
+
+_LATIN_MODEL = _build_latin_model()
+
+
+def _identify_latin(text: str, letters: int) -> Optional[str]:
+    if letters < _MIN_LATIN_LETTERS:
+        return None
+    scores: Counter[str] = Counter()
+    for word in _WORD.findall(text.lower()):
+        for trigram in _trigrams(word):
+            weights = _LATIN_MODEL.get(trigram)
+            if weights:
+                scores.update(weights)
+        for letter in word:
+            if letter > "\x7f":
+                weights = _LATIN_MODEL.get(letter)
+                if weights:
+                    scores.update(weights)
+    if not scores:
+        return None
+    (language, score), *rest = scores.most_common(2)
+    runner_up = rest[0][1] if rest else 0.0
+    if score < _MIN_LATIN_SCORE or score - runner_up < _MIN_LATIN_MARGIN:
+        return None
+    return language
+
+
+def _refine(language: str, text: str) -> tuple[str, bool]:
+    """
+    Tell apart languages that share a script. Also returns whether the
+    language is certain: without a letter only one of them uses, the script's
+    most common language is a guess.
+    """
+    cues = {
+        "ru": _CYRILLIC_LETTERS,
+        "ar": _ARABIC_LETTERS,
+        "hi": _DEVANAGARI_LETTERS,
+    }.get(language)
+    if cues is None:
+        return language, True
+    for candidate, pattern in cues:
+        if pattern.search(text):
+            return candidate, True
+    return language, False
+
+
+def _identify(text: str) -> tuple[Optional[str], bool]:
+    """The language of text, and whether its script decided it"""
+    best, best_count = None, 0
+    for language, pattern in _SCRIPTS:
+        count = len(pattern.findall(text)) * _SCRIPT_WEIGHTS.get(language, 1)
+        if count > best_count:
+            best, best_count = language, count
+    if best == "zh" and _SCRIPTS[0][1].search(text):
+        # Han with any kana is Japanese
+        best = "ja"
+
+    latin_count = len(_LATIN.findall(text))
+    if best is not None and best_count >= latin_count:
+        return _refine(best, text)
+    if latin_count == 0:
+        return None, False
+    return _identify_latin(text, latin_count), False
+
+
+def identify_language(text: str) -> Optional[str]:
+    """
+    Identify the language of text.
+
+    Args:
+        text: The text to identify
+
+    Returns:
+        Optional[str]: ISO 639-1 code of the language, or None if the text
+            has too few letters to tell or no language clearly scores best
+    """
+    return _identify(text)[0]
+
+
+def identify_script_language(text: str) -> Optional[str]:
+    """
+    Identify the language of text only if its script decides it: kana,
+    Hangul, Han, Cyrillic with a letter only one language uses, and so on.
+    The Latin model takes some sentences for a related language, so this
+    never identifies Latin text.
+
+    Args:
+        text: The text to identify
+
+    Returns:
+        Optional[str]: ISO 639-1 code of the language, or None if the script
+            does not decide it
+    """
+    language, certain = _identify(text)
+    return language if certain else None
+
+
+def normalize_language_code(code: Optional[str]) -> Optional[str]:
+    """
+    Convert a language code of a service (e.g. "JA", "EN-US", "zh-TW" or
+    "JP") to the ISO 639-1 code `identify_language` returns.
+    """
+    if not code:
+        return None
+    code = code.lower().replace("_", "-").split("-")[0]
+    return {"jp": "ja", "kr": "ko", "cn": "zh"}.get(code, code)
+
+
+class LanguageCache:
+    """
+    The language a session's character speaks in.
+
+    Short sentences ("OK.", "Hmm...", an emoji) do not have enough letters
+    to identify their language. A character usually keeps speaking the same
+    language, so these get the language of the character's last sentence
+    that did. Each agent (one per session and character) keeps its own.
+    """
+
+    def __init__(self) -> None:
+        self.language: Optional[str] = None
+
+    def identify(self, text: str) -> Optional[str]:
+        """Identify the language of text, or return the last known one"""
+        language = identify_language(text)
+        if language is None:
+            return self.language
+        self.language = language
+        return language
+
+
+if __name__ == "__main__":
+    # Benchmark: accuracy and speed on a labeled corpus, compared with
+    # langdetect if it is installed. Also counts the sentences the
+    # translation would skip wrongly (see TranslateInterface.needs_translation).
+    import time
+
+    from .language_id_corpus import CORPUS
+
+    def bench(name, identify):
+        identify(CORPUS[0][1])
+        start = time.perf_counter()
+        results = [identify(text) for _, text in CORPUS]
+        elapsed = time.perf_counter() - start
+        correct = sum(
+            result == language for result, (language, _) in zip(results, CORPUS)
+        )
+        print(
+            f"{name:<24} {correct:3d}/{len(CORPUS)} correct"
+            f"  {elapsed / len(CORPUS) * 1e6:8.1f} us/sentence"
+        )
+        return results
+
+    bench("identify_language", identify_language)
+    decided = bench("identify_script_language", identify_script_language)
+    wrong = sum(
+        result is not None and result != language
+        for result, (language, _) in zip(decided, CORPUS)
+    )
+    print(f"{'':<24} {wrong:3d} decided wrongly")
+
+    try:
+        from langdetect import DetectorFactory, detect
+    except ImportError:
+        print("langdetect is not installed, skipping it")
+    else:
+        DetectorFactory.seed = 0
+
+        def langdetect(text):
+            try:
+                return detect(text).split("-")[0]
+            except Exception:
+                return None
+
+        bench("langdetect", langdetect)
@@ -0,0 +1,114 @@
+"""
+Sentences labeled with their language, to measure the accuracy of
+`language_id` (see the benchmark at the end of that module). Mostly short
+chat replies, the text the pipeline identifies.
+"""
+
+CORPUS = [
+    ("en", "Hello! How are you doing today?"),
+    ("en", "I think the weather is nice, so we should go for a walk."),
+    ("en", "That's a great question, let me explain it step by step."),
+    ("en", "Sure, I can help you with that."),
+    ("en", "The model runs on a small GPU and it is fast enough for real time use."),
+    ("en", "Thank you so much for watching my stream tonight!"),
+    ("en", "I'm not sure what you mean, could you say that again?"),
+    ("en", "Let's play a game."),
+    ("de", "Ich habe heute keine Zeit, aber morgen gerne."),
+    ("de", "Das Wetter ist heute sehr schön."),
+    ("de", "Kannst du mir bitte sagen, wie spät es ist?"),
+    ("de", "Wir gehen am Wochenende in die Berge."),
+    ("de", "Vielen Dank für deine Hilfe!"),
+    ("de", "Es ist nicht so einfach, wie es aussieht."),
+    ("fr", "Bonjour, comment allez-vous aujourd'hui ?"),
+    ("fr", "Je pense que c'est une très bonne idée."),
+    ("fr", "Nous allons au cinéma ce soir avec des amis."),
+    ("fr", "Merci beaucoup pour votre aide."),
+    ("fr", "Il fait beau dans le sud de la France."),
+    ("fr", "Est-ce que tu veux manger quelque chose ?"),
+    ("es", "Hola, ¿cómo estás hoy?"),
+    ("es", "Creo que es una buena idea para el fin de semana."),
+    ("es", "Me gusta mucho la comida de mi abuela."),
+    ("es", "¿Puedes ayudarme con esta tarea, por favor?"),
+    ("es", "El tren llega a la estación a las ocho."),
+    ("es", "No sé qué hacer con todo este trabajo."),
+    ("it", "Ciao, come stai oggi?"),
+    ("it", "Penso che sia una buona idea andare al mare."),
+    ("it", "Mi piace molto la pizza napoletana."),
+    ("it", "Non ho capito cosa hai detto."),
+    ("it", "Domani andiamo a trovare la nonna."),
+    ("it", "Grazie mille per il tuo aiuto!"),
+    ("pt", "Olá, tudo bem com você?"),
+    ("pt", "Eu acho que isso é uma ótima ideia."),
+    ("pt", "Vamos à praia no fim de semana."),
+    ("pt", "Não sei o que fazer agora."),
+    ("pt", "O jantar está pronto, pode vir comer."),
+    ("pt", "Muito obrigado pela sua ajuda!"),
+    ("nl", "Hallo, hoe gaat het met je vandaag?"),
+    ("nl", "Ik denk dat het een goed idee is."),
+    ("nl", "We gaan dit weekend naar het strand."),
+    ("nl", "Het weer is vandaag erg mooi."),
+    ("nl", "Kun je mij helpen met dit probleem?"),
+    ("nl", "Dank je wel voor je hulp!"),
+    ("pl", "Cześć, jak się masz dzisiaj?"),
+    ("pl", "Myślę, że to jest bardzo dobry pomysł."),
+    ("pl", "Jutro idziemy do kina z przyjaciółmi."),
+    ("pl", "Nie wiem, co mam teraz zrobić."),
+    ("pl", "Dziękuję bardzo za pomoc!"),
+    ("pl", "Pogoda jest dzisiaj bardzo ładna."),
+    ("da", "Hej, hvordan har du det i dag?"),
+    ("da", "Jeg tror, det er en god idé."),
+    ("da", "Vi skal til stranden i weekenden."),
+    ("da", "Tak for hjælpen!"),
+    ("sv", "Hej, hur mår du idag?"),
+    ("sv", "Jag tror att det är en bra idé."),
+    ("sv", "Vi ska åka till stranden i helgen."),
+    ("sv", "Tack så mycket för hjälpen!"),
+    ("sk", "Ahoj, ako sa máš dnes?"),
+    ("sk", "Myslím si, že je to veľmi dobrý nápad."),
+    ("cs", "Ahoj, jak se máš dnes?"),
+    ("cs", "Myslím si, že je to velmi dobrý nápad."),
+    ("tr", "Merhaba, bugün nasılsın?"),
+    ("tr", "Bence bu çok güzel bir fikir."),
+    ("id", "Halo, apa kabar hari ini?"),
+    ("id", "Saya pikir itu ide yang sangat bagus."),
+    ("vi", "Xin chào, hôm nay bạn thế nào?"),
+    ("vi", "Tôi nghĩ đó là một ý tưởng rất hay."),
+    ("zh", "你好，今天过得怎么样？"),
+    ("zh", "我觉得这个主意非常好。"),
+    ("zh", "我们周末去海边玩吧！"),
+    ("zh", "谢谢你的帮助。"),
+    ("zh", "我用Python写了一个小程序。"),
+    ("zh", "这个模型在GPU上运行得很快。"),
+    ("zh", "好的。"),
+    ("zh", "今天天气真不错，我们出去走走吧。"),
+    ("ja", "こんにちは、今日は元気ですか？"),
+    ("ja", "それはとても良いアイデアだと思います。"),
+    ("ja", "週末は海に行きましょう！"),
+    ("ja", "手伝ってくれてありがとう。"),
+    ("ja", "私はPythonで小さなプログラムを書きました。"),
+    ("ja", "はい。"),
+    ("ja", "東京は今日とても暑いです。"),
+    ("ja", "ちょっと待ってね。"),
+    ("ko", "안녕하세요, 오늘 기분이 어때요?"),
+    ("ko", "그거 정말 좋은 생각이에요."),
+    ("ko", "주말에 바다에 가요!"),
+    ("ko", "도와줘서 고마워요."),
+    ("ru", "Привет, как у тебя дела сегодня?"),
+    ("ru", "Я думаю, что это очень хорошая идея."),
+    ("ru", "Мы поедем на море в выходные."),
+    ("ru", "Спасибо за помощь!"),
+    ("bg", "Здравей, как си днес?"),
+    ("bg", "Мисля, че това е много добра идея."),
+    ("ar", "مرحبا، كيف حالك اليوم؟"),
+    ("ar", "أعتقد أن هذه فكرة جيدة جدا."),
+    ("fa", "سلام، امروز حالت چطور است؟"),
+    ("fa", "فکر می\u200cکنم این ایده خیلی خوبی است."),
+    ("hi", "नमस्ते, आज आप कैसे हैं?"),
+    ("hi", "मुझे लगता है कि यह बहुत अच्छा विचार है।"),
+    ("el", "Γεια σου, πώς είσαι σήμερα;"),
+    ("el", "Νομίζω ότι είναι πολύ καλή ιδέα."),
+    ("hy", "Բարեւ, ինչպե՞ս ես այսօր:"),
+    ("am", "ሰላም፣ ዛሬ እንዴት ነህ?"),
+    ("my", "မင်္ဂလာပါ၊ ဒီနေ့ နေကောင်းလား။"),
+    ("uk", "Привіт, як справи? Я їду додому."),
+]
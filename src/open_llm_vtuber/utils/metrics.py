@@ -0,0 +1,155 @@
+"""
+Lightweight in-process metrics.
+
+Components register counters, gauges and summaries in the shared `metrics`
+registry and update them on their hot paths, or register collector functions
+for structured values; `GET /metrics` returns a JSON snapshot of all of them. Updates are thread-safe, so they can be recorded
+from `asyncio.to_thread` workers as well as from the event loop.
+"""
+
+import threading
+from typing import Any, Callable
+
+
+class Counter:
+    """A value that only goes up, e.g. the number of cache hits"""
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"type": "counter", "value": self._value}
+
+
+class Gauge:
+    """A value that goes up and down, e.g. a queue depth"""
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"type": "gauge", "value": self._value}
+
+
+class Summary:
+    """Count, sum, min, max and last value of observations, e.g. a batch size"""
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self.count = 0
+        self.sum = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+        self.last: float | None = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+            self.last = value
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum / self.count if self.count else None
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "summary",
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class MetricsRegistry:
+    """Metrics by name. Asking twice for the same name returns the same metric."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Summary] = {}
+        # name -> (function returning a JSON-serializable value, description)
+        self._collectors: dict[str, tuple[Callable[[], Any], str]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, description: str):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(description)
+            elif not isinstance(metric, cls):
+                raise TypeError(
+                    f"Metric {name} is a {type(metric).__name__}, not a {cls.__name__}"
+                )
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get(Gauge, name, description)
+
+    def summary(self, name: str, description: str = "") -> Summary:
+        return self._get(Summary, name, description)
+
+    def register_collector(
+        self, name: str, collect: Callable[[], Any], description: str = ""
+    ) -> None:
+        """
+        Register a function that is called for its value on every snapshot,
+        for structured metrics such as per-session statistics.
+        """
+        with self._lock:
+            self._collectors[name] = (collect, description)
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return the current values of all metrics"""
+        with self._lock:
+            items = sorted(self._metrics.items())
+            collectors = sorted(self._collectors.items())
+        snapshot = {
+            name: {**metric.snapshot(), "description": metric.description}
+            for name, metric in items
+        }
+        for name, (collect, description) in collectors:
+            snapshot[name] = {
+                "type": "collector",
+                "value": collect(),
+                "description": description,
+            }
+        return snapshot
+
+
+metrics = MetricsRegistry()
@@ -1,10 +1,11 @@
 import re
-from typing import List, Tuple, AsyncIterator, Optional
+from functools import lru_cache
+from typing import List, Tuple, AsyncIterator, Optional, Protocol
 import pysbd
 from loguru import logger
-from langdetect import detect
 from enum import Enum
 from dataclasses import dataclass
+from .language_id import LanguageCache, identify_language
 
 # Constants for additional checks
 COMMAS = [
@@ -72,18 +73,37 @@ SUPPORTED_LANGUAGES = {
     "zh",
 }
 
+# Languages are detected from at least this many characters before the
+# decision is kept for the rest of a response
+LANGUAGE_DETECTION_MIN_CHARS = 20
 
-def detect_language(text: str) -> str:
+# Every punctuation mark is a single character or a repetition of one
+_COMMA_PATTERN = re.compile("[" + "".join(map(re.escape, set(COMMAS))) + "]")
+_END_PUNCTUATION_PATTERN = re.compile(
+    "[" + "".join(map(re.escape, set("".join(END_PUNCTUATIONS)))) + "]"
+)
+_PUNCTUATION_CHARS = "".join(map(re.escape, set("".join(COMMAS + END_PUNCTUATIONS))))
+# Matches a complete sentence at the start of the text
+_SENTENCE_PATTERN = re.compile(
+    r"(.*?(?:[" + "|".join(re.escape(p) for p in END_PUNCTUATIONS) + r"]))"
+)
+
+# Marks a language that has not been decided yet
+_UNDECIDED = object()
+
+
+def detect_language(text: str, cache: Optional[LanguageCache] = None) -> str:
     """
     Detect text language and check if it's supported by pysbd.
     Returns None for unsupported languages.
+
+    Args:
+        text: Text to detect the language of
+        cache: The session's language cache, used for text that is too short
+            to identify
     """
-    try:
-        detected = detect(text)
-        return detected if detected in SUPPORTED_LANGUAGES else None
-    except Exception as e:
-        logger.debug(f"Language detection failed, language not supported by pysdb: {e}")
-        return None
+    detected = cache.identify(text) if cache else identify_language(text)
+    return detected if detected in SUPPORTED_LANGUAGES else None
 
 
 def is_complete_sentence(text: str) -> bool:
@@ -116,7 +136,7 @@ def contains_comma(text: str) -> bool:
     Returns:
         bool: Whether the text contains a comma
     """
-    return any(comma in text for comma in COMMAS)
+    return _COMMA_PATTERN.search(text) is not None
 
 
 def comma_splitter(text: str) -> Tuple[str, str]:
@@ -151,10 +171,7 @@ def has_punctuation(text: str) -> bool:
     Returns:
         bool: Whether the text is a punctuation mark
     """
-    for punct in COMMAS + END_PUNCTUATIONS:
-        if punct in text:
-            return True
-    return False
+    return contains_comma(text) or contains_end_punctuation(text)
 
 
 def contains_end_punctuation(text: str) -> bool:
@@ -167,7 +184,7 @@ def contains_end_punctuation(text: str) -> bool:
     Returns:
         bool: Whether the text contains ending punctuation
     """
-    return any(punct in text for punct in END_PUNCTUATIONS)
+    return _END_PUNCTUATION_PATTERN.search(text) is not None
 
 
 def segment_text_by_regex(text: str) -> Tuple[List[str], str]:
@@ -187,12 +204,8 @@ def segment_text_by_regex(text: str) -> Tuple[List[str], str]:
     complete_sentences = []
     remaining_text = text.strip()
 
-    # Create pattern for matching sentences ending with any end punctuation
-    escaped_punctuations = [re.escape(p) for p in END_PUNCTUATIONS]
-    pattern = r"(.*?(?:[" + "|".join(escaped_punctuations) + r"]))"
-
     while remaining_text:
-        match = re.search(pattern, remaining_text)
+        match = _SENTENCE_PATTERN.search(remaining_text)
         if not match:
             break
 
@@ -210,6 +223,12 @@ def segment_text_by_regex(text: str) -> Tuple[List[str], str]:
     return complete_sentences, remaining_text
 
 
+@lru_cache(maxsize=None)
+def get_segmenter(lang: str) -> pysbd.Segmenter:
+    """Get the shared pysbd segmenter of a language"""
+    return pysbd.Segmenter(language=lang, clean=False)
+
+
 def segment_text_by_pysbd(text: str) -> Tuple[List[str], str]:
     """
     Segment text into complete sentences and remaining text.
@@ -223,15 +242,28 @@ def segment_text_by_pysbd(text: str) -> Tuple[List[str], str]:
     """
     if not text:
         return [], ""
+    return segment_text_by_language(text, detect_language(text))
 
-    try:
-        # Detect language
-        lang = detect_language(text)
 
+def segment_text_by_language(text: str, lang: Optional[str]) -> Tuple[List[str], str]:
+    """
+    Segment text in a known language into complete sentences and remaining text.
+    Uses pysbd for supported languages, regex if `lang` is None.
+
+    Args:
+        text: Text to segment into sentences
+        lang: Language of the text, as returned by `detect_language`
+
+    Returns:
+        Tuple[List[str], str]: (list of complete sentences, remaining incomplete text)
+    """
+    if not text:
+        return [], ""
+
+    try:
         if lang is not None:
             # Use pysbd for supported languages
-            segmenter = pysbd.Segmenter(language=lang, clean=False)
-            sentences = segmenter.segment(text)
+            sentences = get_segmenter(lang).segment(text)
 
             if not sentences:
                 return [], text
@@ -298,12 +330,69 @@ class SentenceWithTags:
     tags: List[TagInfo]  # List of tags from outermost to innermost
 
 
+class TTSQueueStatus(Protocol):
+    """How much speech of the current answer is queued, see TTSTaskManager"""
+
+    @property
+    def queued_sentences(self) -> int:
+        """Sentences being synthesized or waiting to be sent"""
+        ...
+
+    @property
+    def playback_seconds_remaining(self) -> float:
+        """Estimated seconds of sent audio the client has not played yet"""
+        ...
+
+
+@dataclass
+class AdaptiveChunking:
+    """
+    Sizes TTS chunks to the session's TTS queue.
+
+    When the queue is nearly drained, the client is about to fall silent,
+    so the divider does not wait for the end of a long sentence: it cuts
+    the buffer at the last comma or space once it has `min_chars`
+    characters. When the queue is deep, short sentences are merged, so
+    they are synthesized in one TTS call instead of several.
+    """
+
+    # Shortest chunk cut before the end of a sentence
+    min_chars: int = 16
+    # The queue is nearly drained when no sentence is queued and the client
+    # has less than this many seconds of audio left to play
+    drain_seconds: float = 1.0
+    # The queue is deep at this many queued sentences
+    deep_queue_sentences: int = 2
+    # Sentences shorter than this are merged while the queue is deep
+    merge_below_chars: int = 12
+    # Set for each conversation turn, see AgentInterface.set_tts_status
+    tts_status: Optional[TTSQueueStatus] = None
+
+    def is_draining(self) -> bool:
+        """Whether the client will soon have nothing left to play"""
+        status = self.tts_status
+        return (
+            status is not None
+            and status.queued_sentences == 0
+            and status.playback_seconds_remaining < self.drain_seconds
+        )
+
+    def is_deep(self) -> bool:
+        """Whether there is enough speech queued to merge short sentences"""
+        status = self.tts_status
+        return (
+            status is not None and status.queued_sentences >= self.deep_queue_sentences
+        )
+
+
 class SentenceDivider:
     def __init__(
         self,
         faster_first_response: bool = True,
         segment_method: str = "pysbd",
         valid_tags: List[str] = None,
+        language_cache: Optional[LanguageCache] = None,
+        adaptive_chunking: Optional[AdaptiveChunking] = None,
     ):
         """
         Initialize the SentenceDivider.
@@ -312,14 +401,43 @@ class SentenceDivider:
             faster_first_response: Whether to split first sentence at commas
             segment_method: Method for segmenting sentences
             valid_tags: List of valid tag names to detect
+            language_cache: The session's language cache
+            adaptive_chunking: Policy to size chunks to the TTS queue. If
+                None, chunks are whole sentences.
         """
         self.faster_first_response = faster_first_response
         self.segment_method = segment_method
         self.valid_tags = valid_tags or ["think"]
+        self.language_cache = language_cache
+        self.adaptive_chunking = adaptive_chunking
+        # Short sentence waiting to be merged with the next one
+        self._held: Optional[SentenceWithTags] = None
         self._is_first_sentence = True
         self._buffer = ""
         # Replace active_tags dict with a stack to handle nesting
         self._tag_stack = []
+        # Language of the response, decided once for pysbd
+        self._language = _UNDECIDED
+
+        tag_names = "|".join(re.escape(tag) for tag in self.valid_tags)
+        # </tag>, <tag> or <tag/>
+        self._tag_pattern = re.compile(f"<(?:/({tag_names})|({tag_names})(/)?)>")
+        # Anything that makes the buffer worth processing: the end of a tag
+        # or a punctuation mark. Each match is short, so only the new text
+        # (and the few characters before it) need to be searched.
+        self._trigger_pattern = re.compile(
+            "".join(f"{re.escape(tag)}/?>|" for tag in self.valid_tags)
+            + f"[{_PUNCTUATION_CHARS}]"
+        )
+        self._trigger_lookback = max(
+            (len(tag) + 1 for tag in self.valid_tags), default=0
+        )
+        # Length of the start of the buffer known not to contain a trigger
+        self._scanned = 0
+        # Length of the start of the buffer searched for places to cut at,
+        # and the end of the last comma and space found there (0 if none)
+        self._cut_scanned = 0
+        self._last_comma = self._last_space = 0
 
     def _get_current_tags(self) -> List[TagInfo]:
         """
@@ -350,45 +468,17 @@ class SentenceDivider:
         Returns:
             Tuple of (TagInfo if tag found else None, remaining text)
         """
-        # Find the first occurrence of any tag
-        first_tag = None
-        first_pos = len(text)
-        tag_type = None
-        matched_tag = None
-
-        # Check for self-closing tags
-        for tag in self.valid_tags:
-            pattern = f"<{tag}/>"
-            match = re.search(pattern, text)
-            if match and match.start() < first_pos:
-                first_pos = match.start()
-                first_tag = match
-                tag_type = TagState.SELF_CLOSING
-                matched_tag = tag
-
-        # Check for opening tags
-        for tag in self.valid_tags:
-            pattern = f"<{tag}>"
-            match = re.search(pattern, text)
-            if match and match.start() < first_pos:
-                first_pos = match.start()
-                first_tag = match
-                tag_type = TagState.START
-                matched_tag = tag
-
-        # Check for closing tags
-        for tag in self.valid_tags:
-            pattern = f"</{tag}>"
-            match = re.search(pattern, text)
-            if match and match.start() < first_pos:
-                first_pos = match.start()
-                first_tag = match
-                tag_type = TagState.END
-                matched_tag = tag
-
+        first_tag = self._tag_pattern.search(text)
         if not first_tag:
             return None, text
 
+        if first_tag.group(1):
+            matched_tag, tag_type = first_tag.group(1), TagState.END
+        elif first_tag.group(3):
+            matched_tag, tag_type = first_tag.group(2), TagState.SELF_CLOSING
+        else:
+            matched_tag, tag_type = first_tag.group(2), TagState.START
+
         # Handle the found tag
         if tag_type == TagState.START:
             # Push new tag onto stack
@@ -414,13 +504,8 @@ class SentenceDivider:
 
         while self._buffer.strip():
             # Find the next tag position
-            next_tag_pos = len(self._buffer)
-            for tag in self.valid_tags:
-                patterns = [f"<{tag}>", f"</{tag}>", f"<{tag}/>"]
-                for pattern in patterns:
-                    pos = self._buffer.find(pattern)
-                    if pos != -1 and pos < next_tag_pos:
-                        next_tag_pos = pos
+            next_tag = self._tag_pattern.search(self._buffer)
+            next_tag_pos = next_tag.start() if next_tag else len(self._buffer)
 
             if next_tag_pos == 0:
                 # Tag is at the start of buffer
@@ -543,41 +628,142 @@ class SentenceDivider:
 
             # Process buffer after punctuation, when buffer gets too long,
             # or when we see a tag
-            should_process = any(
-                re.search(f"{tag}(?:/)?>", self._buffer) for tag in self.valid_tags
-            ) or has_punctuation(self._buffer)
+            should_process = (
+                self._trigger_pattern.search(
+                    self._buffer, max(0, self._scanned - self._trigger_lookback)
+                )
+                is not None
+            )
 
             if should_process:
+                buffered = len(self._buffer)
                 sentences = await self._process_buffer()
-                for sentence in sentences:
+                # The buffer has changed, search it again from the start
+                self._scanned = 0
+                if len(self._buffer) != buffered:
+                    # Text is only ever removed from the buffer
+                    self._cut_scanned = self._last_comma = self._last_space = 0
+                for sentence in self._merge_short(sentences):
                     yield sentence
+            else:
+                self._scanned = len(self._buffer)
+
+            if self.adaptive_chunking:
+                early_chunk = self._cut_early()
+                if early_chunk:
+                    for sentence in self._merge_short([early_chunk]):
+                        yield sentence
 
         # Process remaining text at end of stream
+        sentences = []
         if self._buffer.strip():
             tag_info, remaining = self._extract_tag(self._buffer)
             if tag_info:
-                yield SentenceWithTags(
-                    text=self._buffer[: len(self._buffer) - len(remaining)].strip(),
-                    tags=[tag_info],
+                sentences.append(
+                    SentenceWithTags(
+                        text=self._buffer[: len(self._buffer) - len(remaining)].strip(),
+                        tags=[tag_info],
+                    )
                 )
                 self._buffer = remaining
 
             if self._buffer.strip():
-                sentences, remaining = self._segment_text(self._buffer)
+                segments, remaining = self._segment_text(self._buffer)
                 current_tags = self._get_current_tags()
 
-                for sentence in sentences:
+                for sentence in segments:
                     if sentence.strip():
-                        yield SentenceWithTags(
-                            text=sentence.strip(),
-                            tags=current_tags or [TagInfo("", TagState.NONE)],
+                        sentences.append(
+                            SentenceWithTags(
+                                text=sentence.strip(),
+                                tags=current_tags or [TagInfo("", TagState.NONE)],
+                            )
                         )
             if remaining.strip():
-                yield SentenceWithTags(
-                    text=remaining.strip(),
-                    tags=current_tags or [TagInfo("", TagState.NONE)],
+                sentences.append(
+                    SentenceWithTags(
+                        text=remaining.strip(),
+                        tags=current_tags or [TagInfo("", TagState.NONE)],
+                    )
                 )
 
+        for sentence in self._merge_short(sentences):
+            yield sentence
+        if self._held:
+            yield self._held
+            self._held = None
+
+    def _cut_early(self) -> Optional[SentenceWithTags]:
+        """
+        Cut a chunk from the buffer before the sentence ends, if the TTS
+        queue is nearly drained. Cuts at the last comma, or else at the last
+        space, after the first `min_chars` characters.
+
+        Returns:
+            SentenceWithTags if a chunk was cut, None otherwise
+        """
+        policy = self.adaptive_chunking
+        if (
+            self._tag_stack  # no speech inside tags
+            or "<" in self._buffer  # may be the start of a tag
+            or len(self._buffer.strip()) < policy.min_chars
+            or not policy.is_draining()
+        ):
+            return None
+
+        # Only the text added since the last call is searched
+        start = max(self._cut_scanned, policy.min_chars)
+        for match in _COMMA_PATTERN.finditer(self._buffer, start):
+            self._last_comma = match.end()
+        self._last_space = self._buffer.rfind(" ", start) + 1 or self._last_space
+        self._cut_scanned = len(self._buffer)
+        cut = self._last_comma or self._last_space
+        if not cut or not self._buffer[:cut].strip():
+            return None
+
+        chunk = self._buffer[:cut].strip()
+        remaining = self._buffer[cut:].lstrip()
+        # The rest has no trigger before the scanned position, and no comma:
+        # the cut is after the last one
+        self._scanned = max(0, self._scanned - (len(self._buffer) - len(remaining)))
+        self._cut_scanned = len(remaining)
+        self._last_comma = 0
+        self._last_space = remaining.rfind(" ", policy.min_chars) + 1
+        self._buffer = remaining
+        self._is_first_sentence = False
+        return SentenceWithTags(text=chunk, tags=[TagInfo("", TagState.NONE)])
+
+    def _merge_short(self, sentences: List[SentenceWithTags]) -> List[SentenceWithTags]:
+        """
+        Merge short sentences into the next one while the TTS queue is deep.
+        The last short sentence is held back until the next one arrives.
+        """
+        if not self.adaptive_chunking:
+            return sentences
+
+        result = []
+        for sentence in sentences:
+            if self._held:
+                if self._held.tags == sentence.tags and _mergeable(sentence):
+                    # No space between CJK sentences
+                    separator = " " if self._held.text[-1].isascii() else ""
+                    sentence = SentenceWithTags(
+                        text=self._held.text + separator + sentence.text,
+                        tags=sentence.tags,
+                    )
+                else:
+                    result.append(self._held)
+                self._held = None
+            if (
+                _mergeable(sentence)
+                and len(sentence.text) < self.adaptive_chunking.merge_below_chars
+                and self.adaptive_chunking.is_deep()
+            ):
+                self._held = sentence
+            else:
+                result.append(sentence)
+        return result
+
     @property
     def complete_response(self) -> str:
         """Get the complete response accumulated so far"""
@@ -587,10 +773,34 @@ class SentenceDivider:
         """Segment text using the configured method"""
         if self.segment_method == "regex":
             return segment_text_by_regex(text)
-        return segment_text_by_pysbd(text)
+        return segment_text_by_language(text, self._detect_language(text))
+
+    def _detect_language(self, text: str) -> Optional[str]:
+        """
+        Detect the language of the response for pysbd.
+        It is decided once there is enough text, then kept for the rest of
+        the response.
+        """
+        if self._language is not _UNDECIDED:
+            return self._language
+        language = detect_language(text, self.language_cache)
+        if len(text.strip()) >= LANGUAGE_DETECTION_MIN_CHARS:
+            self._language = language
+        return language
 
     def reset(self):
         """Reset the divider state for a new conversation"""
         self._is_first_sentence = True
         self._buffer = ""
         self._tag_stack = []
+        self._language = _UNDECIDED
+        self._scanned = 0
+        self._cut_scanned = self._last_comma = self._last_space = 0
+        self._held = None
+
+
+def _mergeable(sentence: SentenceWithTags) -> bool:
+    """Whether a sentence is text (not a tag) outside of any tag"""
+    return bool(sentence.text) and all(
+        tag.state == TagState.NONE for tag in sentence.tags
+    )
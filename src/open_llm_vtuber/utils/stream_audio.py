@@ -1,27 +1,19 @@
 import base64
-from pydub import AudioSegment
-from pydub.utils import make_chunks
+import io
+import json
+import wave
 from ..agent.output_types import Actions
 from ..agent.output_types import DisplayText
+from .audio_codec import PASSTHROUGH_FORMATS, decode_audio, read_audio_file
+from .audio_frame import encode_audio_message_frame
+from .volume_envelope import compute_volumes, pcm_to_samples, slice_size
 
-
-def _get_volume_by_chunks(audio: AudioSegment, chunk_length_ms: int) -> list:
-    """
-    Calculate the normalized volume (RMS) for each chunk of the audio.
-
-    Parameters:
-        audio (AudioSegment): The audio segment to process.
-        chunk_length_ms (int): The length of each audio chunk in milliseconds.
-
-    Returns:
-        list: Normalized volumes for each chunk.
-    """
-    chunks = make_chunks(audio, chunk_length_ms)
-    volumes = [chunk.rms for chunk in chunks]
-    max_volume = max(volumes)
-    if max_volume == 0:
-        raise ValueError("Audio is empty or all zero.")
-    return [volume / max_volume for volume in volumes]
+# Payload keys used to serialize the audio, not sent to clients as-is
+_ENCODING_KEY = "_encoding"
+_SAMPLE_RATE_KEY = "_sample_rate"
+# (pcm, sample_rate) of mp3/ogg audio, for clients that only play WAV
+_DECODED_KEY = "_decoded"
+_PRIVATE_KEYS = (_ENCODING_KEY, _SAMPLE_RATE_KEY, _DECODED_KEY)
 
 
 def prepare_audio_payload(
@@ -35,6 +27,11 @@ def prepare_audio_payload(
     Prepares the audio payload for sending to a broadcast endpoint.
     If audio_path is None, returns a payload with audio=None for silent display.
 
+    The file is decoded in-process for the lip sync volumes. WAV, mp3 and
+    ogg files are kept as they are, other formats as PCM;
+    `audio_payload_to_json` or `audio_payload_to_frame` serializes the
+    payload for the transport the client uses.
+
     Parameters:
         audio_path (str | None): The path to the audio file to be processed, or None for silent display
         chunk_length_ms (int): The length of each audio chunk in milliseconds
@@ -60,27 +57,160 @@ def prepare_audio_payload(
         }
 
     try:
-        audio = AudioSegment.from_file(audio_path)
-        audio_bytes = audio.export(format="wav").read()
-    except Exception as e:
-        raise ValueError(
-            f"Error loading or converting generated audio file to wav file '{audio_path}': {e}"
-        )
-    audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
-    volumes = _get_volume_by_chunks(audio, chunk_length_ms)
+        audio_bytes, audio_format = read_audio_file(audio_path)
+        samples, sample_rate = decode_audio(audio_bytes, audio_format)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Error loading generated audio file '{audio_path}': {e}")
+    volumes = compute_volumes(samples, slice_size(sample_rate, chunk_length_ms))
 
     payload = {
         "type": "audio",
-        "audio": audio_base64,
+        "audio": audio_bytes,
         "volumes": volumes,
         "slice_length": chunk_length_ms,
         "display_text": display_text,
         "actions": actions.to_dict() if actions else None,
         "forwarded": forwarded,
+        _ENCODING_KEY: audio_format,
+        _SAMPLE_RATE_KEY: 0,
     }
+    if audio_format not in PASSTHROUGH_FORMATS:
+        # e.g. aiff, which clients cannot play
+        payload["audio"] = samples.tobytes()
+        payload[_ENCODING_KEY] = "pcm_s16le"
+        payload[_SAMPLE_RATE_KEY] = sample_rate
+    elif audio_format != "wav":
+        payload[_DECODED_KEY] = (samples.tobytes(), sample_rate)
 
     return payload
 
 
+def prepare_pcm_audio_payload(
+    pcm: bytes,
+    sample_rate: int,
+    chunk_length_ms: int = 20,
+    display_text: DisplayText = None,
+    actions: Actions = None,
+    forwarded: bool = False,
+    volumes: list[float] | None = None,
+) -> dict[str, any]:
+    """
+    Prepares an audio payload from in-memory PCM, e.g. a chunk of streamed TTS.
+    JSON clients receive it as WAV, binary clients as raw PCM.
+
+    Parameters:
+        pcm (bytes): 16-bit little-endian mono PCM
+        sample_rate (int): Sample rate of the PCM
+        chunk_length_ms (int): The length of each audio chunk in milliseconds
+        display_text (DisplayText, optional): Text to be displayed with the audio
+        actions (Actions, optional): Actions associated with the audio
+        volumes (list, optional): Precomputed volumes, e.g. from a
+            `VolumeEnvelope` over the whole stream. Computed from `pcm` if None.
+
+    Returns:
+        dict: The audio payload to be sent
+    """
+    if isinstance(display_text, DisplayText):
+        display_text = display_text.to_dict()
+
+    if volumes is None:
+        # A streamed chunk can be pure silence, which gives all-zero volumes
+        volumes = compute_volumes(
+            pcm_to_samples(pcm), slice_size(sample_rate, chunk_length_ms)
+        )
+
+    return {
+        "type": "audio",
+        "audio": pcm,
+        "volumes": volumes,
+        "slice_length": chunk_length_ms,
+        "display_text": display_text,
+        "actions": actions.to_dict() if actions else None,
+        "forwarded": forwarded,
+        _ENCODING_KEY: "pcm_s16le",
+        _SAMPLE_RATE_KEY: sample_rate,
+    }
+
+
+def _pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return wav_buffer.getvalue()
+
+
+def audio_payload_to_json(payload: dict[str, any]) -> str:
+    """
+    Serialize an audio payload as a JSON text message, with the audio as
+    base64-encoded WAV. This is the format every client understands.
+
+    Parameters:
+        payload (dict): A payload from `prepare_audio_payload` or `prepare_pcm_audio_payload`
+
+    Returns:
+        str: The JSON message
+    """
+    message = {k: v for k, v in payload.items() if k not in _PRIVATE_KEYS}
+    audio = payload.get("audio")
+    if audio is not None:
+        if payload.get(_ENCODING_KEY) == "pcm_s16le":
+            audio = _pcm_to_wav(audio, payload[_SAMPLE_RATE_KEY])
+        elif _DECODED_KEY in payload:
+            audio = _pcm_to_wav(*payload[_DECODED_KEY])
+        message["audio"] = base64.b64encode(audio).decode("utf-8")
+    return json.dumps(message)
+
+
+def audio_payload_to_frame(payload: dict[str, any], sequence: int = 0) -> bytes:
+    """
+    Serialize an audio payload as a binary frame (see `utils.audio_frame`),
+    for clients that negotiated the binary audio transport.
+
+    Parameters:
+        payload (dict): A payload from `prepare_audio_payload` or `prepare_pcm_audio_payload`
+        sequence (int): Sequence number of the frame
+
+    Returns:
+        bytes: The binary frame
+    """
+    metadata = {
+        k: v
+        for k, v in payload.items()
+        if k not in _PRIVATE_KEYS and k not in ("type", "audio")
+    }
+    return encode_audio_message_frame(
+        metadata=metadata,
+        audio=payload.get("audio") or b"",
+        encoding=payload.get(_ENCODING_KEY, "wav"),
+        sample_rate=payload.get(_SAMPLE_RATE_KEY, 0),
+        sequence=sequence,
+    )
+
+
+def audio_message_to_frame(message: dict[str, any], sequence: int = 0) -> bytes:
+    """
+    Convert an `audio` message received as JSON (see `audio_payload_to_json`)
+    to a binary frame, e.g. in a proxy whose server connection uses JSON.
+
+    Parameters:
+        message (dict): The parsed JSON message
+        sequence (int): Sequence number of the frame
+
+    Returns:
+        bytes: The binary frame
+    """
+    metadata = {k: v for k, v in message.items() if k not in ("type", "audio")}
+    audio = message.get("audio")
+    return encode_audio_message_frame(
+        metadata=metadata,
+        audio=base64.b64decode(audio) if audio else b"",
+        encoding="wav",
+        sequence=sequence,
+    )
+
+
 # Example usage:
 # payload, duration = prepare_audio_payload("path/to/audio.mp3", display_text="Hello", expression_list=[0,1,2])
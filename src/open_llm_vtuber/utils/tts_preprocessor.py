@@ -66,7 +66,7 @@ def tts_filter(
             logger.warning(f"Error removing special characters: {e}")
             logger.warning(f"Text: {text}")
             logger.warning("Skipping...")
-    if translator:
+    if translator and translator.needs_translation(text):
         try:
             logger.info("Translating...")
             text = translator.translate(text)
@@ -0,0 +1,124 @@
+"""
+Volume envelopes for lip sync.
+
+The frontend opens the Live2D model's mouth according to `volumes`: the RMS
+of each `slice_length` ms slice of the audio, normalized to the loudest
+slice. Volumes are quantized to 256 levels, which is far finer than the
+mouth animation can show, and sent with three decimals to keep messages
+small.
+"""
+
+import numpy as np
+
+VOLUME_LEVELS = 255
+
+_SAMPLE_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def slice_size(sample_rate: int, chunk_length_ms: int) -> int:
+    """Number of samples per volume slice"""
+    return max(1, round(sample_rate * chunk_length_ms / 1000))
+
+
+def pcm_to_samples(pcm: bytes, sample_width: int = 2) -> np.ndarray:
+    """View little-endian signed PCM bytes as an integer sample array"""
+    dtype = _SAMPLE_DTYPES[sample_width]
+    usable = len(pcm) - len(pcm) % sample_width
+    return np.frombuffer(pcm, dtype=dtype, count=usable // sample_width)
+
+
+def rms_envelope(samples: np.ndarray, slice_samples: int) -> np.ndarray:
+    """
+    Compute the RMS of each slice of `slice_samples` samples.
+
+    Interleaved multi-channel audio is treated like pydub does: the RMS is
+    taken over all samples of the slice, so pass `slice_samples` as frames
+    per slice times the number of channels.
+
+    Args:
+        samples: 1-D array of samples
+        slice_samples: Number of samples per slice
+
+    Returns:
+        np.ndarray: float32 RMS per slice. A shorter last slice is included.
+    """
+    samples = np.asarray(samples).reshape(-1)
+    n_full = len(samples) // slice_samples
+    squares = np.square(samples, dtype=np.float32)
+
+    rms = np.empty(n_full + (len(samples) % slice_samples > 0), dtype=np.float32)
+    rms[:n_full] = (
+        squares[: n_full * slice_samples].reshape(n_full, slice_samples).mean(axis=1)
+    )
+    if len(rms) > n_full:
+        rms[n_full] = squares[n_full * slice_samples :].mean()
+    return np.sqrt(rms, out=rms)
+
+
+def quantize_volumes(rms: np.ndarray, peak: float | None = None) -> np.ndarray:
+    """
+    Normalize RMS values to `peak` (default: their maximum) and quantize them.
+
+    Returns:
+        np.ndarray: uint8 levels from 0 to VOLUME_LEVELS. All zero if the
+            peak is zero (silence).
+    """
+    if peak is None:
+        peak = float(rms.max()) if len(rms) else 0.0
+    if peak <= 0:
+        return np.zeros(len(rms), dtype=np.uint8)
+    levels = np.minimum(rms * (VOLUME_LEVELS / peak), VOLUME_LEVELS)
+    return np.rint(levels).astype(np.uint8)
+
+
+def volumes_to_list(levels: np.ndarray) -> list[float]:
+    """Convert quantized levels to the `volumes` list sent to clients"""
+    return np.round(levels / VOLUME_LEVELS, 3).tolist()
+
+
+def compute_volumes(samples: np.ndarray, slice_samples: int) -> list[float]:
+    """Normalized volume of each slice of a whole audio clip"""
+    return volumes_to_list(quantize_volumes(rms_envelope(samples, slice_samples)))
+
+
+class VolumeEnvelope:
+    """
+    Computes the RMS envelope of 16-bit mono PCM as it is streamed in.
+
+    Samples are buffered until a slice is complete, so the slices line up
+    with the whole stream no matter how it is chunked. The loudest slice so
+    far is tracked in `peak` for normalization.
+    """
+
+    def __init__(self, sample_rate: int, chunk_length_ms: int = 20):
+        self.sample_rate = sample_rate
+        self.slice_samples = slice_size(sample_rate, chunk_length_ms)
+        self.slice_bytes = self.slice_samples * 2
+        self.peak = 0.0
+        self._pending = bytearray()
+
+    def add(self, pcm: bytes) -> np.ndarray:
+        """
+        Add PCM and return the RMS of the slices it completed.
+        Chunks may end in the middle of a sample.
+        """
+        self._pending.extend(pcm)
+        usable = len(self._pending) - len(self._pending) % self.slice_bytes
+        if usable == 0:
+            return np.empty(0, dtype=np.float32)
+        rms = rms_envelope(
+            pcm_to_samples(bytes(self._pending[:usable])), self.slice_samples
+        )
+        del self._pending[:usable]
+        self.peak = max(self.peak, float(rms.max()))
+        return rms
+
+    def finish(self) -> np.ndarray:
+        """Return the RMS of the last, incomplete slice, if any"""
+        samples = pcm_to_samples(bytes(self._pending))
+        self._pending.clear()
+        if len(samples) == 0:
+            return np.empty(0, dtype=np.float32)
+        rms = rms_envelope(samples, self.slice_samples)
+        self.peak = max(self.peak, float(rms.max()))
+        return rms
@@ -1,9 +1,9 @@
 import asyncio
 from collections import deque
+from dataclasses import dataclass, field
 from enum import Enum
 
 import numpy as np
-import torch
 from loguru import logger
 from pydantic import BaseModel
 from silero_vad import load_silero_vad
@@ -21,6 +21,226 @@ class SileroVADConfig(BaseModel):
     smoothing_window: int = 5
 
 
+class SileroVADModel:
+    """
+    The Silero VAD model, shared by all sessions of an engine.
+
+    The ONNX model takes the RNN state and the audio context of a stream as
+    inputs and returns the updated ones, so it holds no per-stream state here.
+    Windows from several streams can therefore run in a single batched call.
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        if sample_rate not in (8000, 16000):
+            raise ValueError("Silero VAD only supports 8000 and 16000 Hz")
+
+        logger.info("Loading Silero-VAD model...")
+        self.session = load_silero_vad(onnx=True).session
+        self.sample_rate = sample_rate
+        # 512 / 16000 = 0.032s
+        self.window_size = 512 if sample_rate == 16000 else 256
+        self.context_size = 64 if sample_rate == 16000 else 32
+        self._sr = np.array(sample_rate, dtype=np.int64)
+
+    def initial_state(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the RNN state and audio context of a new stream"""
+        return (
+            np.zeros((2, 128), dtype=np.float32),
+            np.zeros(self.context_size, dtype=np.float32),
+        )
+
+    def infer(
+        self, windows: np.ndarray, states: np.ndarray, contexts: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Run the model on one window of each stream.
+
+        Args:
+            windows: Audio windows, shape (batch, window_size)
+            states: RNN states, shape (2, batch, 128)
+            contexts: Audio contexts, shape (batch, context_size)
+
+        Returns:
+            tuple: Speech probabilities (batch,), the new RNN states and the
+                new audio contexts
+        """
+        x = np.concatenate([contexts, windows], axis=1)
+        out, new_states = self.session.run(
+            None, {"input": x, "state": states, "sr": self._sr}
+        )
+        return out[:, 0], new_states, x[:, -self.context_size :]
+
+
+@dataclass
+class _VADJob:
+    """The windows of one `async_detect_speech` call waiting for inference"""
+
+    windows: np.ndarray
+    future: asyncio.Future
+    index: int = 0
+    results: list[bytes] = field(default_factory=list)
+
+
+class VADBatchScheduler:
+    """
+    Runs the pending windows of all sessions through the shared model in
+    batches.
+
+    Consecutive windows of a session depend on each other through the RNN
+    state, so every tick takes the oldest pending window of each session that
+    has work and runs them together in one inference call. Sessions served in
+    a tick move to the back of the queue, so no session is starved when there
+    are more than `max_batch_size` of them.
+    """
+
+    def __init__(self, model: SileroVADModel, max_batch_size: int = 64):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self._pending: dict["VADSession", deque[_VADJob]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def submit(self, session: "VADSession", windows: np.ndarray) -> list[bytes]:
+        """
+        Queue the windows of a session and wait until they are processed.
+
+        Args:
+            session: The session the windows belong to
+            windows: Audio windows, shape (n, window_size)
+
+        Returns:
+            list[bytes]: The outputs of the session's state machine
+        """
+        if len(windows) == 0:
+            return []
+
+        job = _VADJob(
+            windows=windows, future=asyncio.get_running_loop().create_future()
+        )
+        self._pending.setdefault(session, deque()).append(job)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await job.future
+
+    async def _run(self) -> None:
+        while self._pending:
+            batch = [
+                (session, jobs[0])
+                for session, jobs in list(self._pending.items())[: self.max_batch_size]
+            ]
+            windows = np.stack([job.windows[job.index] for _, job in batch])
+            states = np.stack([session.rnn_state for session, _ in batch], axis=1)
+            contexts = np.stack([session.context for session, _ in batch])
+
+            try:
+                probs, states, contexts = await asyncio.to_thread(
+                    self.model.infer, windows, states, contexts
+                )
+            except Exception as e:
+                logger.error(f"VAD inference failed for {len(batch)} sessions: {e}")
+                for session, job in batch:
+                    self._finish(session, job, error=e)
+                continue
+
+            for i, (session, job) in enumerate(batch):
+                session.rnn_state = states[:, i]
+                session.context = contexts[i]
+                job.results.extend(session.process_window(float(probs[i]), windows[i]))
+                job.index += 1
+                if job.index == len(job.windows):
+                    self._finish(session, job)
+                elif session in self._pending:
+                    # Move to the back so the other sessions get served first
+                    self._pending[session] = self._pending.pop(session)
+
+    def _finish(
+        self, session: "VADSession", job: _VADJob, error: Exception | None = None
+    ) -> None:
+        jobs = self._pending[session]
+        jobs.popleft()
+        if not jobs:
+            del self._pending[session]
+        else:
+            self._pending[session] = self._pending.pop(session)
+
+        if job.future.done():  # The caller was cancelled
+            return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(job.results)
+
+
+class VADSession(VADInterface):
+    """
+    The VAD state of one client: the speech state machine, the RNN state and
+    the samples left over from the last chunk. The model is shared with the
+    engine and with all other sessions.
+    """
+
+    def __init__(self, engine: "VADEngine"):
+        self.engine = engine
+        self.state = StateMachine(engine.config)
+        self.rnn_state, self.context = engine.model.initial_state()
+        self._remainder = np.empty(0, dtype=np.float32)
+        # Speech audio of the current utterance not yet taken by the caller
+        self._speech_audio = bytearray()
+
+    def _split_windows(self, audio_data: list[float] | np.ndarray) -> np.ndarray:
+        """
+        Cut the audio into model windows. Samples that do not fill a whole
+        window are kept and prepended to the next chunk.
+        """
+        audio_np = np.asarray(audio_data, dtype=np.float32).reshape(-1)
+        if len(self._remainder):
+            audio_np = np.concatenate([self._remainder, audio_np])
+        window_size = self.engine.model.window_size
+        usable = len(audio_np) - len(audio_np) % window_size
+        self._remainder = audio_np[usable:].copy()
+        return audio_np[:usable].reshape(-1, window_size)
+
+    def process_window(self, speech_prob: float, window: np.ndarray) -> list[bytes]:
+        """Feed the speech probability of a window to the state machine"""
+        if not speech_prob:
+            return []
+
+        was_idle = self.state.state == State.IDLE
+        # detected a sequence of voice bytes
+        results = [
+            bytes(chunk) for _, _, chunk in self.state.get_result(speech_prob, window)
+        ]
+
+        if was_idle:
+            if self.state.state != State.IDLE:
+                # Speech started, the pre-buffer ends with this window
+                self._speech_audio = bytearray(b"".join(self.state.pre_buffer))
+        else:
+            self._speech_audio.extend((window * 32767).astype(np.int16).tobytes())
+        return results
+
+    def take_speech_audio(self) -> bytes:
+        speech_audio = bytes(self._speech_audio)
+        self._speech_audio.clear()
+        return speech_audio
+
+    def detect_speech(self, audio_data: list[float] | np.ndarray):
+        for window in self._split_windows(audio_data):
+            probs, states, contexts = self.engine.model.infer(
+                window[np.newaxis],
+                self.rnn_state[:, np.newaxis],
+                self.context[np.newaxis],
+            )
+            self.rnn_state, self.context = states[:, 0], contexts[0]
+            yield from self.process_window(float(probs[0]), window)
+
+    async def async_detect_speech(
+        self, audio_data: list[float] | np.ndarray
+    ) -> list[bytes]:
+        return await self.engine.scheduler.submit(self, self._split_windows(audio_data))
+
+    def new_session(self) -> "VADSession":
+        return self.engine.new_session()
+
+
 class VADEngine(VADInterface):
     def __init__(
         self,
@@ -41,38 +261,25 @@ class VADEngine(VADInterface):
             required_misses=required_misses,
             smoothing_window=smoothing_window,
         )
-        self.model = self.load_vad_model()
-        self.state = StateMachine(self.config)
-        self.window_size_samples = 512 if self.config.target_sr == 16000 else 256
-        # 512 / 16000 = 0.032s
-
-    def load_vad_model(self):
-        logger.info("Loading Silero-VAD model...")
-        return load_silero_vad()
-
-    def detect_speech(self, audio_data: list[float]):
-        audio_np = np.array(audio_data, dtype=np.float32)
-        for i in range(0, len(audio_np), self.window_size_samples):
-            chunk_np = audio_np[i : i + self.window_size_samples]
-            if len(chunk_np) < self.window_size_samples:
-                break
-            chunk = torch.Tensor(chunk_np)
-
-            with torch.no_grad():
-                speech_prob = self.model(chunk, self.config.target_sr).item()
+        self.model = SileroVADModel(self.config.target_sr)
+        self.window_size_samples = self.model.window_size
+        self.scheduler = VADBatchScheduler(self.model)
+        # Used when the engine itself is called instead of a session
+        self._default_session = VADSession(self)
 
-            if speech_prob:
-                # print(speech_prob)
-                iter = self.state.get_result(speech_prob, chunk_np)
+    def new_session(self) -> VADSession:
+        return VADSession(self)
 
-                for probs, dbs, chunk in iter:  # detected a sequence of voice bytes
-                    # rounded_probs = [round(x, 2) for x in probs]
-                    # rounded_dbs = [round(y, 2) for y in dbs]
+    def detect_speech(self, audio_data: list[float] | np.ndarray):
+        yield from self._default_session.detect_speech(audio_data)
 
-                    audio_chunk = bytes(chunk)
-                    yield audio_chunk
+    def take_speech_audio(self) -> bytes:
+        return self._default_session.take_speech_audio()
 
-        del audio_np
+    async def async_detect_speech(
+        self, audio_data: list[float] | np.ndarray
+    ) -> list[bytes]:
+        return await self._default_session.async_detect_speech(audio_data)
 
 
 # Define state enumeration
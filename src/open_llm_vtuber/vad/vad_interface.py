@@ -10,3 +10,31 @@ class VADInterface(ABC):
         :return: Returns a sequence of audio bytes containing human voice if voice activity is detected
         """
         pass
+
+    async def async_detect_speech(self, audio_data) -> list[bytes]:
+        """
+        Asynchronously detect voice activity in the audio data.
+        By default, this runs `detect_speech` in the calling thread.
+        Engines that can batch requests from several clients override this.
+        :param audio_data: Input audio data
+        :return: A list of audio bytes, as yielded by `detect_speech`
+        """
+        return list(self.detect_speech(audio_data))
+
+    def take_speech_audio(self) -> bytes:
+        """
+        Return the speech audio detected since the last call, while the
+        user is speaking. Used to feed streaming ASR before the end of speech.
+        Engines that cannot report speech as it happens return b"".
+        :return: 16-bit PCM bytes
+        """
+        return b""
+
+    def new_session(self) -> "VADInterface":
+        """
+        Create a VAD session for one client.
+        A session keeps its own detection state and shares the model with
+        this engine. Engines without per-client state return themselves.
+        :return: The VAD to use for the client
+        """
+        return self
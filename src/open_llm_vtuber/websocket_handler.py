@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Callable, TypedDict
+from typing import Any, Dict, List, Optional, Callable, TypedDict
 from fastapi import WebSocket, WebSocketDisconnect
 import asyncio
 import json
@@ -15,6 +15,10 @@ from .chat_group import (
 )
 from .message_handler import message_handler
 from .utils.stream_audio import prepare_audio_payload
+from .utils.audio_frame import decode_audio_frame
+from .utils.audio_buffer import AudioBuffer
+from .asr.asr_interface import ASRInterface
+from .tts.tts_scheduler import tts_scheduler
 from .chat_history_manager import (
     create_new_history,
     get_history,
@@ -68,7 +72,13 @@ class WebSocketHandler:
         self.chat_group_manager = ChatGroupManager()
         self.current_conversation_tasks: Dict[str, Optional[asyncio.Task]] = {}
         self.default_context_cache = default_context_cache
-        self.received_data_buffers: Dict[str, np.ndarray] = {}
+        self.received_data_buffers: Dict[str, AudioBuffer] = {}
+        # Next expected sequence number of binary audio frames per client
+        self.audio_frame_sequences: Dict[str, int] = {}
+        # Streaming ASR of the utterance each client is speaking, if any
+        self.asr_streams: Dict[str, Any] = {}
+        # Final streaming transcript waiting for the client's mic-audio-end
+        self.streaming_transcripts: Dict[str, str] = {}
 
         # Message handlers mapping
         self._message_handlers = self._init_message_handlers()
@@ -95,6 +105,7 @@ class WebSocketHandler:
             "audio-play-start": self._handle_audio_play_start,
             "request-init-config": self._handle_init_config_request,
             "heartbeat": self._handle_heartbeat,
+            "set-audio-transport": self._handle_set_audio_transport,
         }
 
     async def handle_new_connection(
@@ -139,7 +150,7 @@ class WebSocketHandler:
         """Store client data and initialize group status"""
         self.client_connections[client_uid] = websocket
         self.client_contexts[client_uid] = session_service_context
-        self.received_data_buffers[client_uid] = np.array([])
+        self.received_data_buffers[client_uid] = AudioBuffer()
 
         self.chat_group_manager.client_group_map[client_uid] = ""
         await self.send_group_update(websocket, client_uid)
@@ -187,8 +198,19 @@ class WebSocketHandler:
             live2d_model=self.default_context_cache.live2d_model,
             asr_engine=self.default_context_cache.asr_engine,
             tts_engine=self.default_context_cache.tts_engine,
-            vad_engine=self.default_context_cache.vad_engine,
-            agent_engine=self.default_context_cache.agent_engine,
+            # Each client gets its own VAD state on top of the shared model
+            vad_engine=(
+                self.default_context_cache.vad_engine.new_session()
+                if self.default_context_cache.vad_engine
+                else None
+            ),
+            # Each client gets its own conversation memory on top of the
+            # shared LLM client
+            agent_engine=(
+                self.default_context_cache.agent_engine.new_session()
+                if self.default_context_cache.agent_engine
+                else None
+            ),
             translate_engine=self.default_context_cache.translate_engine,
         )
         return session_service_context
@@ -206,7 +228,18 @@ class WebSocketHandler:
         try:
             while True:
                 try:
-                    data = await websocket.receive_json()
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", 1000))
+
+                    # Binary frames carry raw PCM audio, see utils/audio_frame.py
+                    if message.get("bytes") is not None:
+                        await self._handle_binary_frame(
+                            websocket, client_uid, message["bytes"]
+                        )
+                        continue
+
+                    data = json.loads(message["text"])
                     message_handler.handle_message(client_uid, data)
                     await self._route_message(websocket, client_uid, data)
                 except WebSocketDisconnect:
@@ -293,11 +326,15 @@ class WebSocketHandler:
         self.client_connections.pop(client_uid, None)
         self.client_contexts.pop(client_uid, None)
         self.received_data_buffers.pop(client_uid, None)
+        self.audio_frame_sequences.pop(client_uid, None)
+        self.asr_streams.pop(client_uid, None)
+        self.streaming_transcripts.pop(client_uid, None)
         if client_uid in self.current_conversation_tasks:
             task = self.current_conversation_tasks[client_uid]
             if task and not task.done():
                 task.cancel()
             self.current_conversation_tasks.pop(client_uid, None)
+        tts_scheduler.remove_session(client_uid)
 
         logger.info(f"Client {client_uid} disconnected")
         message_handler.cleanup_client(client_uid)
@@ -447,40 +484,134 @@ class WebSocketHandler:
         if history_uid == context.history_uid:
             context.history_uid = None
 
+    async def _handle_binary_frame(
+        self, websocket: WebSocket, client_uid: str, frame: bytes
+    ) -> None:
+        """Handle a binary audio frame (mic-audio-data or raw-audio-data)"""
+        audio_frame = decode_audio_frame(frame)
+        if audio_frame.sample_rate != ASRInterface.SAMPLE_RATE:
+            raise ValueError(
+                f"Unsupported sample rate {audio_frame.sample_rate}, "
+                f"expected {ASRInterface.SAMPLE_RATE}"
+            )
+
+        expected_sequence = self.audio_frame_sequences.get(client_uid)
+        if expected_sequence is not None and audio_frame.sequence != expected_sequence:
+            logger.warning(
+                f"Audio frame from {client_uid} out of sequence: "
+                f"expected {expected_sequence}, got {audio_frame.sequence}"
+            )
+        self.audio_frame_sequences[client_uid] = (audio_frame.sequence + 1) & 0xFFFFFFFF
+
+        if audio_frame.msg_type == "mic-audio-data":
+            self._append_audio_data(client_uid, audio_frame.audio)
+        else:
+            await self._process_vad_chunk(websocket, client_uid, audio_frame.audio)
+
+    def _append_audio_data(self, client_uid: str, audio: np.ndarray) -> None:
+        """Append float32 audio samples to the client's buffer"""
+        self.received_data_buffers[client_uid].append(audio)
+
     async def _handle_audio_data(
         self, websocket: WebSocket, client_uid: str, data: WSMessage
     ) -> None:
         """Handle incoming audio data"""
         audio_data = data.get("audio", [])
         if audio_data:
-            self.received_data_buffers[client_uid] = np.append(
-                self.received_data_buffers[client_uid],
-                np.array(audio_data, dtype=np.float32),
-            )
+            self._append_audio_data(client_uid, np.array(audio_data, dtype=np.float32))
 
     async def _handle_raw_audio_data(
         self, websocket: WebSocket, client_uid: str, data: WSMessage
     ) -> None:
         """Handle incoming raw audio data for VAD processing"""
-        context = self.client_contexts[client_uid]
         chunk = data.get("audio", [])
         if chunk:
-            for audio_bytes in context.vad_engine.detect_speech(chunk):
-                if audio_bytes == b"<|PAUSE|>":
-                    await websocket.send_text(
-                        json.dumps({"type": "control", "text": "interrupt"})
-                    )
-                elif audio_bytes == b"<|RESUME|>":
-                    pass
-                elif len(audio_bytes) > 1024:
-                    # Detected audio activity (voice)
-                    self.received_data_buffers[client_uid] = np.append(
-                        self.received_data_buffers[client_uid],
-                        np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32),
+            await self._process_vad_chunk(
+                websocket, client_uid, np.array(chunk, dtype=np.float32)
+            )
+
+    async def _process_vad_chunk(
+        self, websocket: WebSocket, client_uid: str, chunk: np.ndarray
+    ) -> None:
+        """Run VAD on a chunk of float32 audio and act on its results"""
+        context = self.client_contexts[client_uid]
+        if not len(chunk):
+            return
+
+        results = await context.vad_engine.async_detect_speech(chunk)
+        speech_audio = context.vad_engine.take_speech_audio()
+        # ASR stream of the utterance that just ended
+        ended_stream = None
+        for audio_bytes in results:
+            if audio_bytes == b"<|PAUSE|>":
+                await websocket.send_text(
+                    json.dumps({"type": "control", "text": "interrupt"})
+                )
+                if context.asr_engine.supports_streaming:
+                    self.asr_streams[client_uid] = context.asr_engine.start_stream()
+                    self.streaming_transcripts.pop(client_uid, None)
+            elif audio_bytes == b"<|RESUME|>":
+                # The speech audio follows, unless the VAD dropped the
+                # utterance as too short; then its stream is discarded
+                ended_stream = self.asr_streams.pop(client_uid, None)
+            elif len(audio_bytes) > 1024:
+                # Detected audio activity (voice)
+                self._append_audio_data(
+                    client_uid,
+                    np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32),
+                )
+                if ended_stream is not None:
+                    await self._finalize_asr_stream(
+                        websocket, client_uid, ended_stream, speech_audio
                     )
-                    await websocket.send_text(
-                        json.dumps({"type": "control", "text": "mic-audio-end"})
+                    ended_stream = None
+                    speech_audio = b""
+                await websocket.send_text(
+                    json.dumps({"type": "control", "text": "mic-audio-end"})
+                )
+
+        stream = self.asr_streams.get(client_uid)
+        if stream is not None and speech_audio:
+            partial_text = await context.asr_engine.async_accept_chunk(
+                stream, self._pcm_to_float(speech_audio)
+            )
+            if partial_text:
+                await websocket.send_text(
+                    json.dumps(
+                        {
+                            "type": "user-input-transcription",
+                            "text": partial_text,
+                            "partial": True,
+                        }
                     )
+                )
+
+    async def _finalize_asr_stream(
+        self, websocket: WebSocket, client_uid: str, stream: Any, speech_audio: bytes
+    ) -> None:
+        """Feed the last speech audio to a streaming ASR and keep the final text"""
+        asr_engine = self.client_contexts[client_uid].asr_engine
+        try:
+            if speech_audio:
+                await asr_engine.async_accept_chunk(
+                    stream, self._pcm_to_float(speech_audio)
+                )
+            text = await asr_engine.async_finalize(stream)
+        except Exception as e:
+            # The conversation falls back to transcribing the buffered audio
+            logger.error(f"Error finalizing streaming ASR for {client_uid}: {e}")
+            return
+
+        if text:
+            self.streaming_transcripts[client_uid] = text
+            await websocket.send_text(
+                json.dumps({"type": "user-input-transcription", "text": text})
+            )
+
+    @staticmethod
+    def _pcm_to_float(pcm: bytes) -> np.ndarray:
+        """Convert 16-bit PCM bytes to float32 samples in [-1, 1]"""
+        return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
 
     async def _handle_conversation_trigger(
         self, websocket: WebSocket, client_uid: str, data: WSMessage
@@ -496,6 +627,7 @@ class WebSocketHandler:
             client_connections=self.client_connections,
             chat_group_manager=self.chat_group_manager,
             received_data_buffers=self.received_data_buffers,
+            streaming_transcripts=self.streaming_transcripts,
             current_conversation_tasks=self.current_conversation_tasks,
             broadcast_to_group=self.broadcast_to_group,
         )
@@ -553,12 +685,15 @@ class WebSocketHandler:
     ) -> None:
         """Handle group info request"""
         await self.send_group_update(websocket, client_uid)
-    async def _handle_init_config_request(self, websocket: WebSocket, client_uid: str, data: WSMessage) -> None:
+
+    async def _handle_init_config_request(
+        self, websocket: WebSocket, client_uid: str, data: WSMessage
+    ) -> None:
         """Handle request for initialization configuration"""
         context = self.client_contexts.get(client_uid)
         if not context:
             context = self.default_context_cache
-        
+
         await websocket.send_text(
             json.dumps(
                 {
@@ -571,7 +706,30 @@ class WebSocketHandler:
             )
         )
 
-    async def _handle_heartbeat(self, websocket: WebSocket, client_uid: str, data: WSMessage) -> None:
+    async def _handle_set_audio_transport(
+        self, websocket: WebSocket, client_uid: str, data: WSMessage
+    ) -> None:
+        """
+        Handle negotiation of how `audio` messages are sent to the client:
+        "binary" frames (see utils.audio_frame) or "json" (the default)
+        """
+        transport = data.get("transport", "json")
+        if transport not in ("binary", "json"):
+            logger.warning(
+                f"Client {client_uid} asked for unknown transport {transport}"
+            )
+            transport = "json"
+
+        websocket.state.binary_audio = transport == "binary"
+        websocket.state.audio_sequence = 0
+        logger.info(f"Client {client_uid} uses {transport} audio transport")
+        await websocket.send_text(
+            json.dumps({"type": "audio-transport", "transport": transport})
+        )
+
+    async def _handle_heartbeat(
+        self, websocket: WebSocket, client_uid: str, data: WSMessage
+    ) -> None:
         """Handle heartbeat messages from clients"""
         try:
             await websocket.send_json({"type": "heartbeat-ack"})
@@ -0,0 +1,127 @@
+"""
+Interrupting a turn cancels its conversation task. Everything the turn
+started must stop with it: the LLM stream is closed and no further tokens
+are read from it, and no TTS synthesis starts or goes on.
+"""
+
+import asyncio
+import types
+
+from open_llm_vtuber.agent.agents.basic_memory_agent import BasicMemoryAgent
+from open_llm_vtuber.agent.input_types import BatchInput, TextData, TextSource
+from open_llm_vtuber.config_manager import TTSPreprocessorConfig
+from open_llm_vtuber.conversations.conversation_utils import (
+    cleanup_conversation,
+    process_agent_output,
+)
+from open_llm_vtuber.conversations.tts_manager import TTSTaskManager
+from open_llm_vtuber.tts.tts_interface import AudioChunk, TTSInterface
+
+
+class FakeLLM:
+    """Streams numbered sentences until it is closed"""
+
+    def __init__(self):
+        self.tokens = 0
+        self.closed = False
+
+    async def chat_completion(self, messages, system):
+        try:
+            for i in range(1000):
+                await asyncio.sleep(0.01)
+                self.tokens += 1
+                yield f"Sentence number {i}. "
+        finally:
+            self.closed = True
+
+    def set_history(self, conf_uid, history_uid):
+        pass
+
+
+class FakeLive2D:
+    emo_map = {}
+
+    def parse_emotions(self, text):
+        return [], text
+
+
+class FakeTTS(TTSInterface):
+    """Streams 100 ms of silence per chunk, five chunks per sentence"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chunks = 0
+        self.running = 0
+
+    async def async_stream_audio(self, text):
+        self.calls += 1
+        self.running += 1
+        try:
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+                self.chunks += 1
+                yield AudioChunk(pcm=bytes(3200), sample_rate=16000)
+        finally:
+            self.running -= 1
+
+    def generate_audio(self, text, file_name_no_ext=None):
+        raise NotImplementedError
+
+
+def _snapshot(llm, tts, sent):
+    return llm.tokens, tts.calls, tts.chunks, len(sent)
+
+
+def test_interrupt_stops_llm_and_tts():
+    async def main():
+        llm, tts, live2d = FakeLLM(), FakeTTS(), FakeLive2D()
+        agent = BasicMemoryAgent(
+            llm,
+            "system",
+            live2d,
+            TTSPreprocessorConfig(
+                remove_special_char=True,
+                translator_config={
+                    "translate_audio": False,
+                    "translate_provider": "deeplx",
+                },
+            ),
+            segment_method="regex",
+        )
+        tts_manager = TTSTaskManager("interrupt-test")
+        character = types.SimpleNamespace(character_name="Mao", avatar="")
+        sent = []
+
+        async def websocket_send(message):
+            sent.append(message)
+
+        async def conversation():
+            try:
+                async for output in agent.chat(
+                    BatchInput(texts=[TextData(source=TextSource.INPUT, content="hi")])
+                ):
+                    await process_agent_output(
+                        output, character, live2d, tts, websocket_send, tts_manager
+                    )
+            finally:
+                cleanup_conversation(tts_manager, "🧪")
+
+        task = asyncio.create_task(conversation())
+        await asyncio.sleep(0.3)
+        assert llm.tokens and tts.calls and sent, "the turn did not get going"
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # Let anything still scheduled run
+        await asyncio.sleep(0)
+        at_interrupt = _snapshot(llm, tts, sent)
+
+        await asyncio.sleep(0.3)
+        assert llm.closed
+        assert tts.running == 0
+        assert _snapshot(llm, tts, sent) == at_interrupt
+
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+from open_llm_vtuber.translate.translate_interface import TranslateInterface
+from open_llm_vtuber.utils.language_id import identify_script_language
+from open_llm_vtuber.utils.language_id_corpus import CORPUS
+
+
+class _Translator(TranslateInterface):
+    def __init__(self, target_language):
+        self.target_language = target_language
+
+    def translate(self, text):
+        return text
+
+
+def test_script_language_is_never_wrong():
+    for language, text in CORPUS:
+        assert identify_script_language(text) in (None, language), text
+
+
+def test_translation_skipped_only_when_the_script_decides():
+    assert not _Translator("ja").needs_translation("手伝ってくれてありがとう。")
+    assert _Translator("ja").needs_translation("我觉得这个主意非常好。")
+    # Latin text is translated even when it looks like the target language
+    assert _Translator("en").needs_translation("Sure, I can help you with that.")
+    assert _Translator("es").needs_translation("Me gusta mucho la comida.")
+    # Cyrillic without a letter only Russian uses may be another language
+    assert _Translator("ru").needs_translation("Здравей, как си днес?")
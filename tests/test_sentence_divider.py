@@ -0,0 +1,187 @@
+"""
+Differential test of SentenceDivider against the frozen reference copy in
+sentence_divider_reference.py: random token splits of replies with tags,
+abbreviations, decimals and CJK text must come out as the same sentences,
+with both segment methods and with faster_first_response on and off.
+Adaptive chunking, which the reference does not have, is tested on its own.
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from open_llm_vtuber.utils import sentence_divider
+
+from . import sentence_divider_reference as reference
+
+LATIN_PIECES = [
+    "Hello",
+    " world",
+    ".",
+    " How",
+    " are",
+    " you",
+    "?",
+    " I",
+    " am",
+    " fine",
+    ",",
+    " thanks",
+    "!",
+    " [joy]",
+    " It",
+    " costs",
+    " 3",
+    ".5",
+    " dollars",
+    " e.g.",
+    " Mr.",
+    " Smith",
+    " Dr.",
+    " vs.",
+    " ok",
+    "...",
+    " Yes",
+    ";",
+    "\n",
+]
+CJK_PIECES = [
+    "你好",
+    "。",
+    "我",
+    "很好",
+    "，",
+    "谢谢",
+    "！",
+    "今天",
+    "天气",
+    "不错",
+    "？",
+    "3",
+    ".5",
+]
+TAG_PIECES = [
+    " <think>",
+    "hmm",
+    "</think>",
+    "<",
+    "think",
+    ">",
+    "</",
+    "think/>",
+    "[",
+    "joy",
+    "]",
+]
+
+# (pieces, language the segmenter is given)
+CORPORA = {
+    "latin": (LATIN_PIECES + TAG_PIECES, "en"),
+    "cjk": (CJK_PIECES + TAG_PIECES, "zh"),
+    "mixed": (LATIN_PIECES + CJK_PIECES + TAG_PIECES, "en"),
+}
+REPLIES = [
+    "Well, <think>Is it 3.5 or 4?</think> Mr. Smith paid 3.5 dollars, "
+    "e.g. for tea. [joy] Really? Yes! 你好。谢谢！",
+    "Dr. Who vs. Mr. Smith... It was 2.75 to 3.25, i.e. close; "
+    "<think>the user wants a number</think>Really!",
+    "<think>用户在打招呼。</think>你好，我很好！今天天气不错，3.5度。谢谢？",
+    "Hmm<think/> ok, so... yes. No! Maybe? Fine, fine.",
+]
+STREAMS_PER_CASE = 200
+
+
+async def _divide(module, tokens, segment_method, faster_first_response):
+    divider = module.SentenceDivider(
+        faster_first_response=faster_first_response,
+        segment_method=segment_method,
+        valid_tags=["think"],
+    )
+
+    async def stream():
+        for token in tokens:
+            yield token
+
+    return [
+        (sentence.text, [(tag.name, tag.state.name) for tag in sentence.tags])
+        async for sentence in divider.process_stream(stream())
+    ]
+
+
+def _same_language(monkeypatch, language):
+    # The language detectors differ, give both dividers the same language
+    monkeypatch.setattr(reference, "detect_language", lambda text: language)
+    monkeypatch.setattr(
+        sentence_divider, "detect_language", lambda text, cache=None: language
+    )
+
+
+def _assert_same(tokens, segment_method, faster_first_response):
+    expected = asyncio.run(
+        _divide(reference, tokens, segment_method, faster_first_response)
+    )
+    actual = asyncio.run(
+        _divide(sentence_divider, tokens, segment_method, faster_first_response)
+    )
+    assert actual == expected, tokens
+
+
+@pytest.mark.parametrize("corpus", sorted(CORPORA))
+@pytest.mark.parametrize("segment_method", ["regex", "pysbd"])
+@pytest.mark.parametrize("faster_first_response", [True, False])
+def test_random_tokens(monkeypatch, corpus, segment_method, faster_first_response):
+    pieces, language = CORPORA[corpus]
+    _same_language(monkeypatch, language)
+    rng = random.Random(f"{corpus}-{segment_method}-{faster_first_response}")
+    for _ in range(STREAMS_PER_CASE):
+        tokens = [rng.choice(pieces) for _ in range(rng.randint(1, 40))]
+        _assert_same(tokens, segment_method, faster_first_response)
+
+
+@pytest.mark.parametrize("segment_method", ["regex", "pysbd"])
+@pytest.mark.parametrize("faster_first_response", [True, False])
+def test_random_splits(monkeypatch, segment_method, faster_first_response):
+    """A reply cut into tokens at random characters, tags cut included"""
+    _same_language(monkeypatch, "en")
+    rng = random.Random(f"{segment_method}-{faster_first_response}")
+    for _ in range(STREAMS_PER_CASE):
+        reply = rng.choice(REPLIES)
+        cuts = sorted(rng.sample(range(1, len(reply)), rng.randint(1, 30)))
+        tokens = [reply[i:j] for i, j in zip([0, *cuts], [*cuts, len(reply)])]
+        _assert_same(tokens, segment_method, faster_first_response)
+
+
+class _QueueStatus:
+    queued_sentences = 0
+    playback_seconds_remaining = 5.0
+
+
+def test_adaptive_chunking_cuts():
+    """
+    While draining, the buffer is cut at its last comma, then at the last
+    space of what the comma cut left over.
+    """
+    divider = sentence_divider.SentenceDivider(
+        faster_first_response=False,
+        segment_method="regex",
+        adaptive_chunking=sentence_divider.AdaptiveChunking(tts_status=_QueueStatus()),
+    )
+    status = divider.adaptive_chunking.tts_status
+    text = "aaaa bbbb cccc dddd eeee, ffff gggg hhhh iiii jjjj kkkk"
+
+    async def stream():
+        for i, token in enumerate([*text, "x", "y"]):
+            # Start draining once the whole text is buffered
+            if i == len(text):
+                status.playback_seconds_remaining = 0.0
+            yield token
+
+    async def divide():
+        return [sentence.text async for sentence in divider.process_stream(stream())]
+
+    assert asyncio.run(divide()) == [
+        "aaaa bbbb cccc dddd eeee,",
+        "ffff gggg hhhh iiii jjjj",
+        "kkkkxy",
+    ]
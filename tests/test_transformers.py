@@ -0,0 +1,20 @@
+from open_llm_vtuber.agent.transformers import extract_actions
+from open_llm_vtuber.live2d_model import Live2dModel
+from open_llm_vtuber.utils.sentence_divider import (
+    SentenceWithTags,
+    TagInfo,
+    TagState,
+)
+
+
+def test_emotion_keywords_become_expressions():
+    live2d = Live2dModel("shizuku-local")
+    sentence = SentenceWithTags(text="[Joy] Hello there! [fear]", tags=[])
+    actions, sentence = extract_actions(sentence, live2d)
+    assert actions.expressions == [3, 1]
+    assert sentence.text == " Hello there! "
+
+    think = SentenceWithTags(text="[joy]", tags=[TagInfo("think", TagState.START)])
+    actions, sentence = extract_actions(think, live2d)
+    assert actions.expressions is None
+    assert sentence is think